@@ -0,0 +1,18 @@
+"""ASGI entry point for the async serving mode.
+
+Run with:
+    uvicorn asgi:application --workers 2
+
+Importing this module switches the app to ``API_MODE=async`` unless the
+environment already sets a mode.
+"""
+
+import os
+
+os.environ.setdefault("API_MODE", "async")
+
+from asgiref.wsgi import WsgiToAsgi
+
+from main import app
+
+application = WsgiToAsgi(app)
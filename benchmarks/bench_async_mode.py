@@ -0,0 +1,150 @@
+"""Compare sync (gunicorn) and async (uvicorn + asgi.py) serving modes.
+
+Both servers are started with the same number of worker processes against a
+seeded SQLite database. The script fires concurrent ``POST /auth/login`` and
+``GET /rooms`` requests and reports throughput, latency and the resident
+memory of each server's process tree, so concurrency can be compared at
+equal memory.
+
+Run with:
+    pip install -r requirements-async.txt
+    python benchmarks/bench_async_mode.py --workers 2 --concurrency 32
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SEED = """
+import uuid
+from werkzeug.security import generate_password_hash
+from main import app
+from db.init import db
+from db.usuario import Usuario
+from db.room import Room, Hint, UsuarioRoom
+with app.app_context():
+    u = Usuario(id=uuid.uuid4(), nombre='Bench', apellido='User', email='bench@example.com',
+                password=generate_password_hash('BenchPass123'))
+    db.session.add(u)
+    for n in range(1, 6):
+        r = Room(name=f'Sala {n}', final_code=f'CODE{n}')
+        db.session.add(r)
+        db.session.flush()
+        for h in range(1, 6):
+            db.session.add(Hint(room_id=r.id, title=f'Pista {h}', image_path=f'S{n}P{h}.png',
+                                lime_survey_path=f'index.php/S{n}P{h}'))
+        db.session.add(UsuarioRoom(usuario_id=u.id, room_id=r.id, is_unlocked=n == 1))
+    db.session.commit()
+"""
+
+
+def _rss_kb(pid: int) -> int:
+    """Resident memory of a process and all its children, in kB."""
+    total = 0
+    pids = [pid]
+    while pids:
+        p = pids.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pids.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return total
+
+
+def _request(url, body=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers=headers, method="POST" if body is not None else "GET")
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        payload = resp.read()
+    return time.perf_counter() - start, payload
+
+
+def _wait_ready(base: str, timeout: float = 20.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            _request(f"{base}/healthz")
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not start")
+
+
+def _load(base, path, body, token, concurrency, total):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        latencies = list(pool.map(lambda _: _request(f"{base}{path}", body, token)[0], range(total)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def run_mode(mode, port, env, args):
+    if mode == "sync":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{port}", "main:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:application", "--workers", str(args.workers),
+               "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base)
+        creds = {"email": "bench@example.com", "password": "BenchPass123"}
+        token = json.loads(_request(f"{base}/auth/login", creds)[1])["sessionToken"]
+        results = {
+            "login": _load(base, "/auth/login", creds, None, args.concurrency, args.requests // 4),
+            "rooms": _load(base, "/rooms", None, token, args.concurrency, args.requests),
+        }
+        results["rss_mb"] = _rss_kb(proc.pid) / 1024
+        return results
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=800)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp}/bench.db", API_MODE="sync")
+        subprocess.run([sys.executable, "-c", SEED], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        print(f"workers={args.workers} concurrency={args.concurrency}")
+        print(f"{'mode':6} {'endpoint':8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'rss MB':>8} {'req/s/MB':>9}")
+        for port, mode in ((8601, "sync"), (8602, "async")):
+            res = run_mode(mode, port, dict(env, API_MODE=mode), args)
+            for endpoint in ("login", "rooms"):
+                r = res[endpoint]
+                print(f"{mode:6} {endpoint:8} {r['rps']:8.1f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} "
+                      f"{res['rss_mb']:8.1f} {r['rps'] / res['rss_mb']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
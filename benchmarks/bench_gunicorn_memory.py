@@ -0,0 +1,87 @@
+"""Memory per gunicorn worker with and without ``preload_app``.
+
+Starts ``gunicorn -c gunicorn.conf.py main:app`` twice against a seeded
+SQLite database (GUNICORN_PRELOAD=0 and 1) and warms every worker with
+``GET /rooms`` traffic. It then reads each process's memory from
+/proc/<pid>/smaps_rollup (Linux only):
+
+* RSS: resident pages, shared ones included (overstates the total)
+* PSS: shared pages split between the processes that map them; the sum is
+  the real footprint
+* USS: pages private to the process, i.e. what one more worker costs
+
+Run with:
+    python benchmarks/bench_gunicorn_memory.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_async_mode import ROOT, SEED, _request, _wait_ready
+
+
+def _memory_kb(pid: int) -> dict:
+    fields = {"Rss": 0, "Pss": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in fields:
+                fields[name] = int(rest.split()[0])
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def _children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(c) for c in f.read().split()]
+
+
+def run(preload: bool, port: int, env: dict, args) -> dict:
+    env = dict(env, GUNICORN_PRELOAD="1" if preload else "0", WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_BIND=f"127.0.0.1:{port}")
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base)
+        creds = {"email": "bench@example.com", "password": "BenchPass123"}
+        token = json.loads(_request(f"{base}/auth/login", creds)[1])["sessionToken"]
+        # enough concurrent traffic to reach every worker
+        with ThreadPoolExecutor(max_workers=args.workers * 4) as pool:
+            list(pool.map(lambda _: _request(f"{base}/rooms", None, token), range(args.requests)))
+        time.sleep(0.5)
+        workers = [_memory_kb(pid) for pid in _children(proc.pid)]
+        return {"master": _memory_kb(proc.pid), "workers": workers}
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp}/bench.db", API_MODE="sync")
+        subprocess.run([sys.executable, "-c", SEED], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        print(f"workers={args.workers} (MB; per-worker columns are averages)")
+        print(f"{'preload':8} {'worker RSS':>11} {'worker PSS':>11} {'worker USS':>11} {'total PSS':>10}")
+        for port, preload in ((8611, False), (8612, True)):
+            res = run(preload, port, env, args)
+            n = len(res["workers"]) or 1
+            avg = {k: sum(w[k] for w in res["workers"]) / n / 1024 for k in ("rss", "pss", "uss")}
+            total = (res["master"]["pss"] + sum(w["pss"] for w in res["workers"])) / 1024
+            print(f"{'on' if preload else 'off':8} {avg['rss']:11.1f} {avg['pss']:11.1f} {avg['uss']:11.1f} {total:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Tail latency under network delay: replay visitor journeys against a slow DB/SMTP.
+
+Local runs hit a database with no network between it and the app, so a view
+that makes 15 round trips costs the same as one that makes 3. This harness
+puts a latency model in front of both dependencies and replays visitor
+journeys through the blueprints:
+
+* database — with ``--database-url mysql+pymysql://...`` (an empty scratch
+  database) the app connects through :class:`LatencyProxy`, a local TCP proxy
+  that delays every server reply. Without it the app runs on SQLite and
+  :class:`SqliteLatency` sleeps the same delay before every statement and
+  COMMIT, one simulated round trip each;
+* SMTP — a minimal local SMTP server (:class:`SmtpStandIn`) behind another
+  ``LatencyProxy``, so ``/auth/forgot`` pays one round trip per SMTP command.
+
+A round trip costs ``--latency`` plus an exponentially distributed
+``--jitter`` (mean), and with probability ``--drop`` a retransmission stall
+of ``--rto`` (a lost TCP segment is resent, not lost). Each journey:
+register, login, list rooms, open the entry room, enter its final code, open
+the next room, complete its hints, read the profile, request a password
+reset. Every endpoint is reported with its DB round trips (``X-Query-Count``)
+next to p50/p95/p99, first without injected latency and then with it, so the
+per-endpoint cost of a round trip is visible before it shows up in production.
+
+Run with:
+    python benchmarks/bench_latency.py --visitors 200 --latency 0.002 --jitter 0.001 --drop 0.001
+    python benchmarks/bench_latency.py --database-url mysql+pymysql://museo:pw@127.0.0.1:3306/museo_bench
+"""
+
+import argparse
+import os
+import random
+import socket
+import socketserver
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import sqlalchemy as sa
+
+PASSWORD = "BenchPass123"
+ROOMS = 4
+HINTS_PER_ROOM = 5
+
+
+class LatencyProfile:
+    """Delay of one network round trip."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, drop: float = 0.0, rto: float = 0.2,
+                 seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop = drop
+        self.rto = rto
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            delay = self.latency
+            if self.jitter:
+                delay += self._random.expovariate(1 / self.jitter)
+            if self.drop and self._random.random() < self.drop:
+                delay += self.rto
+        return delay
+
+    def describe(self) -> str:
+        return (f"latency {self.latency * 1000:g} ms + jitter {self.jitter * 1000:g} ms, "
+                f"drop {self.drop:.2%} (rto {self.rto * 1000:g} ms)")
+
+
+class LatencyProxy:
+    """TCP proxy on 127.0.0.1 that delays every chunk the upstream sends back.
+
+    A request/response protocol (MySQL, SMTP) sends one reply per round trip,
+    so each reply is delayed by one ``profile.sample()``.
+    """
+
+    def __init__(self, upstream: tuple, profile: LatencyProfile):
+        self.upstream = upstream
+        self.profile = profile
+        self.round_trips = 0
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self._listener.getsockname()[1]
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            try:
+                server = socket.create_connection(self.upstream)
+            except OSError:
+                client.close()
+                continue
+            threading.Thread(target=self._pump, args=(client, server, False), daemon=True).start()
+            threading.Thread(target=self._pump, args=(server, client, True), daemon=True).start()
+
+    def _pump(self, src, dst, delayed: bool):
+        try:
+            while True:
+                chunk = src.recv(65536)
+                if not chunk:
+                    break
+                if delayed:
+                    self.round_trips += 1
+                    time.sleep(self.profile.sample())
+                dst.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            for s in (src, dst):
+                try:
+                    s.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                s.close()
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+
+
+class SqliteLatency:
+    """Sleep one round trip before every statement and COMMIT on a SQLite engine."""
+
+    def __init__(self, engine, profile: LatencyProfile):
+        self.profile = profile
+        sa.event.listen(engine, "before_cursor_execute", self._statement)
+        sa.event.listen(engine, "commit", self._commit)
+
+    def _statement(self, conn, cursor, statement, parameters, context, executemany):
+        time.sleep(self.profile.sample())
+
+    def _commit(self, conn):
+        time.sleep(self.profile.sample())
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self._reply("220 bench ESMTP")
+        for raw in self.rfile:
+            command = raw.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250 bench")
+            elif command == "DATA":
+                self._reply("354 end with .")
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                self.server.messages += 1
+                self._reply("250 queued")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 ok")
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """Accepts and discards mail; ``messages`` counts what was delivered."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.messages = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+def build_app(database_url: str, profile: LatencyProfile):
+    """App on ``database_url`` (through a proxy for MySQL) plus the hooks that delay it."""
+    from main import create_app
+
+    proxy = None
+    if database_url.startswith("mysql"):
+        url = sa.engine.make_url(database_url)
+        proxy = LatencyProxy((url.host or "127.0.0.1", url.port or 3306), profile)
+        database_url = url.set(host="127.0.0.1", port=proxy.port).render_as_string(hide_password=False)
+    app = create_app({
+        "SECRET_KEY": "bench",
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SQLALCHEMY_BINDS": {},
+        "CACHE_URL": None,
+        "QUERY_BUDGET_ENFORCE": True,
+        "LOG_LEVEL": "WARNING",
+        "API_MODE": "sync",
+    })
+    if proxy is None:
+        from db.init import db
+        with app.app_context():
+            for engine in db.engines.values():
+                SqliteLatency(engine, profile)
+    return app, proxy
+
+
+def seed(app) -> None:
+    """Rooms unlock in order: the first by final code, the rest by completing every hint."""
+    from db.exhibition import DEFAULT_EXHIBITION_ID
+    from db.init import db
+    from db.room import Hint, Room
+    from services.catalog import invalidate_catalog
+
+    with app.app_context():
+        if db.session.query(Room.id).first() is not None:
+            return
+        for n in range(1, ROOMS + 1):
+            room = Room(exhibition_id=DEFAULT_EXHIBITION_ID, position=n, name=f"Sala {n}",
+                        final_code="BENCH" if n == 1 else None, completion_mode="final_code" if n == 1 else "all_hints")
+            db.session.add(room)
+            db.session.flush()
+            db.session.add_all(Hint(room_id=room.id, exhibition_id=DEFAULT_EXHIBITION_ID, title=f"Pista {h}",
+                                    image_path=f"S{n}P{h}.png") for h in range(1, HINTS_PER_ROOM + 1))
+        db.session.commit()
+        invalidate_catalog()
+
+
+def journey(app, samples) -> None:
+    """One visitor's session; appends (endpoint, seconds, db round trips) to ``samples``."""
+    client = app.test_client()
+
+    def call(method, path, rule=None, **kwargs):
+        start = time.perf_counter()
+        resp = client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - start
+        if resp.status_code >= 400:
+            raise RuntimeError(f"{method} {path}: {resp.status_code} {resp.get_data(as_text=True)[:200]}")
+        samples.append((f"{method} {rule or path}", elapsed, int(resp.headers.get("X-Query-Count", 0))))
+        return resp.get_json()
+
+    email = f"visitor-{uuid.uuid4().hex[:12]}@example.com"
+    call("POST", "/auth/register", json={"nombre": "Bench", "apellido": "Visitor", "email": email,
+                                        "password": PASSWORD})
+    token = call("POST", "/auth/login", json={"email": email, "password": PASSWORD})["sessionToken"]
+    headers = {"Authorization": f"Bearer {token}"}
+    rooms = call("GET", "/rooms", headers=headers)
+    entry, second = (r["id"] for r in rooms[:2])
+    call("GET", f"/rooms/{entry}", "/rooms/<id>", headers=headers)
+    call("POST", f"/rooms/{entry}/verify_final_code", "/rooms/<id>/verify_final_code", json={"final_code": "BENCH"}, headers=headers)
+    for hint in call("GET", f"/rooms/{second}", "/rooms/<id>", headers=headers)["hints"]:
+        call("POST", "/rooms/complete", json={"room_id": second, "hint_id": hint["id"], "email": email},
+             headers=headers)
+    call("GET", "/auth/me", headers=headers)
+    call("POST", "/auth/forgot", json={"email": email})
+
+
+def _pct(values, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def run(label: str, app, visitors: int, concurrency: int, smtp_proxy) -> None:
+    samples = []
+    # warm caches (catalog, password hashing) outside the measurement
+    journey(app, [])
+    smtp_before = smtp_proxy.round_trips
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: journey(app, samples), range(visitors)))
+    elapsed = time.perf_counter() - start
+
+    by_endpoint = defaultdict(lambda: ([], []))
+    for endpoint, seconds, queries in samples:
+        by_endpoint[endpoint][0].append(seconds)
+        by_endpoint[endpoint][1].append(queries)
+    forgot_calls = len(by_endpoint["POST /auth/forgot"][0]) or 1
+
+    print(f"\n{label}: {visitors} journeys in {elapsed:.1f}s (concurrency {concurrency})")
+    print(f"  {'endpoint':<40} {'calls':>6} {'db rt':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, (times, queries) in sorted(by_endpoint.items(), key=lambda kv: -_pct(sorted(kv[1][0]), 0.99)):
+        times.sort()
+        rt = statistics.mean(queries)
+        if endpoint == "POST /auth/forgot":
+            rt_label = f"{rt:.0f}+{(smtp_proxy.round_trips - smtp_before) / forgot_calls:.0f}"
+        else:
+            rt_label = f"{rt:.1f}"
+        print(f"  {endpoint:<40} {len(times):>6} {rt_label:>6} {_pct(times, 0.5):8.1f} {_pct(times, 0.95):8.1f} "
+              f"{_pct(times, 0.99):8.1f} {times[-1] * 1000:8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=None,
+                        help="MySQL scratch database to proxy; default: temporary SQLite file")
+    parser.add_argument("--visitors", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.002, help="seconds per round trip")
+    parser.add_argument("--jitter", type=float, default=0.001, help="mean extra seconds (exponential)")
+    parser.add_argument("--drop", type=float, default=0.001, help="share of round trips that hit a retransmit")
+    parser.add_argument("--rto", type=float, default=0.2, help="retransmission stall in seconds")
+    args = parser.parse_args()
+
+    smtp = SmtpStandIn()
+    profile = LatencyProfile()
+    smtp_proxy = LatencyProxy(smtp.server_address, profile)
+    os.environ.update({"SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(smtp_proxy.port)})
+    for key in ("SMTP_USER", "SMTP_PASSWORD"):
+        os.environ.pop(key, None)
+
+    database_url = args.database_url
+    if database_url is None:
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(prefix="museo-bench-"), "bench.db")
+        database_url = f"sqlite:///{path}"
+    app, db_proxy = build_app(database_url, profile)
+    seed(app)
+
+    try:
+        run("no injected latency", app, args.visitors, args.concurrency, smtp_proxy)
+        profile.latency, profile.jitter, profile.drop, profile.rto = args.latency, args.jitter, args.drop, args.rto
+        run(profile.describe(), app, args.visitors, args.concurrency, smtp_proxy)
+    finally:
+        smtp_proxy.close()
+        if db_proxy is not None:
+            db_proxy.close()
+        smtp.shutdown()
+    print("\ndb rt: SQL statements per request (X-Query-Count); /auth/forgot adds SMTP round trips after '+'")
+
+
+if __name__ == "__main__":
+    main()
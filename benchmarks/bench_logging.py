@@ -0,0 +1,127 @@
+"""Cost of logging on the request path.
+
+Two measurements:
+
+* per log call, as seen by the calling thread: a plain ``StreamHandler``
+  writing JSON synchronously versus the queue handler from
+  ``services/log.py``, against a fast sink (/dev/null) and a slow one
+  (1 ms per write, like a blocked stdout pipe or log shipper);
+* per request: ``GET /healthz`` through the test client with the access log
+  off, sampled at ``LOG_SAMPLE_RATE`` and at 100%, and at 100% with the
+  synchronous handler instead of the queue.
+
+Log output goes to /dev/null; results go to the terminal.
+
+Run with:
+    python benchmarks/bench_logging.py --requests 3000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services import log as museo_log
+from services.log import JsonFormatter, NonBlockingQueueHandler
+
+OUT = sys.__stdout__
+
+
+class SlowSink:
+    """File-like object whose writes take ``delay`` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, data):
+        time.sleep(self.delay)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def per_call(handler, n: int) -> float:
+    """Microseconds per ``logger.info`` call in the calling thread."""
+    log = logging.getLogger("bench.calls")
+    log.handlers[:] = [handler]
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    start = time.perf_counter()
+    for i in range(n):
+        log.info("GET /rooms 200", extra={"status": 200, "latency_ms": 3.2, "request_id": i})
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def bench_calls(n: int) -> None:
+    import queue
+    devnull = open(os.devnull, "w")
+    print(f"\nper log call ({n} calls, caller thread only)", file=OUT)
+    for sink_name, sink, calls in (("/dev/null", devnull, n), ("slow sink 1ms", SlowSink(0.001), min(n, 500))):
+        sync = logging.StreamHandler(sink)
+        sync.setFormatter(JsonFormatter())
+        # queue with nobody draining it: what the caller pays while the writer is busy
+        queued = NonBlockingQueueHandler(queue.Queue(maxsize=calls + 1))
+        print(f"  {sink_name:<14} sync {per_call(sync, calls):8.1f} us   queue {per_call(queued, calls):6.1f} us",
+              file=OUT)
+
+
+def bench_requests(n: int) -> None:
+    from main import create_app
+
+    def run(label: str, **config) -> None:
+        app = create_app({
+            "TESTING": True,
+            "SECRET_KEY": "bench",
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///file:/museo-bench-log?mode=memory&cache=shared&uri=true",
+            "SQLALCHEMY_BINDS": {},
+            "CACHE_URL": None,
+            **config,
+        })
+        client = app.test_client()
+        for _ in range(200):
+            client.get("/healthz")
+        start = time.perf_counter()
+        for _ in range(n):
+            client.get("/healthz")
+        elapsed = (time.perf_counter() - start) / n * 1e6
+        print(f"  {label:<34} {elapsed:8.1f} us/request", file=OUT)
+
+    print(f"\nper request (GET /healthz x {n})", file=OUT)
+    run("access log off", LOG_LEVEL="CRITICAL")
+    run("sampled 10% (default)", LOG_SAMPLE_RATE=0.1)
+    run("every request, queue", LOG_SAMPLE_RATE=1.0)
+
+    # same, but the root logger writes synchronously to the slow sink
+    root = logging.getLogger()
+    sync = logging.StreamHandler(SlowSink(0.001))
+    sync.setFormatter(JsonFormatter())
+    root.removeHandler(museo_log._handler)
+    root.addHandler(sync)
+    try:
+        run("every request, sync, slow sink", LOG_SAMPLE_RATE=1.0)
+    finally:
+        root.removeHandler(sync)
+        root.addHandler(museo_log._handler)
+    sys.stdout = SlowSink(0.001)
+    run("every request, queue, slow sink", LOG_SAMPLE_RATE=1.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    sys.stdout = open(os.devnull, "w")
+    bench_calls(args.calls)
+    bench_requests(args.requests)
+
+
+if __name__ == "__main__":
+    main()
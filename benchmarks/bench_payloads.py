@@ -0,0 +1,99 @@
+"""Serialization and compression benchmark for typical API payloads.
+
+Builds payloads shaped like ``GET /rooms/<id>`` and ``GET /users`` at
+realistic sizes, then compares the stdlib JSON provider with
+``FastJSONProvider`` and reports compressed sizes per encoding.
+
+Run with:
+    python benchmarks/bench_payloads.py
+"""
+
+import os
+import sys
+import time
+import uuid
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from services.json_provider import FastJSONProvider
+from services.compression import available_encodings, compress_body
+
+LIME_SURVEY_HOST = "https://encuestas.museo-interactivo.example.org/limesurvey"
+FILES_HOST = "https://archivos.museo-interactivo.example.org/static/pistas"
+
+
+def room_payload(room_id: int, hints: int) -> dict:
+    hints_out = []
+    for n in range(1, hints + 1):
+        hints_out.append({
+            "id": room_id * 100 + n,
+            "title": f"Pista {n}: objeto de la colección número {n}",
+            "limeSurveyUrl": f"{LIME_SURVEY_HOST}/index.php/S{room_id}P{n}",
+            "imageUrl": f"{FILES_HOST}/S{room_id}P{n}.png",
+            "accessCode": f"CODE-{room_id}-{n:03d}",
+            "completed": n % 2 == 0,
+        })
+    return {"id": room_id, "completed": False, "name": f"Sala {room_id}: Historia natural",
+            "final_code": "AMBAR", "hints": hints_out}
+
+
+def users_payload(per_page: int) -> dict:
+    items = []
+    for n in range(per_page):
+        items.append({
+            "id": str(uuid.uuid4()),
+            "nombre": f"Visitante{n}",
+            "apellido": "Pérez González",
+            "email": f"visitante{n}@correo.example.com",
+            "global_position": n + 1,
+            "total_points": 30 * n,
+            "role": "USER",
+            "is_active": True,
+        })
+    return {"items": items, "page": 1, "per_page": per_page, "total": 5000, "total_pages": 5000 // per_page}
+
+
+def timeit(fn, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main():
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    cases = [
+        ("/rooms/<id> (5 hints)", room_payload(1, 5)),
+        ("/rooms/<id> (20 hints)", room_payload(2, 20)),
+        ("/users per_page=10", users_payload(10)),
+        ("/users per_page=100", users_payload(100)),
+    ]
+
+    print(f"fast provider backend: {fast.backend}; encodings: {', '.join(available_encodings())}")
+    header = f"{'payload':28} {'stdlib us':>10} {'fast us':>10} {'identity B':>11}"
+    for enc in available_encodings():
+        header += f" {enc + ' B':>8} {enc + ' us':>8}"
+    print(header)
+
+    for name, obj in cases:
+        number = 2000
+        t_std = timeit(lambda: stdlib.dumps(obj, separators=(",", ":")), number)
+        t_fast = timeit(lambda: fast.dumps_bytes(obj), number)
+        body = fast.dumps_bytes(obj)
+        line = f"{name:28} {t_std:10.1f} {t_fast:10.1f} {len(body):11d}"
+        for enc in available_encodings():
+            t_c = timeit(lambda: compress_body(body, enc), 200)
+            line += f" {len(compress_body(body, enc)):8d} {t_c:8.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
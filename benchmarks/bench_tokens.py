@@ -0,0 +1,89 @@
+"""Compare DB-backed session tokens with stateless signed tokens.
+
+Seeds a SQLite database with one user and a realistic number of rows in
+``session_tokens``, then times Bearer validation through the request loader
+for both token kinds and counts SQL statements per request on
+``GET /rooms``. The DB flow runs without a shared cache, so every call
+performs the lookup; signed tokens need one for their denylist, so that flow
+runs on a second app over the same database with ``CACHE_URL=memory://``.
+
+Run with:
+    python benchmarks/bench_tokens.py --tokens 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=50000, help="existing session_tokens rows")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/bench.db"
+
+    import hashlib
+    import uuid
+    from datetime import datetime, timedelta
+    from sqlalchemy import event, insert
+    from werkzeug.security import generate_password_hash
+
+    from main import app, create_app, load_user_from_request
+    from db.init import db
+    from db.usuario import Usuario
+    from db.session_token import SessionToken
+    from services.tokens import issue_signed_token, new_opaque_token
+
+    with app.app_context():
+        user = Usuario(id=uuid.uuid4(), nombre="Bench", apellido="User", email="bench@example.com",
+                       password=generate_password_hash("BenchPass123"))
+        db.session.add(user)
+        db.session.commit()
+        expires = datetime.utcnow() + timedelta(hours=1)
+        rows = [{"token_hash": hashlib.sha256(str(i).encode()).hexdigest(), "usuario_id": user.id,
+                 "expires_at": expires, "revoked": False} for i in range(args.tokens)]
+        db.session.execute(insert(SessionToken), rows)
+        raw_db, token_hash, exp = new_opaque_token()
+        db.session.add(SessionToken(token_hash=token_hash, usuario_id=user.id, expires_at=exp))
+        db.session.commit()
+        raw_signed, _ = issue_signed_token(user.id, user.role)
+        user_id = user.id
+    signed_app = create_app({"CACHE_URL": "memory://", "SESSION_TOKEN_MODE": "signed"})
+    statements = [0]
+    for flow_app in (app, signed_app):
+        with flow_app.app_context():
+            event.listen(db.engine, "before_cursor_execute", lambda *a: statements.__setitem__(0, statements[0] + 1))
+
+    class _Req:
+        def __init__(self, token):
+            self.headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"session_tokens rows: {args.tokens + 1}")
+    print(f"{'flow':8} {'validate us':>12} {'SQL/validate':>13} {'GET /rooms SQL':>15}")
+    for name, flow_app, raw in (("db", app, raw_db), ("signed", signed_app, raw_signed)):
+        req = _Req(raw)
+        with flow_app.test_request_context():
+            assert load_user_from_request(req).id == user_id
+            statements[0] = 0
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                load_user_from_request(req)
+            per_call = (time.perf_counter() - start) / args.iterations * 1e6
+            sql_per_call = statements[0] / args.iterations
+        client = flow_app.test_client()
+        statements[0] = 0
+        client.get("/rooms", headers=req.headers)
+        print(f"{name:8} {per_call:12.1f} {sql_per_call:13.1f} {statements[0]:15d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Insert throughput of progress rows keyed by random vs time-ordered user ids.
+
+``usuarios_hints`` and ``usuarios_rooms`` are clustered on
+``(usuario_id, ...)``. The benchmark fills a table with the same key layout,
+one batch of users (``--hints`` rows each) per transaction, for four variants:
+
+* ``uuid4`` / ``uuid7`` ids (random vs :func:`db.ids.uuid7`);
+* ``CHAR(32)`` hex keys (``sqlalchemy.Uuid`` on MySQL) vs ``BINARY(16)``
+  (:class:`db.ids.BinaryUuid`).
+
+It reports rows/s for the first and last tenth of the run, so the slowdown
+as the index outgrows the cache is visible, and the final table size. On
+SQLite the page cache is capped (``--cache-kb``) to stand in for an InnoDB
+buffer pool smaller than the table; with ``--database-url`` it runs against
+a MySQL scratch database instead (tables are created and dropped).
+
+Run with:
+    python benchmarks/bench_uuid_inserts.py --users 100000 --hints 5
+    python benchmarks/bench_uuid_inserts.py --database-url mysql+pymysql://museo:pw@127.0.0.1:3306/museo_bench
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import sqlalchemy as sa
+
+from db.ids import uuid7
+
+VARIANTS = (
+    ("uuid4", "CHAR(32)", uuid.uuid4, sa.CHAR(32), lambda u: u.hex),
+    ("uuid7", "CHAR(32)", uuid7, sa.CHAR(32), lambda u: u.hex),
+    ("uuid4", "BINARY(16)", uuid.uuid4, sa.BINARY(16), lambda u: u.bytes),
+    ("uuid7", "BINARY(16)", uuid7, sa.BINARY(16), lambda u: u.bytes),
+)
+
+
+def _engine(url, cache_kb: int):
+    if url:
+        return sa.create_engine(url)
+    path = os.path.join(tempfile.mkdtemp(prefix="museo-uuid-"), "bench.db")
+    engine = sa.create_engine(f"sqlite:///{path}")
+
+    @sa.event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, record):
+        dbapi_conn.execute(f"PRAGMA cache_size = -{cache_kb}")
+        dbapi_conn.execute("PRAGMA journal_mode = WAL")
+        dbapi_conn.execute("PRAGMA synchronous = NORMAL")
+
+    return engine
+
+
+def _size_mb(conn, table: str) -> float:
+    if conn.dialect.name == "sqlite":
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        return pages * conn.exec_driver_sql("PRAGMA page_size").scalar() / 1e6
+    row = conn.exec_driver_sql(
+        "SELECT data_length + index_length FROM information_schema.tables "
+        f"WHERE table_schema = DATABASE() AND table_name = '{table}'"
+    ).scalar()
+    return (row or 0) / 1e6
+
+
+def run(engine, label: str, key_type, new_id, encode, users: int, hints: int, batch: int) -> None:
+    metadata = sa.MetaData()
+    table = sa.Table(
+        "bench_usuarios_hints", metadata,
+        sa.Column("usuario_id", key_type, primary_key=True),
+        sa.Column("hint_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("exhibition_id", sa.Integer, nullable=False),
+        sa.Column("completed", sa.Boolean, nullable=False),
+        sa.Index("ix_bench_exhibition_user", "exhibition_id", "usuario_id"),
+    )
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    rates = []
+    insert = table.insert()
+    for start in range(0, users, batch):
+        rows = [
+            {"usuario_id": key, "hint_id": h, "exhibition_id": 1, "completed": False}
+            for key in (encode(new_id()) for _ in range(min(batch, users - start)))
+            for h in range(1, hints + 1)
+        ]
+        began = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert, rows)
+        rates.append(len(rows) / (time.perf_counter() - began))
+
+    tenth = max(1, len(rates) // 10)
+    first = sum(rates[:tenth]) / tenth
+    last = sum(rates[-tenth:]) / tenth
+    with engine.connect() as conn:
+        size = _size_mb(conn, table.name)
+    print(f"  {label:<22} first 10% {first:10,.0f} rows/s   last 10% {last:10,.0f} rows/s "
+          f"({last / first:5.0%})   {size:8.1f} MB")
+    metadata.drop_all(engine)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=None, help="MySQL scratch database; default: SQLite file")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--hints", type=int, default=5, help="progress rows per user")
+    parser.add_argument("--batch", type=int, default=500, help="users per transaction")
+    parser.add_argument("--cache-kb", type=int, default=8000, help="SQLite page cache")
+    args = parser.parse_args()
+
+    engine = _engine(args.database_url, args.cache_kb)
+    print(f"{args.users * args.hints:,} progress rows on {engine.dialect.name}, {args.batch} users per transaction")
+    for ids, storage, new_id, key_type, encode in VARIANTS:
+        run(engine, f"{ids} {storage}", key_type, new_id, encode, args.users, args.hints, args.batch)
+
+
+if __name__ == "__main__":
+    main()
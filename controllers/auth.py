@@ -1,25 +1,38 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
 from flask_login import logout_user, current_user, login_required
-from db.usuario import Usuario
-from db.room import Room, Hint, UsuarioRoom, UsuarioHint
+from db.usuario import Usuario, normalize_email
+from db.room import UsuarioRoom, UsuarioHint
+from db.ids import uuid7
 from db.init import db
-from db.password_reset import PasswordReset
-import uuid
-from datetime import datetime, timedelta, timezone
-import secrets
 import os
 import smtplib
 from email.message import EmailMessage
 import hashlib
 from db.session_token import SessionToken
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.cache import get_cache
+from services.catalog import get_catalog
+from services.tokens import issue_session_token, is_signed_token, revoke_signed_token
+from services.refresh import RefreshError, issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+from services.events import ROOM_UNLOCKED, record_event
+from services.idempotency import idempotent
+from services.log import logger
+from services.identity import user_hints, user_rooms
+from services.reset_codes import ResetCodeError, check_reset_code, issue_reset_code
+from services.resilience import CircuitOpen, get_breaker
+from services.sessions import revoke_user_sessions
 
 
 def send_reset_email(to_email: str, code: str) -> None:
-    """Send reset code to email. If SMTP is not configured, print the code to stdout.
+    """Send reset code to email. If SMTP is not configured, log the code instead (development).
 
     Required env vars to actually send email:
       SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, EMAIL_FROM
+    SMTP_TIMEOUT (seconds, default 10) bounds every socket operation; calls go
+    through the "smtp" circuit breaker.
     """
     host = os.getenv("SMTP_HOST")
     port = os.getenv("SMTP_PORT")
@@ -30,9 +43,9 @@ def send_reset_email(to_email: str, code: str) -> None:
     subject = "Código de restablecimiento de contraseña"
     body = f"Su código de restablecimiento de contraseña es: {code}\nEste código es válido por 15 minutos."
 
-    # If host/port missing, just print the code for dev.
+    # If host/port missing, just log the code for dev.
     if not host or not port:
-        print(f"[DEV EMAIL] To: {to_email} Code: {code}")
+        logger.info("SMTP not configured, reset code not sent", extra={"dev_email": to_email, "dev_code": code})
         return
 
     msg = EmailMessage()
@@ -41,33 +54,41 @@ def send_reset_email(to_email: str, code: str) -> None:
     msg["To"] = to_email
     msg.set_content(body)
 
+    timeout = float(os.getenv("SMTP_TIMEOUT", "10"))
     try:
         port_i = int(port)
-        # MailHog and many dev SMTP servers accept plain SMTP without TLS/auth on port 1025
-        if user and password:
-            # Authenticated SMTP
-            if port_i == 465:
-                with smtplib.SMTP_SSL(host, port_i) as s:
-                    s.login(user, password)
-                    s.send_message(msg)
+        with get_breaker("smtp").guard(failures=(smtplib.SMTPException, OSError)):
+            # MailHog and many dev SMTP servers accept plain SMTP without TLS/auth on port 1025
+            if user and password:
+                # Authenticated SMTP
+                if port_i == 465:
+                    with smtplib.SMTP_SSL(host, port_i, timeout=timeout) as s:
+                        s.login(user, password)
+                        s.send_message(msg)
+                else:
+                    with smtplib.SMTP(host, port_i, timeout=timeout) as s:
+                        s.starttls()
+                        s.login(user, password)
+                        s.send_message(msg)
             else:
-                with smtplib.SMTP(host, port_i) as s:
-                    s.starttls()
-                    s.login(user, password)
+                # No auth: connect and send (suitable for MailHog)
+                with smtplib.SMTP(host, port_i, timeout=timeout) as s:
+                    try:
+                        # try EHLO/NOOP to ensure connection
+                        s.ehlo()
+                    except smtplib.SMTPException:
+                        pass
                     s.send_message(msg)
-        else:
-            # No auth: connect and send (suitable for MailHog)
-            with smtplib.SMTP(host, port_i) as s:
-                try:
-                    # try EHLO/NOOP to ensure connection
-                    s.ehlo()
-                except Exception:
-                    pass
-                s.send_message(msg)
-    except Exception as e:
-        # Don't raise — log for dev and fallback to printing the code
-        print("Failed to send reset email:", e)
-        print(f"[DEV EMAIL] To: {to_email} Code: {code}")
+    except Exception:
+        # Don't raise; the code can be requested again
+        logger.exception("failed to send reset email", extra={"to": to_email})
+
+
+def ensure_mail_available() -> None:
+    """Raise CircuitOpen (503) while the SMTP breaker is open; no code would reach the user."""
+    smtp = get_breaker("smtp")
+    if smtp.is_open():
+        raise CircuitOpen(smtp.name, smtp.retry_after())
 
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -85,115 +106,158 @@ def _to_bool(value):
     return s in ("1", "true", "t", "yes", "y", "on")
 
 
+def _add_refresh_token(resp: dict, user, remember: bool) -> None:
+    refresh_token, refresh_expires = issue_refresh_token(user, remember)
+    if refresh_token:
+        resp["refreshToken"] = refresh_token
+        resp["refreshTokenExpiry"] = refresh_expires.isoformat() + "Z"
+
+
 @bp.route("/register", methods=["POST"])
+@idempotent
+@query_budget(19)
 def register():
     data = request.get_json() or {}
     required = ("nombre", "apellido", "email", "password")
     if not all(k in data for k in required):
         return jsonify({"error": "missing fields"}), 400
 
-    if Usuario.query.filter_by(email=data["email"]).first():
-        return jsonify({"error": "email already registered"}), 400
-
     hashed = generate_password_hash(data["password"])
     user = Usuario(
-        id=uuid.uuid4(),
+        id=uuid7(),
         nombre=data["nombre"],
         apellido=data["apellido"],
         email=data["email"],
         password=hashed,
     )
     db.session.add(user)
-    db.session.commit()
-    # also create a session token for API clients
     try:
-        raw_token = secrets.token_urlsafe(48)
-        token_hash = hashlib.sha256(raw_token.encode()).hexdigest()
-        expires = datetime.utcnow() + timedelta(hours=1)
-        st = SessionToken(token_hash=token_hash, usuario_id=user.id, expires_at=expires)
-        db.session.add(st)
         db.session.commit()
-    except Exception:
+    except IntegrityError:
+        # the unique email index decides, so two concurrent signups cannot both succeed
         db.session.rollback()
-        raw_token = None
+        return jsonify({"error": "email already registered"}), 400
+    # also create a session token for API clients
+    raw_token, expires = issue_session_token(user)
     # do not create a cookie-based session; return an opaque session token instead
 
-    # Create per-user room and hint records so the frontend can show progress
+    # Create per-user room and hint records (in the current exhibition) so the frontend can show progress
     try:
-        rooms = Room.query.all()
-        for room in rooms:
-            is_first_room = room.id == 1
-            # create UsuarioRoom if not exists
-            ur = UsuarioRoom.query.filter_by(
-                usuario_id=user.id, room_id=room.id
-            ).first()
-            if not ur:
-                ur = UsuarioRoom(
+        catalog = get_catalog()
+        rooms = user_rooms(user.id, catalog.exhibition_id)
+        hints = user_hints(user.id, catalog.exhibition_id)
+        for room in catalog.rooms:
+            is_entry_room = catalog.is_entry(room.id)
+            if room.id not in rooms:
+                rooms[room.id] = ur = UsuarioRoom(
                     usuario_id=user.id,
                     room_id=room.id,
+                    exhibition_id=catalog.exhibition_id,
                     completed=False,
-                    is_unlocked=is_first_room,
+                    is_unlocked=is_entry_room,
                 )
                 db.session.add(ur)
+                if is_entry_room:
+                    record_event(ROOM_UNLOCKED, user.id, room_id=room.id)
 
             # ensure UsuarioHint entries exist for each hint in the room
-            hints = Hint.query.filter_by(room_id=room.id).all()
-            for h in hints:
-                uh = UsuarioHint.query.filter_by(
-                    usuario_id=user.id, hint_id=h.id
-                ).first()
-                if not uh:
-                    uh = UsuarioHint(usuario_id=user.id, hint_id=h.id, completed=False)
+            for h in catalog.hints_for(room.id):
+                if h.id not in hints:
+                    hints[h.id] = uh = UsuarioHint(usuario_id=user.id, hint_id=h.id,
+                                                   exhibition_id=catalog.exhibition_id, completed=False)
                     db.session.add(uh)
         db.session.commit()
     except Exception:
+        logger.exception("could not create progress rows for new user", extra={"user_id": str(user.id)})
         db.session.rollback()
 
     resp = {"id": str(user.id), "email": user.email}
     if raw_token:
         resp["sessionToken"] = raw_token
         resp["sessionTokenExpiry"] = expires.isoformat() + "Z"
+        _add_refresh_token(resp, user, _to_bool(data.get("rememberMe", False)))
     return jsonify(resp), 201
 
 
 @bp.route("/login", methods=["POST"])
+@query_budget(8)
 def login():
     data = request.get_json() or {}
     if "email" not in data or "password" not in data:
         return jsonify({"error": "missing credentials"}), 400
 
-    user = Usuario.query.filter_by(email=data["email"]).first()
+    user = Usuario.query.filter_by(email_normalized=normalize_email(data["email"])).first()
     if not user or not check_password_hash(user.password, data["password"]):
         return jsonify({"error": "invalid credentials"}), 401
 
     # Consider rememberMe field from frontend; default to False if not provided
     remember = _to_bool(data.get("rememberMe", False))
-    # create and return an opaque session token for API use
-    try:
-        raw_token = secrets.token_urlsafe(48)
-        token_hash = hashlib.sha256(raw_token.encode()).hexdigest()
-        expires = datetime.utcnow() + timedelta(hours=1)
-        st = SessionToken(token_hash=token_hash, usuario_id=user.id, expires_at=expires)
-        db.session.add(st)
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-        raw_token = None
+    # create and return a session token (opaque or signed) for API use
+    raw_token, expires = issue_session_token(user)
 
     resp = {"id": str(user.id), "email": user.email, "role": user.role}
     if raw_token:
         resp["sessionToken"] = raw_token
         resp["sessionTokenExpiry"] = expires.isoformat() + "Z"
+        # rememberMe selects how long the refresh token stays valid
+        _add_refresh_token(resp, user, remember)
     return jsonify(resp), 200
 
 
+@bp.route("/refresh", methods=["POST"])
+@query_budget(9)
+def refresh():
+    """Exchange a refresh token for a new session token and refresh token.
+
+    Request JSON: { "refreshToken": "..." }
+    No password check; presenting an already used token revokes its whole family.
+    """
+    data = request.get_json() or {}
+    raw = data.get("refreshToken")
+    if not raw:
+        return jsonify({"error": "refreshToken required"}), 400
+
+    try:
+        user, new_refresh, row = rotate_refresh_token(raw)
+    except RefreshError as e:
+        return jsonify({"error": f"{e.reason} refresh token"}), 401
+
+    raw_token, expires = issue_session_token(user)
+    if not raw_token:
+        return jsonify({"error": "could not issue session token"}), 500
+
+    return jsonify({
+        "id": str(user.id),
+        "email": user.email,
+        "role": user.role,
+        "sessionToken": raw_token,
+        "sessionTokenExpiry": expires.isoformat() + "Z",
+        "refreshToken": new_refresh,
+        "refreshTokenExpiry": row.expires_at.isoformat() + "Z",
+    }), 200
+
+
 @bp.route("/logout", methods=["POST"])
 @login_required
+@query_budget(8)
 def logout():
+    # Revoke the refresh token family if the client sends its refresh token
+    data = request.get_json(silent=True) or {}
+    if data.get("refreshToken"):
+        try:
+            revoke_refresh_token(data["refreshToken"])
+        except Exception:
+            logger.warning("could not revoke refresh token on logout", exc_info=True)
+            db.session.rollback()
+
     # Revoke token provided in Authorization header if present
     auth = request.headers.get("Authorization", "")
     if auth.startswith("Bearer "):
         raw = auth.split(" ", 1)[1].strip()
+        if is_signed_token(raw):
+            revoke_signed_token(raw)
+            logout_user()
+            return jsonify({"status": "logged out"})
         try:
             h = hashlib.sha256(raw.encode()).hexdigest()
             st = SessionToken.query.filter_by(token_hash=h).first()
@@ -201,7 +265,10 @@ def logout():
                 st.revoked = True
                 db.session.add(st)
                 db.session.commit()
+            # evict the cached token lookup in every process
+            get_cache().delete(f"session:{h}")
         except Exception:
+            logger.warning("could not revoke session token on logout", exc_info=True)
             try:
                 db.session.rollback()
             except Exception:
@@ -211,30 +278,33 @@ def logout():
     return jsonify({"status": "logged out"})
 
 
+def _reset_code_error(e: ResetCodeError):
+    if e.reason == "locked":
+        return jsonify({"error": "too many attempts, request a new code"}), 429
+    return jsonify({"error": "invalid or expired code"}), 400
+
+
 @bp.route("/forgot", methods=["POST"])
+@idempotent
+@query_budget(4)
 def forgot_password():
     data = request.get_json() or {}
     email = data.get("email")
     if not email:
         return jsonify({"error": "email required"}), 400
+    ensure_mail_available()
 
-    user = Usuario.query.filter_by(email=email).first()
+    user = Usuario.query.filter_by(email_normalized=normalize_email(email)).first()
     if not user:
         return jsonify({"error": "email not found"}), 404
 
-    code = str(secrets.randbelow(900000) + 100000)
-    expires = datetime.now(timezone.utc) + timedelta(minutes=15)
-    pr = PasswordReset(
-        id=uuid.uuid4(), user_id=user.id, code=code, expires_at=expires, used=False
-    )
-    db.session.add(pr)
-    db.session.commit()
-
+    code = issue_reset_code(user)
     send_reset_email(user.email, code)
     return jsonify({"status": "code_sent"}), 200
 
 
 @bp.route("/verify-reset", methods=["POST"])
+@query_budget(4)
 def verify_reset():
     data = request.get_json() or {}
     email = data.get("email")
@@ -242,22 +312,20 @@ def verify_reset():
     if not email or not code:
         return jsonify({"error": "email and code required"}), 400
 
-    user = Usuario.query.filter_by(email=email).first()
+    user = Usuario.query.filter_by(email_normalized=normalize_email(email)).first()
     if not user:
         return jsonify({"error": "email not found"}), 404
 
-    pr = (
-        PasswordReset.query.filter_by(user_id=user.id, code=code, used=False)
-        .order_by(PasswordReset.expires_at.desc())
-        .first()
-    )
-    if not pr or not pr.is_valid():
-        return jsonify({"error": "invalid or expired code"}), 400
+    try:
+        check_reset_code(user, code)
+    except ResetCodeError as e:
+        return _reset_code_error(e)
 
     return jsonify({"status": "code_valid"}), 200
 
 
 @bp.route("/reset", methods=["POST"])
+@query_budget(6)
 def reset_password():
     data = request.get_json() or {}
     email = data.get("email")
@@ -266,29 +334,29 @@ def reset_password():
     if not email or not code or not new_password:
         return jsonify({"error": "email, code and new_password required"}), 400
 
-    user = Usuario.query.filter_by(email=email).first()
+    user = Usuario.query.filter_by(email_normalized=normalize_email(email)).first()
     if not user:
         return jsonify({"error": "email not found"}), 404
 
-    pr = (
-        PasswordReset.query.filter_by(user_id=user.id, code=code, used=False)
-        .order_by(PasswordReset.expires_at.desc())
-        .first()
-    )
-    if not pr or not pr.is_valid():
-        return jsonify({"error": "invalid or expired code"}), 400
+    try:
+        pr = check_reset_code(user, code)
+    except ResetCodeError as e:
+        return _reset_code_error(e)
 
     user.password = generate_password_hash(new_password)
-    pr.used = True
+    # codes are single use
+    db.session.delete(pr)
     db.session.add(user)
-    db.session.add(pr)
-    db.session.commit()
+    # whoever held the old password loses their sessions (commits)
+    revoke_user_sessions(user.id)
 
     return jsonify({"status": "password_changed"}), 200
 
 
 @bp.route("/me", methods=["GET"])
 @login_required
+@read_only
+@query_budget(4)
 def me():
     """Return the current logged-in user's basic info. Use this to verify the session cookie."""
     user = current_user
@@ -0,0 +1,101 @@
+"""Async variants of the blocking auth routes (enabled with API_MODE=async).
+
+Password hashing and SMTP are pushed to the default executor so the shared
+event loop keeps serving other requests while they run; DB access goes
+through the async engine.
+"""
+
+import asyncio
+
+from flask import current_app, request, jsonify
+from sqlalchemy import select
+from werkzeug.security import check_password_hash
+
+from controllers.auth import _to_bool, ensure_mail_available, send_reset_email
+from db.password_reset import PasswordReset
+from db.session_token import SessionToken
+from db.usuario import Usuario, normalize_email
+from services.async_db import get_runtime
+from services.idempotency import idempotent
+from services.refresh import build_refresh_token
+from services.reset_codes import build_reset_code, upsert_statement
+from services.sessions import evict_cached, over_cap_statement, revoke_statement, session_cap
+from services.tokens import is_signed_token, issue_signed_token, new_opaque_token
+
+
+async def login():
+    data = request.get_json() or {}
+    if "email" not in data or "password" not in data:
+        return jsonify({"error": "missing credentials"}), 400
+
+    async with get_runtime().session() as session:
+        user = (
+            await session.execute(
+                select(Usuario.id, Usuario.email, Usuario.role, Usuario.password).where(
+                    Usuario.email_normalized == normalize_email(data["email"])
+                )
+            )
+        ).first()
+        if not user or not await asyncio.to_thread(check_password_hash, user.password, data["password"]):
+            return jsonify({"error": "invalid credentials"}), 401
+
+        remember = _to_bool(data.get("rememberMe", False))
+        try:
+            if current_app.config.get("SESSION_TOKEN_MODE", "db") == "signed":
+                raw_token, expires = issue_signed_token(user.id, user.role)
+            else:
+                raw_token, token_hash, expires = new_opaque_token()
+                session.add(SessionToken(token_hash=token_hash, usuario_id=user.id, expires_at=expires))
+            refresh_token, refresh_row = build_refresh_token(user.id, remember)
+            session.add(refresh_row)
+            stale = []
+            if raw_token and not is_signed_token(raw_token) and session_cap() > 0:
+                await session.flush()
+                stale = (await session.execute(over_cap_statement(user.id, session_cap()))).scalars().all()
+                if stale:
+                    await session.execute(revoke_statement(stale))
+            await session.commit()
+            evict_cached(stale)
+        except Exception:
+            await session.rollback()
+            raw_token = None
+
+    resp = {"id": str(user.id), "email": user.email, "role": user.role}
+    if raw_token:
+        resp["sessionToken"] = raw_token
+        resp["sessionTokenExpiry"] = expires.isoformat() + "Z"
+        resp["refreshToken"] = refresh_token
+        resp["refreshTokenExpiry"] = refresh_row.expires_at.isoformat() + "Z"
+    return jsonify(resp), 200
+
+
+@idempotent
+async def forgot_password():
+    data = request.get_json() or {}
+    email = data.get("email")
+    if not email:
+        return jsonify({"error": "email required"}), 400
+    ensure_mail_available()
+
+    async with get_runtime().session() as session:
+        user = (await session.execute(select(Usuario.id, Usuario.email).where(Usuario.email_normalized == normalize_email(email)))).first()
+        if not user:
+            return jsonify({"error": "email not found"}), 404
+
+        # same single-row upsert as the sync route (services/reset_codes.py)
+        code, values = build_reset_code(user.id)
+        stmt = upsert_statement(session.bind.dialect.name, values)
+        if stmt is not None:
+            await session.execute(stmt)
+        else:
+            await session.merge(PasswordReset(**values))
+        await session.commit()
+
+    await asyncio.to_thread(send_reset_email, user.email, code)
+    return jsonify({"status": "code_sent"}), 200
+
+
+ASYNC_VIEWS = {
+    "auth.login": login,
+    "auth.forgot_password": forgot_password,
+}
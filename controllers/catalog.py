@@ -0,0 +1,26 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_login import login_required
+
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.catalog import get_catalog
+from services.http_policy import cache_policy
+
+bp = Blueprint("catalog", __name__, url_prefix="/catalog")
+
+
+@bp.route("/<version>", methods=["GET"])
+# private: hints carry access codes, so shared caches must not keep it
+@cache_policy("private, max-age=31536000, immutable", vary=("Authorization", "X-Exhibition"))
+@login_required
+@read_only
+@query_budget(6)
+def get_bundle(version: str):
+    """Serve the exhibition's catalog bundle; a version names its content, so it never changes."""
+    bundle = get_catalog().bundle()
+    if version != bundle.version:
+        # outdated or foreign version: tell the client which one to fetch
+        return jsonify({"error": "catalog version not found", "catalog": bundle.version}), 404
+    resp = Response(bundle.body, mimetype="application/json")
+    resp.set_etag(bundle.version)
+    return resp.make_conditional(request)
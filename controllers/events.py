@@ -0,0 +1,101 @@
+import queue
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_login import login_required
+
+from controllers.users import is_admin
+from db.init import db
+from db.progress_event import ProgressEvent
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.events import event_to_dict, get_bus
+
+bp = Blueprint("events", __name__, url_prefix="/events")
+
+
+def _parse_cursor(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _events_after(cursor: int, limit: int):
+    rows = (
+        ProgressEvent.query.filter(ProgressEvent.id > cursor)
+        .order_by(ProgressEvent.id)
+        .limit(limit)
+        .all()
+    )
+    return [event_to_dict(r) for r in rows]
+
+
+@bp.route("", methods=["GET"])
+@login_required
+@read_only
+@query_budget(6)
+def list_events():
+    """Return progress events after ?cursor= (exclusive), oldest first."""
+    if not is_admin():
+        return jsonify({"error": "forbidden"}), 403
+    cursor = _parse_cursor(request.args.get("cursor"))
+    limit = min(_parse_cursor(request.args.get("limit")) or 100, 1000)
+    events = _events_after(cursor, limit)
+    next_cursor = events[-1]["id"] if events else cursor
+    return jsonify({"events": events, "cursor": next_cursor}), 200
+
+
+@bp.route("/stream", methods=["GET"])
+@login_required
+def stream_events():
+    """Server-Sent Events stream of progress events for admin dashboards.
+
+    Resumes after the ``Last-Event-ID`` header (sent automatically by
+    EventSource on reconnect) or ``?cursor=``. Past events are replayed from
+    the DB, then live events arrive from the in-process bus.
+    """
+    if not is_admin():
+        return jsonify({"error": "forbidden"}), 403
+
+    cursor = _parse_cursor(request.headers.get("Last-Event-ID") or request.args.get("cursor"))
+    heartbeat = float(current_app.config.get("EVENTS_HEARTBEAT", 15))
+    dumps = current_app.json.dumps
+    bus = get_bus()
+
+    def generate():
+        # subscribe before the replay query so nothing committed in between is
+        # lost, and only once the stream runs: a response that is never
+        # iterated never reaches the finally below
+        q = bus.subscribe()
+        last = cursor
+        replayed = set()
+        try:
+            while True:
+                batch = _events_after(last, 500)
+                for ev in batch:
+                    last = ev["id"]
+                    replayed.add(last)
+                    yield f"id: {ev['id']}\nevent: {ev['kind']}\ndata: {dumps(ev)}\n\n"
+                if len(batch) < 500:
+                    break
+            # don't hold a pooled connection for the lifetime of the stream
+            db.session.remove()
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    ev = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                # concurrent commits can publish ids out of order, so only
+                # skip what the client already has, not everything below `last`
+                if ev["id"] <= cursor or ev["id"] in replayed:
+                    continue
+                yield f"id: {ev['id']}\nevent: {ev['kind']}\ndata: {dumps(ev)}\n\n"
+        finally:
+            bus.unsubscribe(q)
+
+    resp = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
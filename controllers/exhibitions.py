@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify
+
+from db.exhibition import Exhibition
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.http_policy import cache_policy
+
+bp = Blueprint("exhibitions", __name__, url_prefix="/exhibitions")
+
+
+@bp.route("", methods=["GET"])
+@cache_policy("public, max-age=300")
+@read_only
+@query_budget(2)
+def list_exhibitions():
+    """Public list of active exhibitions; clients pass the slug as X-Exhibition."""
+    rows = (
+        Exhibition.query.filter_by(is_active=True)
+        .order_by(Exhibition.id)
+        .with_entities(Exhibition.id, Exhibition.slug, Exhibition.name)
+        .all()
+    )
+    return jsonify([{"id": r.id, "slug": r.slug, "name": r.name} for r in rows]), 200
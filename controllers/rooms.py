@@ -1,61 +1,108 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from db.room import Room, Hint, UsuarioRoom, UsuarioHint
-from db.usuario import Usuario
+from db.room import UsuarioHint
+from db.usuario import normalize_email
 from db.init import db as _db
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.catalog import get_catalog
+from services.http_policy import cache_policy
+from services.idempotency import idempotent
+from services.log import logger
+from services.events import HINT_COMPLETED, record_event
+from services.identity import current_usuario, user_by_email, user_hints, user_rooms
+from services.progress import complete_room, ensure_room_row
 
 bp = Blueprint("rooms", __name__, url_prefix="/rooms")
 
 
 @bp.route("", methods=["GET"])
+@cache_policy("private, no-cache", vary=("Authorization", "X-Exhibition"))
 @login_required
+@read_only
+@query_budget(10)
 def list_rooms():
-    """Return all rooms with per-user completed/is_unlocked flags."""
-    rooms = Room.query.order_by(Room.id).all()
+    """Return the exhibition's rooms with per-user completed/is_unlocked flags."""
+    catalog = get_catalog()
 
     # Build a quick lookup for the current user's UsuarioRoom entries by querying the DB
     # This avoids issues with relationship loading states returning scalars or proxies.
-    usuario_rooms = (
-        UsuarioRoom.query.filter_by(usuario_id=getattr(current_user, "id", None)).all()
-        if getattr(current_user, "id", None) is not None
-        else []
-    )
-    usuario_rooms_lookup = {ur.room_id: ur for ur in usuario_rooms}
+    uid = getattr(current_user, "id", None)
+    usuario_rooms_lookup = user_rooms(uid, catalog.exhibition_id) if uid is not None else {}
 
     result = []
-    for r in rooms:
+    for r in catalog.rooms:
         ur = usuario_rooms_lookup.get(r.id)
         result.append(
             {
                 "id": r.id,
                 "name": r.name,
                 "finalCode": r.final_code,
-                "imageUrl": getattr(r, "image_url", None),
+                "imageUrl": None,
                 "completed": bool(ur.completed) if ur is not None else False,
-                "isUnlocked": bool(ur.is_unlocked) if ur is not None else False,
+                # entry rooms are open even before the user has progress rows in this exhibition
+                "isUnlocked": bool(ur.is_unlocked) if ur is not None else catalog.is_entry(r.id),
             }
         )
 
     return jsonify(result), 200
 
 
+@bp.route("/state", methods=["GET"])
+@cache_policy("private, no-cache", vary=("Authorization", "X-Exhibition"))
+@login_required
+@read_only
+@query_budget(10)
+def room_state():
+    """Return the user's progress as {id: state} maps next to the current catalog version.
+
+    Names, hints and URLs come from ``GET /catalog/<catalog>``; rooms are
+    0 locked, 1 unlocked, 2 completed and hints 0 pending, 1 completed.
+    """
+    catalog = get_catalog()
+    uid = getattr(current_user, "id", None)
+    usuario_rooms_lookup = user_rooms(uid, catalog.exhibition_id) if uid is not None else {}
+    usuario_hints_lookup = user_hints(uid, catalog.exhibition_id) if uid is not None else {}
+    return jsonify(room_state_payload(catalog, usuario_rooms_lookup, usuario_hints_lookup)), 200
+
+
+def room_state_payload(catalog, usuario_rooms_lookup: dict, usuario_hints_lookup: dict) -> dict:
+    """Build the ``/rooms/state`` body from {room_id: row} and {hint_id: row} lookups."""
+    rooms = {}
+    for r in catalog.rooms:
+        ur = usuario_rooms_lookup.get(r.id)
+        if ur is not None and ur.completed:
+            rooms[str(r.id)] = 2
+        elif (bool(ur.is_unlocked) if ur is not None else catalog.is_entry(r.id)):
+            rooms[str(r.id)] = 1
+        else:
+            rooms[str(r.id)] = 0
+    hints = {}
+    for h in catalog.hints_by_id:
+        uh = usuario_hints_lookup.get(h)
+        hints[str(h)] = 1 if uh is not None and uh.completed else 0
+    return {"catalog": catalog.bundle().version, "rooms": rooms, "hints": hints}
+
+
 @bp.route("/<int:room_id>", methods=["GET"])
+@cache_policy("private, no-cache", vary=("Authorization", "X-Exhibition"))
 @login_required
+@read_only
+@query_budget(10)
 def get_room_hints(room_id: int):
     """Return hints for a room including per-user completed flag."""
-    room = Room.query.get(room_id)
+    catalog = get_catalog()
+    room = catalog.room(room_id)
     if room is None:
         return jsonify({"error": "room not found"}), 404
 
     # get UsuarioRoom for current user and this room
-    ur = UsuarioRoom.query.filter_by(room_id=room.id, usuario_id=getattr(current_user, "id", None)).first()
-    hints = Hint.query.filter_by(room_id=room_id).order_by(Hint.id).all()
+    uid = getattr(current_user, "id", None)
+    ur = user_rooms(uid, catalog.exhibition_id).get(room.id)
+    hints = catalog.hints_for(room_id)
 
     # Build lookup for user's hint completion
-    uh_items = getattr(current_user, "usuario_hints", [])
-    if isinstance(uh_items, UsuarioHint):
-        uh_items = [uh_items]
-    usuario_hints_lookup = {uh.hint_id: uh for uh in (uh_items or [])}
+    usuario_hints_lookup = user_hints(uid, catalog.exhibition_id)
 
     hints_out = []
     for h in hints:
@@ -64,9 +111,9 @@ def get_room_hints(room_id: int):
             {
                 "id": h.id,
                 "title": h.title,
-                "limeSurveyUrl": getattr(h, "lime_survey_url", None),
+                "limeSurveyUrl": h.lime_survey_url,
                 "imageUrl": h.image_url,
-                "accessCode": getattr(h, "access_code", None),
+                "accessCode": h.access_code,
                 "completed": bool(uh.completed) if uh is not None else False,
             }
         )
@@ -76,87 +123,63 @@ def get_room_hints(room_id: int):
 
 @bp.route("/<int:room_id>/verify_final_code", methods=["POST"])
 @login_required
+@idempotent
+@query_budget(16)
 def verify_final_code(room_id: int):
     """Verify a submitted final code for a room.
 
     Request JSON: { "final_code": "..." }
     Response: { "room_id": <int>, "correct": true|false }
     """
-    # Only allow verifying the final code for the first room (id == 1)
-    if int(room_id) != 1:
-        return jsonify({"error": "final code verification only allowed for room 1"}), 403
-
-    room = Room.query.get(room_id)
+    catalog = get_catalog()
+    room = catalog.room(room_id)
     if room is None:
         return jsonify({"error": "room not found"}), 404
 
+    # Only rooms whose completion mode accepts a final code can be verified
+    if not room.accepts_final_code:
+        return jsonify({"error": "final code verification not allowed for this room"}), 403
+
     data = request.get_json() or {}
     submitted = data.get("final_code") or data.get("code")
     if submitted is None:
         return jsonify({"error": "final_code required in request body"}), 400
     # Check if user already completed this room; if so, don't allow re-verification
     uid = getattr(current_user, "id", None)
-    if uid is not None:
-        existing_ur = UsuarioRoom.query.filter_by(usuario_id=uid, room_id=room.id).first()
-        if existing_ur and existing_ur.completed:
-            return jsonify({"error": "room already completed"}), 400
+    rooms_lookup = user_rooms(uid, catalog.exhibition_id) if uid is not None else {}
+    existing_ur = rooms_lookup.get(room.id)
+    if existing_ur and existing_ur.completed:
+        return jsonify({"error": "room already completed"}), 400
 
     # simple equality check (case-sensitive). If you want case-insensitive, change accordingly.
     correct = (room.final_code == submitted)
 
     if correct:
-        # mark this room completed for the current user and unlock the next room
+        # mark this room completed for the current user (100 points) and unlock its successors
         try:
             if uid is not None:
-                ur = UsuarioRoom.query.filter_by(usuario_id=uid, room_id=room.id).first()
-                room_was_completed_before = bool(ur and ur.completed)
-
-                if not ur:
-                    ur = UsuarioRoom(usuario_id=uid, room_id=room.id, completed=True, is_unlocked=True)
-                    _db.session.add(ur)
-                else:
-                    if not ur.completed:
-                        ur.completed = True
-                        _db.session.add(ur)
-
-                # Award 100 points to the user only if the room wasn't previously completed
-                if not room_was_completed_before:
-                    try:
-                        user = Usuario.query.filter_by(id=uid).first()
-                        if user:
-                            user.total_points = (user.total_points or 0) + 100
-                            _db.session.add(user)
-                    except Exception:
-                        # don't block the flow if scoring fails
-                        pass
-
-                # unlock next room (first room with id > current)
-                next_room = Room.query.filter(Room.id > room.id).order_by(Room.id).first()
-                if next_room:
-                    next_ur = UsuarioRoom.query.filter_by(usuario_id=uid, room_id=next_room.id).first()
-                    if not next_ur:
-                        next_ur = UsuarioRoom(usuario_id=uid, room_id=next_room.id, completed=False, is_unlocked=True)
-                        _db.session.add(next_ur)
-                    elif not next_ur.is_unlocked:
-                        next_ur.is_unlocked = True
-                        _db.session.add(next_ur)
-
+                user = current_usuario()
+                if user:
+                    complete_room(catalog, user, room.id, rooms_lookup, points=100)
                 try:
                     _db.session.commit()
                 except Exception:
+                    logger.exception("could not commit room completion", extra={"room_id": room.id})
                     try:
                         _db.session.rollback()
                     except Exception:
                         pass
         except Exception:
-            # don't raise to the client; just log in server logs if needed
-            pass
+            # don't raise to the client; the answer itself was checked
+            logger.exception("room completion failed", extra={"room_id": room.id})
 
     return jsonify({"room_id": room.id, "correct": bool(correct)}), 200
 
 
 @bp.route("/complete", methods=["POST"])
 @login_required
+@idempotent
+@query_budget(18)
 def complete_hint_for_user():
     """Mark a hint as completed for a user.
 
@@ -175,32 +198,31 @@ def complete_hint_for_user():
 
     # permission check: allow if current_user is admin or owner
     is_admin = getattr(current_user, "role", None) == "ADMIN"
-    if not is_admin and getattr(current_user, "email", None) != email:
+    if not is_admin and normalize_email(getattr(current_user, "email", None)) != normalize_email(email):
         return jsonify({"error": "forbidden"}), 403
 
-    user = Usuario.query.filter_by(email=email).first()
+    user = user_by_email(email)
     if not user:
         return jsonify({"error": "user not found"}), 404
 
     # verify hint exists and belongs to room
-    hint = Hint.query.get(hint_id)
+    catalog = get_catalog()
+    hint = catalog.hint(hint_id)
     if not hint or hint.room_id != room_id:
         return jsonify({"error": "hint not found for room"}), 404
 
     # ensure user has UsuarioRoom record
-    ur = UsuarioRoom.query.filter_by(usuario_id=user.id, room_id=room_id).first()
-    if not ur:
-        ur = UsuarioRoom(
-            usuario_id=user.id, room_id=room_id, completed=False, is_unlocked=True
-        )
-        _db.session.add(ur)
+    rooms_lookup = user_rooms(user.id, catalog.exhibition_id)
+    ensure_room_row(catalog, user.id, room_id, rooms_lookup)
 
     # set or create UsuarioHint
-    uh = UsuarioHint.query.filter_by(usuario_id=user.id, hint_id=hint_id).first()
+    hints_lookup = user_hints(user.id, catalog.exhibition_id)
+    uh = hints_lookup.get(hint_id)
     newly_completed = False
     if not uh:
-        uh = UsuarioHint(usuario_id=user.id, hint_id=hint_id, completed=True)
+        uh = UsuarioHint(usuario_id=user.id, hint_id=hint_id, exhibition_id=catalog.exhibition_id, completed=True)
         _db.session.add(uh)
+        hints_lookup[hint_id] = uh
         newly_completed = True
     else:
         # only add points / mark as newly completed if it wasn't already completed
@@ -214,52 +236,30 @@ def complete_hint_for_user():
             # add 30 points for completing a hint
             user.total_points = (user.total_points or 0) + 30
             _db.session.add(user)
+            record_event(HINT_COMPLETED, user.id, room_id=room_id, hint_id=hint_id, points=30,
+                         total_points=user.total_points)
         except Exception:
             # ignore scoring errors and continue to commit rest
-            pass
+            logger.exception("hint scoring failed", extra={"room_id": room_id, "hint_id": hint_id})
 
-    # After marking the hint, check if all hints in the room are completed for this user
+    # After marking the hint, complete the room if its mode allows it and all hints are done
     try:
-        total_hints = Hint.query.filter_by(room_id=room_id).count()
-        completed_hints = (
-            _db.session.query(UsuarioHint)
-            .join(Hint, UsuarioHint.hint_id == Hint.id)
-            .filter(UsuarioHint.usuario_id == user.id, Hint.room_id == room_id, UsuarioHint.completed == True)
-            .count()
-        )
-        if total_hints > 0 and completed_hints >= total_hints:
-            # mark the UsuarioRoom as completed
-            ur = UsuarioRoom.query.filter_by(usuario_id=user.id, room_id=room_id).first()
-            room_completed_now = False
-            if ur and not ur.completed:
-                ur.completed = True
-                room_completed_now = True
-                _db.session.add(ur)
-            # If this room was just completed, unlock the next room (if any)
-            if room_completed_now:
-                try:
-                    next_room = (
-                        Room.query.filter(Room.id > room_id).order_by(Room.id).first()
-                    )
-                    if next_room:
-                        next_ur = UsuarioRoom.query.filter_by(usuario_id=user.id, room_id=next_room.id).first()
-                        if not next_ur:
-                            next_ur = UsuarioRoom(usuario_id=user.id, room_id=next_room.id, completed=False, is_unlocked=True)
-                            _db.session.add(next_ur)
-                        elif not next_ur.is_unlocked:
-                            next_ur.is_unlocked = True
-                            _db.session.add(next_ur)
-                except Exception:
-                    # don't block on unlocking
-                    pass
+        room = catalog.room(room_id)
+        if room.completes_with_hints and room.hint_ids and not rooms_lookup[room_id].completed:
+            completed_hints = sum(
+                1 for h in room.hint_ids if hints_lookup.get(h) is not None and hints_lookup[h].completed
+            )
+            if completed_hints >= len(room.hint_ids):
+                complete_room(catalog, user, room_id, rooms_lookup)
     except Exception:
         # don't block on this check; proceed to commit
-        pass
+        logger.exception("room completion check failed", extra={"room_id": room_id})
 
     # commit
     try:
         _db.session.commit()
     except Exception as e:
+        logger.exception("could not commit hint completion", extra={"room_id": room_id, "hint_id": hint_id})
         try:
             _db.session.rollback()
         except Exception:
@@ -268,5 +268,5 @@ def complete_hint_for_user():
 
     return jsonify({
         "status": "ok",
-        "hint": {"id": hint_id, "completed": True, "accessCode": getattr(hint, "access_code", None)},
+        "hint": {"id": hint_id, "completed": True, "accessCode": hint.access_code},
     }), 200
@@ -0,0 +1,116 @@
+"""Async variants of the read-heavy rooms routes (enabled with API_MODE=async).
+
+They return exactly the same payloads as ``controllers/rooms.py`` but run on
+the shared async runtime; rooms and hints come from the in-process catalog,
+so only per-user progress is read through the async engine.
+"""
+
+import asyncio
+
+from flask import jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import select
+
+from db.room import UsuarioRoom, UsuarioHint
+from services.async_db import get_runtime
+from services.catalog import get_catalog
+from services.http_policy import cache_policy
+from controllers.rooms import room_state_payload
+
+
+async def _fetch_all(stmt):
+    # one short-lived session per statement lets independent queries overlap
+    async with get_runtime().session() as session:
+        return (await session.execute(stmt)).all()
+
+
+@cache_policy("private, no-cache", vary=("Authorization", "X-Exhibition"))
+@login_required
+async def list_rooms():
+    """Return the exhibition's rooms with per-user completed/is_unlocked flags."""
+    uid = getattr(current_user, "id", None)
+    catalog = get_catalog()
+    if uid is not None:
+        ur_q = select(UsuarioRoom.room_id, UsuarioRoom.completed, UsuarioRoom.is_unlocked).where(
+            UsuarioRoom.exhibition_id == catalog.exhibition_id, UsuarioRoom.usuario_id == uid
+        )
+        usuario_rooms = await _fetch_all(ur_q)
+    else:
+        usuario_rooms = []
+    usuario_rooms_lookup = {row.room_id: row for row in usuario_rooms}
+
+    result = []
+    for r in catalog.rooms:
+        ur = usuario_rooms_lookup.get(r.id)
+        result.append(
+            {
+                "id": r.id,
+                "name": r.name,
+                "finalCode": r.final_code,
+                "imageUrl": None,
+                "completed": bool(ur.completed) if ur is not None else False,
+                "isUnlocked": bool(ur.is_unlocked) if ur is not None else catalog.is_entry(r.id),
+            }
+        )
+
+    return jsonify(result), 200
+
+
+@cache_policy("private, no-cache", vary=("Authorization", "X-Exhibition"))
+@login_required
+async def room_state():
+    """Return the user's progress as {id: state} maps next to the current catalog version."""
+    uid = getattr(current_user, "id", None)
+    catalog = get_catalog()
+    ur_q = select(UsuarioRoom.room_id, UsuarioRoom.completed, UsuarioRoom.is_unlocked).where(
+        UsuarioRoom.exhibition_id == catalog.exhibition_id, UsuarioRoom.usuario_id == uid
+    )
+    uh_q = select(UsuarioHint.hint_id, UsuarioHint.completed).where(
+        UsuarioHint.exhibition_id == catalog.exhibition_id, UsuarioHint.usuario_id == uid
+    )
+    ur_rows, uh_rows = await asyncio.gather(_fetch_all(ur_q), _fetch_all(uh_q))
+    payload = room_state_payload(
+        catalog, {row.room_id: row for row in ur_rows}, {row.hint_id: row for row in uh_rows}
+    )
+    return jsonify(payload), 200
+
+
+@cache_policy("private, no-cache", vary=("Authorization", "X-Exhibition"))
+@login_required
+async def get_room_hints(room_id: int):
+    """Return hints for a room including per-user completed flag."""
+    uid = getattr(current_user, "id", None)
+    catalog = get_catalog()
+    room = catalog.room(room_id)
+    if room is None:
+        return jsonify({"error": "room not found"}), 404
+
+    ur_q = select(UsuarioRoom.completed).where(UsuarioRoom.room_id == room_id, UsuarioRoom.usuario_id == uid)
+    uh_q = select(UsuarioHint.hint_id, UsuarioHint.completed).where(
+        UsuarioHint.usuario_id == uid, UsuarioHint.hint_id.in_(room.hint_ids)
+    )
+    ur_rows, uh_rows = await asyncio.gather(_fetch_all(ur_q), _fetch_all(uh_q))
+    completed_hints = {row.hint_id for row in uh_rows if row.completed}
+
+    hints_out = []
+    for h in catalog.hints_for(room_id):
+        hints_out.append(
+            {
+                "id": h.id,
+                "title": h.title,
+                "limeSurveyUrl": h.lime_survey_url,
+                "imageUrl": h.image_url,
+                "accessCode": h.access_code,
+                "completed": h.id in completed_hints,
+            }
+        )
+
+    room_completed = bool(ur_rows[0].completed) if ur_rows else False
+    return jsonify({"id": room.id, "completed": room_completed, "name": room.name, "final_code": room.final_code, "hints": hints_out}), 200
+
+
+ASYNC_VIEWS = {
+    "rooms.list_rooms": list_rooms,
+    "rooms.get_room_hints": get_room_hints,
+    "rooms.room_state": room_state,
+}
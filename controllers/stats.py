@@ -0,0 +1,24 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required
+
+from controllers.users import is_admin
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.stats import room_funnel
+from services.tenancy import current_exhibition_id
+
+bp = Blueprint("stats", __name__, url_prefix="/stats")
+
+
+@bp.route("", methods=["GET"])
+@login_required
+@read_only
+@query_budget(6)
+def get_stats():
+    """Per-room funnel (unlocked, completed, stuck per hint, average points) of the current exhibition.
+
+    Reads only the room_stats / hint_stats rollups, never the progress tables.
+    """
+    if not is_admin():
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify({"rooms": room_funnel(current_exhibition_id())}), 200
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
+from db.ids import uuid7
 from db.usuario import Usuario
 from db.init import db
+from db.query_budget import query_budget
+from db.routing import read_only
+from services.sessions import list_sessions, revoke_user_sessions, session_to_dict
 from werkzeug.security import generate_password_hash
+from sqlalchemy.exc import IntegrityError
 import uuid
 import re
 import secrets
@@ -37,6 +42,8 @@ def validate_email(email: str) -> bool:
 
 @bp.route('', methods=['GET'])
 @login_required
+@read_only
+@query_budget(8)
 def list_users():
     if not is_admin():
         return jsonify({'error': 'forbidden'}), 403
@@ -86,6 +93,8 @@ def list_users():
 
 @bp.route('/<user_id>', methods=['GET'])
 @login_required
+@read_only
+@query_budget(6)
 def get_user(user_id):
     try:
         uid = uuid.UUID(user_id)
@@ -104,6 +113,7 @@ def get_user(user_id):
 
 @bp.route('', methods=['POST'])
 @login_required
+@query_budget(8)
 def create_user():
     if not is_admin():
         return jsonify({'error': 'forbidden'}), 403
@@ -121,9 +131,6 @@ def create_user():
     if not validate_email(email):
         return jsonify({'error': 'invalid email'}), 400
 
-    if Usuario.query.filter_by(email=email).first():
-        return jsonify({'error': 'email duplicate'}), 409
-
     if password:
         if len(password) < 8:
             return jsonify({'error': 'password too short'}), 400
@@ -133,9 +140,14 @@ def create_user():
         random_pw = secrets.token_urlsafe(12)
         hashed = generate_password_hash(random_pw)
 
-    u = Usuario(id=uuid.uuid4(), nombre=nombre, apellido=apellido, email=email, password=hashed, role=role)
+    u = Usuario(id=uuid7(), nombre=nombre, apellido=apellido, email=email, password=hashed, role=role)
     db.session.add(u)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # duplicate email (unique ux_usuarios_email_normalized)
+        db.session.rollback()
+        return jsonify({'error': 'email duplicate'}), 409
 
     return jsonify(user_to_dict(u)), 201
 
@@ -156,9 +168,7 @@ def apply_user_updates(user: Usuario, data: dict, allow_role_change: bool = Fals
     if 'email' in data:
         if not validate_email(data['email']):
             return False, 'invalid email'
-        existing = Usuario.query.filter(Usuario.email == data['email'], Usuario.id != user.id).first()
-        if existing:
-            return False, 'email duplicate'
+        # a taken address fails the commit in update_user (unique index)
         user.email = data['email']
         changed = True
 
@@ -182,6 +192,7 @@ def apply_user_updates(user: Usuario, data: dict, allow_role_change: bool = Fals
 
 @bp.route('/<user_id>', methods=['PUT', 'PATCH'])
 @login_required
+@query_budget(10)
 def update_user(user_id):
     try:
         uid = uuid.UUID(user_id)
@@ -209,19 +220,25 @@ def update_user(user_id):
 
     changed, err = apply_user_updates(user, data, allow_role_change=allow_role_change)
     if err:
-        if err == 'email duplicate':
-            return jsonify({'error': err}), 409
         return jsonify({'error': err}), 400
 
     if changed:
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'email duplicate'}), 409
+        if not user.is_active or 'password' in data:
+            # log a deactivated user, or one whose password changed, out everywhere
+            revoke_user_sessions(user.id)
 
     return jsonify(user_to_dict(user)), 200
 
 
 @bp.route('/<user_id>', methods=['DELETE'])
 @login_required
+@query_budget(8)
 def delete_user(user_id):
     if not is_admin():
         return jsonify({'error': 'forbidden'}), 403
@@ -239,4 +256,43 @@ def delete_user(user_id):
     user.is_active = False
     db.session.add(user)
     db.session.commit()
+    revoke_user_sessions(user.id)
     return '', 204
+
+
+@bp.route('/<user_id>/sessions', methods=['GET'])
+@login_required
+@query_budget(6)
+def get_user_sessions(user_id):
+    """Admin: the user's active sessions (DB tokens only), newest first."""
+    if not is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+
+    try:
+        uid = uuid.UUID(user_id)
+    except Exception:
+        return jsonify({'error': 'invalid id'}), 400
+
+    if not Usuario.query.get(uid):
+        return jsonify({'error': 'not found'}), 404
+
+    return jsonify({'sessions': [session_to_dict(st) for st in list_sessions(uid)]}), 200
+
+
+@bp.route('/<user_id>/sessions', methods=['DELETE'])
+@login_required
+@query_budget(8)
+def revoke_sessions(user_id):
+    """Admin: log the user out everywhere (session, refresh and signed tokens)."""
+    if not is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+
+    try:
+        uid = uuid.UUID(user_id)
+    except Exception:
+        return jsonify({'error': 'invalid id'}), 400
+
+    if not Usuario.query.get(uid):
+        return jsonify({'error': 'not found'}), 404
+
+    return jsonify({'revoked': revoke_user_sessions(uid)}), 200
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from db.init import db
+
+# rows created before exhibitions existed belong to this one (id 1)
+DEFAULT_EXHIBITION_ID = 1
+DEFAULT_EXHIBITION_SLUG = "default"
+
+
+class Exhibition(db.Model):
+    """A museum exhibition; scopes rooms, hints and per-user progress.
+
+    Clients select one with the ``X-Exhibition`` header (or ``?exhibition=``)
+    carrying its slug; see services/tenancy.py.
+    """
+
+    __tablename__ = "exhibitions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    slug: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+def ensure_default_exhibition() -> None:
+    """Create the default exhibition (id 1) if the table is empty."""
+    if db.session.query(Exhibition.id).first() is None:
+        db.session.add(Exhibition(id=DEFAULT_EXHIBITION_ID, slug=DEFAULT_EXHIBITION_SLUG, name="Exhibición principal"))
+        db.session.commit()
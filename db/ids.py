@@ -0,0 +1,76 @@
+"""Time-ordered user ids and their compact storage.
+
+``usuarios.id`` is the primary key of ``usuarios`` and the leading column of
+the progress tables' keys (``usuarios_rooms``, ``usuarios_hints``) and of the
+session/reset/event foreign keys. Random ``uuid4`` values land anywhere in
+those InnoDB B-trees, so every new user splits pages all over the index.
+
+* :func:`uuid7` (RFC 9562) starts with a 48-bit millisecond timestamp, so new
+  ids sort after existing ones and their rows append at the end of the index.
+  A 12-bit counter keeps ids from one process increasing within the same
+  millisecond; the remaining 62 bits are random.
+* :class:`BinaryUuid` stores the value as ``BINARY(16)`` on MySQL (instead of
+  the 32-character hex ``CHAR`` of ``sqlalchemy.Uuid``), halving key size in
+  every index that carries it. Other backends keep the generic ``Uuid``.
+
+Existing databases are converted with ``scripts/migrate_uuid7.py``.
+"""
+
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+import uuid
+
+from sqlalchemy import types
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+_COUNTER_MAX = 0xFFF
+
+
+def uuid7() -> uuid.UUID:
+    """A version 7 UUID, increasing within this process."""
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # start low in the 12-bit space so a burst has room to count up
+            _counter = secrets.randbits(10)
+        else:
+            # same millisecond (or the clock stepped back): count up, and
+            # borrow the next millisecond once the counter is exhausted
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+    value = (ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | secrets.randbits(62)
+    return uuid.UUID(int=value)
+
+
+class BinaryUuid(types.TypeDecorator):
+    """``uuid.UUID`` column stored as BINARY(16) on MySQL, ``Uuid`` elsewhere."""
+
+    impl = types.Uuid
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(types.BINARY(16))
+        return dialect.type_descriptor(types.Uuid())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "mysql":
+            return value
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != "mysql":
+            return value
+        return uuid.UUID(bytes=bytes(value))
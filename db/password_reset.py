@@ -1,22 +1,29 @@
 from __future__ import annotations
 
-from typing import Optional
-
-from sqlalchemy import String, DateTime, Boolean, ForeignKey
+from sqlalchemy import String, DateTime, Integer, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
+from db.ids import BinaryUuid
 from db.init import db
 import uuid
 from datetime import datetime
 
 
 class PasswordReset(db.Model):
-    __tablename__ = "password_resets"
+    """A user's single active password reset code (see services/reset_codes.py).
+
+    Keyed by user, so ``/auth/forgot`` replaces the previous code and
+    verification is a primary-key lookup. Only a keyed hash of the code is
+    stored; failed attempts are counted on the row.
+    """
+
+    __tablename__ = "password_reset_codes"
 
-    id: Mapped[uuid.UUID] = mapped_column(db.types.Uuid, primary_key=True, default=uuid.uuid4)
-    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("usuarios.id"), nullable=False)
-    code: Mapped[str] = mapped_column(String(6), nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    used: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(BinaryUuid, ForeignKey("usuarios.id", ondelete="CASCADE"),
+                                              primary_key=True)
+    code_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
 
     def is_valid(self) -> bool:
-        return (not self.used) and (self.expires_at > datetime.utcnow())
+        return self.expires_at > datetime.utcnow()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from sqlalchemy import BigInteger, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from db.ids import BinaryUuid
+from db.init import db
+
+HINT_COMPLETED = "hint_completed"
+ROOM_COMPLETED = "room_completed"
+ROOM_UNLOCKED = "room_unlocked"
+
+
+class ProgressEvent(db.Model):
+    """Append-only log of progress changes (hint/room completions, unlocks).
+
+    Rows are written in the same transaction as the change they describe; the
+    autoincrement id doubles as the cursor for dashboards.
+    """
+
+    __tablename__ = "progress_events"
+
+    # BIGINT on MySQL; SQLite only autoincrements INTEGER primary keys
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    usuario_id: Mapped[uuid.UUID] = mapped_column(
+        BinaryUuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    room_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    hint_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_points: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
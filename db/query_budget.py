@@ -0,0 +1,110 @@
+"""SQL statement counting and per-route query budgets.
+
+``query_budget(n)`` records the maximum number of statements a view may run
+(auth loader included), the same way ``read_only`` marks replica-safe views.
+With ``QUERY_BUDGET_ENFORCE`` on (tests, local profiling) every request is
+counted, the count is returned in ``X-Query-Count``, and a view that goes over
+its budget fails with ``QueryBudgetExceeded``. Off (the default) nothing is
+registered and the decorator only sets an attribute.
+
+``count_queries()`` counts the statements run by the current thread inside a
+``with`` block, for scripts and benchmarks.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import g, request
+
+_local = threading.local()
+_listening = False
+_listen_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, endpoint: str, count: int, budget: int):
+        super().__init__(f"{endpoint} ran {count} SQL statements (budget {budget})")
+        self.endpoint = endpoint
+        self.count = count
+        self.budget = budget
+
+
+def query_budget(n: int):
+    """Declare how many SQL statements a view may run per request."""
+    def decorator(view):
+        view._query_budget = n
+        return view
+    return decorator
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, "counters", ()):
+        counter[0] += 1
+
+
+def _ensure_listener() -> None:
+    global _listening
+    with _listen_lock:
+        if not _listening:
+            # on the Engine class so replica binds are counted too
+            sa.event.listen(sa.engine.Engine, "before_cursor_execute", _on_execute)
+            _listening = True
+
+
+def _push() -> list:
+    counter = [0]
+    if not hasattr(_local, "counters"):
+        _local.counters = []
+    _local.counters.append(counter)
+    return counter
+
+
+def _pop(counter: list) -> None:
+    try:
+        _local.counters.remove(counter)
+    except (AttributeError, ValueError):
+        pass
+
+
+@contextmanager
+def count_queries():
+    """Yield a one-item list holding the number of statements run so far."""
+    _ensure_listener()
+    counter = _push()
+    try:
+        yield counter
+    finally:
+        _pop(counter)
+
+
+def init_query_budget(app) -> None:
+    app.config.setdefault("QUERY_BUDGET_ENFORCE", False)
+    if not app.config["QUERY_BUDGET_ENFORCE"]:
+        return
+    _ensure_listener()
+
+    @app.before_request
+    def _start_counting():
+        g._query_counter = _push()
+
+    @app.after_request
+    def _check_budget(response):
+        counter = g.pop("_query_counter", None)
+        if counter is None:
+            return response
+        _pop(counter)
+        response.headers["X-Query-Count"] = str(counter[0])
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, "_query_budget", None)
+        if budget is not None and counter[0] > budget and response.status_code < 500:
+            raise QueryBudgetExceeded(request.endpoint, counter[0], budget)
+        return response
+
+    @app.teardown_request
+    def _stop_counting(exc):
+        counter = g.pop("_query_counter", None)
+        if counter is not None:
+            _pop(counter)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from sqlalchemy import String, Boolean, DateTime, Index
+from sqlalchemy import types as sa_types
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from db.ids import BinaryUuid
+from db.init import db
+
+
+class RefreshToken(db.Model):
+    __tablename__ = "refresh_tokens"
+    __table_args__ = (Index("ix_refresh_tokens_usuario_revoked", "usuario_id", "revoked"),)
+
+    # store only the sha256 hex of the token
+    token_hash: Mapped[str] = mapped_column(String(128), primary_key=True)
+    # every rotation of one login shares a family; reuse revokes the whole family
+    family_id: Mapped[uuid.UUID] = mapped_column(sa_types.Uuid, nullable=False, index=True)
+    usuario_id: Mapped[uuid.UUID] = mapped_column(
+        BinaryUuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False
+    )
+    remember: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # set when the token is exchanged; a second exchange is a reuse
+    used_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    revoked: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    usuario = relationship("Usuario", backref="refresh_tokens")
@@ -1,21 +1,37 @@
 from __future__ import annotations
 
 from typing import Optional
+import uuid
 
 from sqlalchemy import Integer, String, Boolean
-from sqlalchemy import types as sa_types
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from db.ids import BinaryUuid
 from db.init import db
+from db.exhibition import DEFAULT_EXHIBITION_ID
+
+
+def _exhibition_fk():
+    # server_default lets existing rows (pre-exhibition databases) land in the default one
+    return mapped_column(
+        Integer,
+        db.ForeignKey("exhibitions.id", ondelete="CASCADE"),
+        nullable=False,
+        default=DEFAULT_EXHIBITION_ID,
+        server_default=str(DEFAULT_EXHIBITION_ID),
+    )
 
 
 # Association object for usuarios <-> rooms with per-user metadata
 class UsuarioRoom(db.Model):
     __tablename__ = "usuarios_rooms"
+    __table_args__ = (db.Index("ix_usuarios_rooms_exhibition_user", "exhibition_id", "usuario_id"),)
 
-    usuario_id: Mapped[sa_types.Uuid] = mapped_column(
-        sa_types.Uuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True
+    usuario_id: Mapped[uuid.UUID] = mapped_column(
+        BinaryUuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True
     )
     room_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True)
+    # denormalized from the room so per-exhibition progress reads stay on one index
+    exhibition_id: Mapped[int] = _exhibition_fk()
     # per-user flags
     completed: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     is_unlocked: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
@@ -27,31 +43,44 @@ class UsuarioRoom(db.Model):
 
 class Room(db.Model):
     __tablename__ = "rooms"
+    __table_args__ = (db.Index("ix_rooms_exhibition_position", "exhibition_id", "position"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    exhibition_id: Mapped[int] = _exhibition_fk()
+    # unlock order within the exhibition (ties broken by id)
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     final_code: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    # how the room is completed: "final_code", "all_hints" or "any"; NULL keeps the
+    # legacy behaviour (entry rooms with a final code accept both, others need all hints)
+    completion_mode: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    # "all" (every prerequisite completed) or "any" (one is enough); see RoomPrerequisite
+    unlock_rule: Mapped[str] = mapped_column(String(8), nullable=False, default="all", server_default="all")
     # convenience many-to-many to usuarios (via usuarios_rooms table)
     usuarios: Mapped[list] = relationship(
         "Usuario",
         secondary="usuarios_rooms",
         back_populates="rooms",
-        lazy="selectin",
+        lazy="select",
     )
 
     # access to the association objects for per-user metadata
-    room_users: Mapped[list[UsuarioRoom]] = relationship("UsuarioRoom", back_populates="room", lazy="selectin")
+    room_users: Mapped[list[UsuarioRoom]] = relationship("UsuarioRoom", back_populates="room", lazy="select")
 
 
 class Hint(db.Model):
     __tablename__ = "hints"
+    __table_args__ = (db.Index("ix_hints_exhibition_room", "exhibition_id", "room_id"),)
 
     # use integer autoincrement id for easier management
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     room_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False)
+    exhibition_id: Mapped[int] = _exhibition_fk()
     title: Mapped[str] = mapped_column(String(200), nullable=False)
-    image_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
-    lime_survey_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    # relative paths only; hosts come from FILES_HOST / LIME_SURVEY_HOST config
+    # (services/catalog.py). Column names are kept for existing databases.
+    image_path: Mapped[Optional[str]] = mapped_column("image_url", String(500), nullable=True)
+    lime_survey_path: Mapped[Optional[str]] = mapped_column("lime_survey_url", String(500), nullable=True)
     room: Mapped[Optional[Room]] = relationship("Room", backref="hints", lazy="selectin")
     access_code: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
 
@@ -59,12 +88,31 @@ class Hint(db.Model):
 # Association table for per-user hint completion
 class UsuarioHint(db.Model):
     __tablename__ = "usuarios_hints"
+    __table_args__ = (db.Index("ix_usuarios_hints_exhibition_user", "exhibition_id", "usuario_id"),)
 
-    usuario_id: Mapped[sa_types.Uuid] = mapped_column(
-        sa_types.Uuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True
+    usuario_id: Mapped[uuid.UUID] = mapped_column(
+        BinaryUuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True
     )
     hint_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("hints.id", ondelete="CASCADE"), primary_key=True)
+    exhibition_id: Mapped[int] = _exhibition_fk()
     completed: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
 
     usuario = relationship("Usuario", backref="usuario_hints")
     hint = relationship("Hint", backref="hint_users")
+
+
+class RoomPrerequisite(db.Model):
+    """Edge of the unlock graph: ``room_id`` requires ``requires_room_id``.
+
+    An exhibition without any edges unlocks its rooms linearly by position.
+    The graph is compiled into the in-process catalog (services/catalog.py).
+    """
+
+    __tablename__ = "room_prerequisites"
+    __table_args__ = (db.Index("ix_room_prerequisites_exhibition", "exhibition_id", "room_id"),)
+
+    room_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True)
+    requires_room_id: Mapped[int] = mapped_column(
+        Integer, db.ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True
+    )
+    exhibition_id: Mapped[int] = _exhibition_fk()
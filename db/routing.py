@@ -0,0 +1,218 @@
+"""Read-replica routing for ``db.session``.
+
+Replica URIs are configured as extra SQLAlchemy binds (``replica_0``,
+``replica_1``, ...). Views decorated with :func:`read_only` send their
+SELECTs to a replica; everything else, every flush/DML statement, and any
+request from a user inside a read-your-writes window after one of their own
+writes goes to the primary (the window is tracked in the app cache, so it
+spans workers when the cache has a shared tier). A replica whose lag exceeds
+``REPLICA_MAX_LAG_SECONDS`` is skipped until a later probe sees it caught up.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import g, has_app_context, has_request_context, current_app, request
+from flask_sqlalchemy.session import Session
+
+from services.cache import get_cache
+
+REPLICA_BIND_PREFIX = "replica_"
+
+
+def read_only(view):
+    """Mark a view as safe to serve from a read replica."""
+    view._db_read_only = True
+    return view
+
+
+def replica_binds(uris) -> dict:
+    """Build the SQLALCHEMY_BINDS entries for a list of replica URIs."""
+    return {f"{REPLICA_BIND_PREFIX}{i}": uri for i, uri in enumerate(uris) if uri}
+
+
+def mysql_lag_probe(connection) -> float | None:
+    """Seconds behind the source as reported by the replica (None if unknown)."""
+    for stmt, column in (
+        ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+        ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+    ):
+        try:
+            row = connection.exec_driver_sql(stmt).mappings().first()
+        except Exception:
+            continue
+        if row is None:
+            # not configured as a replica
+            return None
+        value = row.get(column)
+        return float(value) if value is not None else None
+    return None
+
+
+def default_lag_probe(connection) -> float | None:
+    if connection.dialect.name == "mysql":
+        return mysql_lag_probe(connection)
+    # other backends (e.g. SQLite files in tests) have no replication status
+    return 0.0
+
+
+class ReplicaSet:
+    """Round-robin over healthy replicas with a cached lag measurement per bind."""
+
+    def __init__(self, bind_keys, max_lag: float, check_interval: float, probe=None):
+        self.bind_keys = list(bind_keys)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.probe = probe or default_lag_probe
+        self._cycle = itertools.cycle(self.bind_keys) if self.bind_keys else None
+        self._lag = {}
+        self._lock = threading.Lock()
+
+    def lag(self, key: str, engine) -> float | None:
+        now = time.monotonic()
+        cached = self._lag.get(key)
+        if cached is not None and now - cached[1] < self.check_interval:
+            return cached[0]
+        try:
+            with engine.connect() as conn:
+                lag = self.probe(conn)
+        except Exception:
+            lag = None
+        self._lag[key] = (lag, now)
+        return lag
+
+    def is_healthy(self, key: str, engine) -> bool:
+        lag = self.lag(key, engine)
+        return lag is not None and lag <= self.max_lag
+
+    def pick(self, engines):
+        """Return a healthy replica engine, or None to fall back to the primary."""
+        if self._cycle is None:
+            return None
+        for _ in range(len(self.bind_keys)):
+            with self._lock:
+                key = next(self._cycle)
+            engine = engines.get(key)
+            if engine is not None and self.is_healthy(key, engine):
+                return engine
+        return None
+
+
+RECENT_WRITE_PREFIX = "ryw:"
+
+
+def mark_recent_writer(user_id, window: float) -> None:
+    """Pin ``user_id``'s reads to the primary for ``window`` seconds.
+
+    The marker lives in the app cache, so with a shared tier (``CACHE_URL``)
+    every worker sees it and it expires on its own. It carries its own
+    deadline because local copies of shared entries can outlive their TTL.
+    """
+    if window > 0:
+        get_cache().set(f"{RECENT_WRITE_PREFIX}{user_id}", time.time() + window, ttl=window)
+        if has_request_context():
+            g._db_recent_writer = True
+
+
+def is_recent_writer(user_id) -> bool:
+    """True while ``user_id`` is inside its read-your-writes window (memoized per request)."""
+    memo = g.get("_db_recent_writer")
+    if memo is None:
+        until = get_cache().get(f"{RECENT_WRITE_PREFIX}{user_id}")
+        memo = until is not None and until > time.time()
+        g._db_recent_writer = memo
+    return memo
+
+
+def current_user_id():
+    """Id of the user already loaded for this request; never triggers the login loader."""
+    user = g.get("_login_user")
+    if user is None:
+        return None
+    # identity key, not user.id: after a commit the attribute is expired and
+    # reading it would reload the row
+    state = sa.inspect(user, raiseerr=False)
+    if state is not None and state.identity:
+        return state.identity[0]
+    return getattr(user, "id", None)
+
+
+class RoutingSession(Session):
+    """``db.session`` class that sends read-only request traffic to replicas."""
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._wrote = False
+        self._force_primary = 0
+
+    def _use_replica(self) -> bool:
+        if self._wrote or self._force_primary or not has_request_context():
+            return False
+        if not g.get("db_read_only"):
+            return False
+        uid = current_user_id()
+        return uid is None or not is_recent_writer(uid)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, sa.sql.expression.UpdateBase)
+            and self._use_replica()
+        ):
+            replicas = current_app.extensions.get("db_replicas")
+            if replicas is not None:
+                engine = replicas.pick(self._db.engines)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @contextmanager
+    def primary(self):
+        """Route every statement inside the block to the primary."""
+        self._force_primary += 1
+        try:
+            yield self
+        finally:
+            self._force_primary -= 1
+
+    def commit(self):
+        had_writes = bool(self.new or self.dirty or self.deleted) or self._wrote
+        super().commit()
+        if had_writes and has_app_context():
+            uid = current_user_id() if has_request_context() else None
+            if uid is not None:
+                mark_recent_writer(uid, float(current_app.config.get("READ_YOUR_WRITES_WINDOW", 0)))
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    # bookkeeping writes made inside primary() (e.g. token last_used) do not
+    # pin the rest of the request to the primary
+    if not session._force_primary:
+        session._wrote = True
+
+
+def init_replica_routing(app) -> None:
+    """Register the replica set and the per-request read-only flag."""
+    app.config.setdefault("REPLICA_MAX_LAG_SECONDS", 5.0)
+    app.config.setdefault("REPLICA_LAG_CHECK_INTERVAL", 5.0)
+    app.config.setdefault("READ_YOUR_WRITES_WINDOW", 10.0)
+
+    keys = sorted(k for k in (app.config.get("SQLALCHEMY_BINDS") or {}) if k.startswith(REPLICA_BIND_PREFIX))
+    app.extensions["db_replicas"] = ReplicaSet(
+        keys,
+        max_lag=float(app.config["REPLICA_MAX_LAG_SECONDS"]),
+        check_interval=float(app.config["REPLICA_LAG_CHECK_INTERVAL"]),
+        probe=app.config.get("REPLICA_LAG_PROBE"),
+    )
+
+    @app.before_request
+    def _flag_read_only_request():
+        view = app.view_functions.get(request.endpoint)
+        g.db_read_only = request.method in ("GET", "HEAD") and getattr(view, "_db_read_only", False)
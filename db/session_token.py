@@ -1,19 +1,22 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import String, Boolean, DateTime
-from sqlalchemy import types as sa_types
+import uuid
+from sqlalchemy import String, Boolean, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from db.ids import BinaryUuid
 from db.init import db
 
 
 class SessionToken(db.Model):
     __tablename__ = "session_tokens"
+    # per-user cap and bulk revocation (services/sessions.py)
+    __table_args__ = (Index("ix_session_tokens_usuario_revoked", "usuario_id", "revoked"),)
 
     # store only the sha256 hex of the token
     token_hash: Mapped[str] = mapped_column(String(128), primary_key=True)
-    usuario_id: Mapped[sa_types.Uuid] = mapped_column(
-        sa_types.Uuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False
+    usuario_id: Mapped[uuid.UUID] = mapped_column(
+        BinaryUuid, db.ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False
     )
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -0,0 +1,97 @@
+"""SQLite profile for local development and tests.
+
+Production runs on MySQL. Pointing ``SQLALCHEMY_DATABASE_URI`` at SQLite
+gives a setup with no external services:
+
+* file database (``sqlite:///museo.db``, relative to ``instance/``): WAL
+  journal, so readers never block the writer, plus ``synchronous=NORMAL``
+  (durable in WAL mode) and a busy timeout instead of immediate "database
+  is locked" errors
+* shared in-memory database
+  (``sqlite:///file:/museo?mode=memory&cache=shared&uri=true``): one
+  database per name, visible to every thread of the process, for scripts
+  and benchmarks. ``init_sqlite`` keeps a connection open so the database
+  lives as long as the app, not just as long as the pool's connections.
+  Shared-cache connections lock whole tables and ``busy_timeout`` does not
+  retry those locks, so concurrent requests are better served by a file
+  (the test suite uses a temporary file per app).
+
+Foreign keys are enforced on every SQLite connection, like on MySQL, so
+``ON DELETE CASCADE`` and missing parents behave the same in both.
+``SQLITE_PRAGMAS`` adds or overrides pragmas.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+import sqlalchemy as sa
+
+from db.init import db
+
+FILE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    # negative = KiB
+    "cache_size": -20000,
+}
+
+MEMORY_PRAGMAS = {
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+}
+
+
+def is_memory_url(url: sa.engine.URL) -> bool:
+    return not url.database or url.database == ":memory:" or url.query.get("mode") == "memory"
+
+
+def _pragma_listener(pragmas: dict):
+    def set_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def _keepalive(url: sa.engine.URL):
+    query = "&".join(f"{k}={v}" for k, v in url.query.items() if k != "uri")
+    return sqlite3.connect(f"{url.database}?{query}", uri=True, check_same_thread=False)
+
+
+def apply_sqlite_options(app) -> None:
+    """Engine options for an in-memory SQLite URI; call before ``db.init_app``.
+
+    File databases already get a thread-agnostic pool from SQLAlchemy. Memory
+    URIs keep pysqlite's same-thread check, which the async mode's loop
+    thread would trip.
+    """
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if not uri:
+        return
+    url = sa.engine.make_url(uri)
+    if url.get_backend_name() != "sqlite" or not is_memory_url(url):
+        return
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    options.setdefault("connect_args", {}).setdefault("check_same_thread", False)
+
+
+def init_sqlite(app) -> None:
+    """Apply the SQLite profile to the app's SQLite engines (no-op on MySQL)."""
+    app.config.setdefault("SQLITE_PRAGMAS", {})
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name != "sqlite":
+            continue
+        memory = is_memory_url(engine.url)
+        pragmas = {**(MEMORY_PRAGMAS if memory else FILE_PRAGMAS), **app.config["SQLITE_PRAGMAS"]}
+        sa.event.listen(engine, "connect", _pragma_listener(pragmas))
+        if memory and engine.url.query.get("uri"):
+            app.extensions.setdefault("sqlite_keepalive", []).append(_keepalive(engine.url))
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from db.init import db
+
+
+class RoomStats(db.Model):
+    """Per-room funnel counters, maintained incrementally (see services/stats.py).
+
+    ``scripts/rebuild_stats.py`` recomputes them from the raw progress tables.
+    """
+
+    __tablename__ = "room_stats"
+
+    room_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("rooms.id", ondelete="CASCADE"), primary_key=True)
+    unlocked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    hints_completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    points_awarded: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class HintStats(db.Model):
+    __tablename__ = "hint_stats"
+
+    hint_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("hints.id", ondelete="CASCADE"), primary_key=True)
+    room_id: Mapped[int] = mapped_column(Integer, db.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False, index=True)
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
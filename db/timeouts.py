@@ -0,0 +1,90 @@
+"""Connect, read and statement timeouts for the database engines.
+
+Without them a stalled MySQL server holds a request until gunicorn kills
+the worker. ``apply_db_timeouts`` (before ``db.init_app``) sets:
+
+* ``DB_CONNECT_TIMEOUT`` — TCP connect / handshake (pymysql ``connect_timeout``);
+* ``DB_READ_TIMEOUT`` — longest wait for a server reply on an open
+  connection (pymysql ``read_timeout``/``write_timeout``); the connection is
+  dropped and the statement fails with ``OperationalError``;
+* ``DB_STATEMENT_TIMEOUT`` — server-side limit for SELECTs
+  (``max_execution_time``), which aborts the query but keeps the connection;
+* ``DB_POOL_TIMEOUT`` — wait for a free pooled connection.
+
+SQLite has no server to time out. ``init_db_timeouts`` installs a progress
+handler that interrupts any statement running past ``DB_STATEMENT_TIMEOUT``,
+so the development profile and the tests fail the same way a slow MySQL
+does. All values are seconds; 0 disables one.
+"""
+
+from __future__ import annotations
+
+import time
+
+import sqlalchemy as sa
+
+from db.init import db
+
+# SQLite VM instructions between deadline checks
+PROGRESS_STEPS = 10000
+
+
+def apply_db_timeouts(app) -> None:
+    for key, default in (("DB_CONNECT_TIMEOUT", 3), ("DB_READ_TIMEOUT", 10),
+                         ("DB_STATEMENT_TIMEOUT", 5), ("DB_POOL_TIMEOUT", 5)):
+        app.config.setdefault(key, default)
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if not uri or sa.engine.make_url(uri).get_backend_name() != "mysql":
+        return
+
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    if app.config["DB_POOL_TIMEOUT"]:
+        options.setdefault("pool_timeout", float(app.config["DB_POOL_TIMEOUT"]))
+    connect_args = options.setdefault("connect_args", {})
+    if app.config["DB_CONNECT_TIMEOUT"]:
+        connect_args.setdefault("connect_timeout", int(app.config["DB_CONNECT_TIMEOUT"]))
+    if app.config["DB_READ_TIMEOUT"]:
+        connect_args.setdefault("read_timeout", int(app.config["DB_READ_TIMEOUT"]))
+        connect_args.setdefault("write_timeout", int(app.config["DB_READ_TIMEOUT"]))
+    if app.config["DB_STATEMENT_TIMEOUT"]:
+        ms = int(float(app.config["DB_STATEMENT_TIMEOUT"]) * 1000)
+        connect_args.setdefault("init_command", f"SET SESSION max_execution_time={ms}")
+
+
+def _sqlite_deadline(timeout: float) -> dict:
+    """Engine/pool listeners keeping a per-connection statement deadline."""
+
+    def on_connect(dbapi_conn, connection_record):
+        deadline = connection_record.info["statement_deadline"] = [None]
+        # returning true interrupts the running statement (OperationalError: interrupted)
+        dbapi_conn.set_progress_handler(lambda: deadline[0] is not None and time.monotonic() > deadline[0],
+                                        PROGRESS_STEPS)
+
+    def start(conn, cursor, statement, parameters, context, executemany):
+        deadline = conn.info.get("statement_deadline")
+        if deadline is not None:
+            deadline[0] = time.monotonic() + timeout
+
+    def clear(conn, *args):
+        # COMMIT/ROLLBACK do not pass through before_cursor_execute; never let
+        # a stale deadline interrupt them
+        deadline = conn.info.get("statement_deadline")
+        if deadline is not None:
+            deadline[0] = None
+
+    return {"connect": on_connect, "before_cursor_execute": start, "commit": clear, "rollback": clear,
+            "checkin": lambda dbapi_conn, record: clear(record)}
+
+
+def init_db_timeouts(app) -> None:
+    """Statement deadline for the app's SQLite engines (no-op on MySQL)."""
+    timeout = float(app.config.get("DB_STATEMENT_TIMEOUT") or 0)
+    if not timeout:
+        return
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name != "sqlite":
+            continue
+        for event, listener in _sqlite_deadline(timeout).items():
+            sa.event.listen(engine, event, listener)
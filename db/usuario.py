@@ -2,26 +2,38 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import String, types, Integer
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from flask_login import UserMixin
+from db.ids import BinaryUuid, uuid7
 from db.init import db
 import uuid
 from sqlalchemy import Boolean
 
 
+def normalize_email(email: Optional[str]) -> str:
+    """Lookup form of an email address: trimmed and lowercased."""
+    return (email or "").strip().lower()
+
+
 class Usuario(db.Model, UserMixin):
     __tablename__ = "usuarios"
+    # every email lookup goes through this index; being unique, it also decides
+    # concurrent signups for the same address (no check-then-insert)
+    __table_args__ = (db.Index("ux_usuarios_email_normalized", "email_normalized", unique=True),)
 
     def get_id(self) -> str:
         return str(self.id)
 
+    # time-ordered, BINARY(16) on MySQL (db/ids.py)
     id: Mapped[uuid.UUID] = mapped_column(
-        types.Uuid, primary_key=True, default=uuid.uuid4
+        BinaryUuid, primary_key=True, default=uuid7
     )
     nombre: Mapped[str] = mapped_column(String(50), nullable=False)
     apellido: Mapped[str] = mapped_column(String(50), nullable=False)
     email: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    # kept in step with email by _set_email_normalized
+    email_normalized: Mapped[str] = mapped_column(String(100), nullable=False)
     password: Mapped[str] = mapped_column(String(255), nullable=False)
     global_position: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     total_points: Mapped[Optional[int]] = mapped_column(
@@ -30,12 +42,19 @@ class Usuario(db.Model, UserMixin):
     role: Mapped[str] = mapped_column(String(50), nullable=False, default="USER")
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     # Many-to-many relationship: usuarios <-> rooms
+    # Collections load on access: the routes read progress through
+    # services.identity, and eager loading here cost ~4 queries per auth check.
     # A user can have access to many rooms and a room can be accessible by many users.
     rooms: Mapped[list] = relationship(
         "Room",
         secondary="usuarios_rooms",
         back_populates="usuarios",
-        lazy="selectin",
+        lazy="select",
     )
     # access to association objects for per-user room metadata
-    usuario_rooms: Mapped[list] = relationship("UsuarioRoom", back_populates="usuario", lazy="selectin")
+    usuario_rooms: Mapped[list] = relationship("UsuarioRoom", back_populates="usuario", lazy="select")
+
+    @validates("email")
+    def _set_email_normalized(self, key, value):
+        self.email_normalized = normalize_email(value)
+        return value
@@ -0,0 +1,95 @@
+"""Gunicorn settings for the sync API (``gunicorn main:app``).
+
+Gunicorn reads ./gunicorn.conf.py automatically; every value can be
+overridden from the environment (below) or the command line.
+
+* ``preload_app``: the master imports the app and warms the catalog once.
+  Workers are forked from it and share those pages copy-on-write.
+  ``post_fork`` drops the inherited DB connections (services/workers.py).
+* Workers and threads are derived from the CPUs available to the process,
+  including container CPU quotas. ``gthread`` workers keep long-lived SSE
+  streams (``/events/stream``) from blocking a whole process.
+* ``max_requests`` with jitter recycles workers gradually to bound memory
+  growth, without restarting them all at once.
+
+The async mode (``API_MODE=async``) runs under uvicorn instead; see asgi.py.
+"""
+
+import gc
+import math
+import os
+
+
+def _cpu_count() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # cgroup v2 quota ("max 100000" when unlimited)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+bind = os.getenv("GUNICORN_BIND") or f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+_cpus = _cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY") or min(2 * _cpus + 1, int(os.getenv("GUNICORN_MAX_WORKERS", "8"))))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread" if threads > 1 else "sync"
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+
+# heartbeat file on tmpfs; a disk-backed /tmp can stall workers under I/O load
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+errorlog = "-"
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+
+if preload_app:
+    # no collections in the master while the app is imported: freed objects
+    # would leave holes in pages the workers are about to share
+    gc.disable()
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from services.workers import warm_app
+
+        warm_app(server.app.wsgi())
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # keep the workers' collector off the master's objects, so gc does
+        # not write to (and un-share) their pages
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # unconditionally: GUNICORN_PRELOAD and --preload/--no-preload on the
+    # command line can disagree about whether the import above disabled it
+    gc.enable()
+    if server.cfg.preload_app:
+        from services.workers import after_fork
+
+        after_fork(server.app.wsgi())
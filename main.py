@@ -1,70 +1,107 @@
+from __future__ import annotations
+
 import os
-from flask import Flask
-try:
-    from flask_cors import CORS
-except Exception:
-    # In environments where flask-cors is not installed (CI/dev), fall back to a no-op
-    # so imports don't fail. Install Flask-Cors in production/dev environments.
-    CORS = lambda *a, **k: None
+from flask import Flask, current_app, jsonify
 from dotenv import load_dotenv
 from db.init import db
+from db.routing import init_replica_routing, replica_binds
+from db.query_budget import init_query_budget
+from db.sqlite import apply_sqlite_options, init_sqlite
+from db.timeouts import apply_db_timeouts, init_db_timeouts
 from db.usuario import Usuario
 from db.password_reset import PasswordReset
-from db.room import Room, Hint, UsuarioRoom, UsuarioHint
+from db.exhibition import Exhibition, ensure_default_exhibition
+from db.room import Room, Hint, RoomPrerequisite, UsuarioRoom, UsuarioHint
+from db.session_token import SessionToken
+from db.refresh_token import RefreshToken
+from db.progress_event import ProgressEvent
+from db.stats import RoomStats, HintStats
 from flask_login import LoginManager
+from services.json_provider import init_json
+from services.compression import init_compression
+from services.http_policy import init_http_policy
+from services.log import init_logging, logger
+from services.resilience import init_resilience
+from services.async_db import init_async_mode
+from services.cache import init_cache, get_cache
+from services.tokens import TokenUser, decode_signed_token, init_session_tokens, is_signed_token
+from services.events import init_events
+from services.tenancy import init_tenancy
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
-
-
-CORS(app) 
-
-# Init extensions
-db.init_app(app)
-login_manager = LoginManager()
-login_manager.init_app(app)
-
 
-@login_manager.request_loader
 def load_user_from_request(request):
     """Allow API clients to authenticate using Authorization: Bearer <sessionToken>.
 
-    The session token is an opaque random string issued at login. We store only
+    Signed tokens (SESSION_TOKEN_MODE=signed) are validated without the DB.
+    Otherwise the session token is an opaque random string issued at login. We store only
     the sha256 hash in `session_tokens` and validate by hashing the presented
-    token and looking it up (also checking expiry and revoked flag).
+    token and looking it up (also checking expiry and revoked flag). Valid
+    lookups are cached under ``session:<hash>`` (tagged ``user:<id>``) so
+    repeat calls skip the token query; logout and deactivation evict them.
+    Only with a shared cache tier, though: a local-only cache cannot tell
+    other workers about an eviction, so each request reads the token row.
     """
     auth = request.headers.get("Authorization")
     if not auth or not auth.startswith("Bearer "):
         return None
     raw = auth.split(" ", 1)[1].strip()
+    if is_signed_token(raw):
+        # stateless mode: signature, expiry and denylist only, no DB access
+        claims = decode_signed_token(raw)
+        return TokenUser(claims) if claims else None
+    # tokens and freshly registered users must be visible immediately, so the
+    # loader never reads from a replica
     try:
         import hashlib
+        import uuid as _uuid
         from db.session_token import SessionToken
         from datetime import datetime
 
         h = hashlib.sha256(raw.encode()).hexdigest()
-        st = SessionToken.query.filter_by(token_hash=h, revoked=False).first()
-        if not st:
-            return None
-        if st.expires_at < datetime.utcnow():
-            return None
-        # update last_used (best-effort)
-        try:
-            st.last_used = datetime.utcnow()
-            db.session.add(st)
-            db.session.commit()
-        except Exception:
-            try:
-                db.session.rollback()
-            except Exception:
-                pass
-        return Usuario.query.get(st.usuario_id)
+        cache = get_cache()
+        key = f"session:{h}"
+        now = datetime.utcnow()
+        cache_tokens = cache.shared is not None
+        entry = cache.get(key) if cache_tokens else None
+        with db.session().primary():
+            if entry is None:
+                st = SessionToken.query.filter_by(token_hash=h, revoked=False).first()
+                if not st:
+                    return None
+                if st.expires_at < now:
+                    return None
+                lu = st.last_used.isoformat() if st.last_used else None
+                entry = {"uid": str(st.usuario_id), "exp": st.expires_at.isoformat(), "lu": lu}
+            elif datetime.fromisoformat(entry["exp"]) < now:
+                cache.delete(key)
+                return None
+
+            # update last_used (best-effort), at most once per resolution window
+            resolution = current_app.config['SESSION_LAST_USED_RESOLUTION']
+            if entry["lu"] is None or (now - datetime.fromisoformat(entry["lu"])).total_seconds() >= resolution:
+                try:
+                    SessionToken.query.filter_by(token_hash=h).update({"last_used": now})
+                    db.session.commit()
+                    entry["lu"] = now.isoformat()
+                except Exception:
+                    logger.warning("could not update session last_used", exc_info=True)
+                    try:
+                        db.session.rollback()
+                    except Exception:
+                        pass
+            if cache_tokens:
+                ttl = (datetime.fromisoformat(entry["exp"]) - now).total_seconds()
+                cache.set(key, entry, ttl=min(ttl, current_app.config['SESSION_CACHE_TTL']),
+                          tags=(f"user:{entry['uid']}",))
+            user = db.session.get(Usuario, _uuid.UUID(entry["uid"]))
+            # deactivation revokes tokens too; this covers rows revoked by other means
+            return user if user is not None and user.is_active else None
     except Exception:
+        logger.exception("session token lookup failed")
         return None
 
-@login_manager.user_loader
+
 def load_user(user_id):
     try:
         import uuid as _uuid
@@ -76,26 +113,137 @@ def load_user(user_id):
         return Usuario.query.get(user_id)
 
 
-# For API clients, return JSON 401 instead of redirecting to a login page
-@login_manager.unauthorized_handler
 def unauthorized_callback():
-    from flask import jsonify
     return jsonify({'error': 'unauthorized'}), 401
 
 
-from controllers.auth import bp as auth_bp
-app.register_blueprint(auth_bp)
-from controllers.rooms import bp as rooms_bp
-app.register_blueprint(rooms_bp)
-from controllers.users import bp as users_bp
-app.register_blueprint(users_bp)
-
-with app.app_context():
-    # ensure models are imported so SQLAlchemy registers them before creating tables
-    db.create_all()
-    print("Database tables created.")
-
-
-@app.route('/healthz', methods=['GET'])
 def health_check():
-    return {"status": "healthy"}, 200
\ No newline at end of file
+    return {"status": "healthy"}, 200
+
+
+def create_app(config: dict | None = None) -> Flask:
+    """Build the API; ``config`` overrides the environment (tests, scripts)."""
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
+    # comma-separated read replica URIs; read-only GET routes are routed to them (db/routing.py)
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(
+        u.strip() for u in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',')
+    )
+    app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))
+    app.config['READ_YOUR_WRITES_WINDOW'] = float(os.getenv('READ_YOUR_WRITES_WINDOW', '10'))
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', '512'))
+    # 'sync' (default, gunicorn/flask run) or 'async' (ASGI server, see asgi.py)
+    app.config['API_MODE'] = os.getenv('API_MODE', 'sync')
+    app.config['ASYNC_DATABASE_URI'] = os.getenv('ASYNC_DATABASE_URI')
+    # hosts prepended to the relative hint paths stored in the DB (services/catalog.py)
+    app.config['FILES_HOST'] = os.getenv('FILES_HOST')
+    app.config['LIME_SURVEY_HOST'] = os.getenv('LIME_SURVEY_HOST')
+    app.config['CATALOG_TTL'] = float(os.getenv('CATALOG_TTL', '300'))
+    # exhibition used when a request sends no X-Exhibition header / ?exhibition= (slug)
+    app.config['DEFAULT_EXHIBITION'] = os.getenv('DEFAULT_EXHIBITION', 'default')
+    # shared cache tier: redis://host:6379/0, memory:// (in-process fake) or empty (local LRU only)
+    app.config['CACHE_URL'] = os.getenv('CACHE_URL') or None
+    app.config['SESSION_CACHE_TTL'] = float(os.getenv('SESSION_CACHE_TTL', '300'))
+    app.config['SESSION_LAST_USED_RESOLUTION'] = float(os.getenv('SESSION_LAST_USED_RESOLUTION', '60'))
+    # 'db' (opaque token looked up in session_tokens) or 'signed' (stateless, see services/tokens.py)
+    app.config['SESSION_TOKEN_MODE'] = os.getenv('SESSION_TOKEN_MODE', 'db')
+    app.config['SESSION_TOKEN_LIFETIME'] = int(os.getenv('SESSION_TOKEN_LIFETIME', '3600'))
+    # active DB session tokens per user; logging in past it revokes the oldest (0 = no cap)
+    app.config['MAX_SESSIONS_PER_USER'] = int(os.getenv('MAX_SESSIONS_PER_USER', '10'))
+    # refresh token lifetime in seconds, without / with rememberMe
+    app.config['REFRESH_TOKEN_LIFETIME'] = int(os.getenv('REFRESH_TOKEN_LIFETIME', str(24 * 3600)))
+    app.config['REFRESH_TOKEN_REMEMBER_LIFETIME'] = int(os.getenv('REFRESH_TOKEN_REMEMBER_LIFETIME', str(30 * 24 * 3600)))
+    # password reset codes: lifetime in seconds and wrong guesses allowed per code
+    app.config['RESET_CODE_LIFETIME'] = int(os.getenv('RESET_CODE_LIFETIME', str(15 * 60)))
+    app.config['RESET_CODE_MAX_ATTEMPTS'] = int(os.getenv('RESET_CODE_MAX_ATTEMPTS', '5'))
+    # seconds; bound DB waits (connect, reply, SELECT runtime, free pool slot) so requests fail instead of hanging
+    app.config['DB_CONNECT_TIMEOUT'] = float(os.getenv('DB_CONNECT_TIMEOUT', '3'))
+    app.config['DB_READ_TIMEOUT'] = float(os.getenv('DB_READ_TIMEOUT', '10'))
+    app.config['DB_STATEMENT_TIMEOUT'] = float(os.getenv('DB_STATEMENT_TIMEOUT', '5'))
+    app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+    # circuit breakers (database, smtp): open at this failure share over the window, probe again after the reset
+    app.config['BREAKER_FAILURE_RATE'] = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))
+    app.config['BREAKER_MIN_CALLS'] = int(os.getenv('BREAKER_MIN_CALLS', '10'))
+    app.config['BREAKER_WINDOW'] = float(os.getenv('BREAKER_WINDOW', '30'))
+    app.config['BREAKER_RESET_TIMEOUT'] = float(os.getenv('BREAKER_RESET_TIMEOUT', '15'))
+    # JSON logs on stdout from a background thread; successful requests are sampled, errors/slow ones always logged
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO')
+    app.config['LOG_SAMPLE_RATE'] = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+    app.config['LOG_SLOW_MS'] = float(os.getenv('LOG_SLOW_MS', '500'))
+    app.config['LOG_QUEUE_SIZE'] = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # Idempotency-Key: how long responses are replayed, how long a duplicate waits for the first, claim expiry
+    app.config['IDEMPOTENCY_TTL'] = float(os.getenv('IDEMPOTENCY_TTL', '3600'))
+    app.config['IDEMPOTENCY_WAIT'] = float(os.getenv('IDEMPOTENCY_WAIT', '10'))
+    app.config['IDEMPOTENCY_LOCK_TTL'] = float(os.getenv('IDEMPOTENCY_LOCK_TTL', '30'))
+    # progress event stream: how often each process polls for events from other workers, SSE keep-alive
+    app.config['EVENTS_POLL_INTERVAL'] = float(os.getenv('EVENTS_POLL_INTERVAL', '2'))
+    app.config['EVENTS_HEARTBEAT'] = float(os.getenv('EVENTS_HEARTBEAT', '15'))
+    # count SQL per request (X-Query-Count) and fail views over their @query_budget; tests/profiling only
+    app.config['QUERY_BUDGET_ENFORCE'] = os.getenv('QUERY_BUDGET_ENFORCE', '').lower() in ('1', 'true', 'yes')
+    # CORS: comma-separated allowed origins (* = any) and how long browsers may cache a preflight
+    app.config['FRONTEND_ORIGIN'] = os.getenv('FRONTEND_ORIGIN') or '*'
+    app.config['CORS_MAX_AGE'] = int(os.getenv('CORS_MAX_AGE', str(24 * 3600)))
+    if config:
+        app.config.update(config)
+
+    # first before_request: preflights are answered before tenancy/auth/DB hooks
+    init_http_policy(app)
+    init_logging(app)
+    init_json(app)
+    init_compression(app)
+
+    # Init extensions
+    apply_sqlite_options(app)
+    apply_db_timeouts(app)
+    db.init_app(app)
+    init_sqlite(app)
+    init_db_timeouts(app)
+    # before any hook that queries: an open database breaker rejects the request first
+    init_resilience(app)
+    init_query_budget(app)
+    init_replica_routing(app)
+    init_tenancy(app)
+    init_cache(app)
+    init_session_tokens(app)
+    init_events(app)
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.request_loader(load_user_from_request)
+    login_manager.user_loader(load_user)
+    # For API clients, return JSON 401 instead of redirecting to a login page
+    login_manager.unauthorized_handler(unauthorized_callback)
+
+    from controllers.auth import bp as auth_bp
+    app.register_blueprint(auth_bp)
+    from controllers.rooms import bp as rooms_bp
+    app.register_blueprint(rooms_bp)
+    from controllers.users import bp as users_bp
+    app.register_blueprint(users_bp)
+    from controllers.events import bp as events_bp
+    app.register_blueprint(events_bp)
+    from controllers.stats import bp as stats_bp
+    app.register_blueprint(stats_bp)
+    from controllers.exhibitions import bp as exhibitions_bp
+    app.register_blueprint(exhibitions_bp)
+    from controllers.catalog import bp as catalog_bp
+    app.register_blueprint(catalog_bp)
+    init_async_mode(app)
+    app.add_url_rule('/healthz', view_func=health_check, methods=['GET'])
+
+    with app.app_context():
+        # ensure models are imported so SQLAlchemy registers them before creating tables
+        db.create_all()
+        ensure_default_exhibition()
+        logger.info("Database tables created.")
+    return app
+
+
+def __getattr__(name):
+    # `main:app` (gunicorn, flask run, asgi.py, scripts) builds the
+    # environment-configured app on first access; tests call create_app()
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -11,14 +11,14 @@ if ROOT not in sys.path:
 
 from main import app
 from db.init import db
+from db.ids import uuid7
 from db.usuario import Usuario
 from werkzeug.security import generate_password_hash
-import uuid
 
 with app.app_context():
-    if not Usuario.query.filter_by(email='admin@example.com').first():
+    if not Usuario.query.filter_by(email_normalized='admin@example.com').first():
         u = Usuario(
-            id=uuid.uuid4(),
+            id=uuid7(),
             nombre='Admin',
             apellido='User',
             email='admin@example.com',
@@ -0,0 +1,130 @@
+"""Upgrade an existing database in place.
+
+``db.create_all()`` creates new tables but never alters existing ones. This
+script adds the columns introduced since:
+
+* ``exhibition_id`` on rooms, hints, usuarios_rooms and usuarios_hints
+  (existing rows go to the default exhibition, id 1) and the composite
+  indexes led by it;
+* ``rooms.position``, initialised from the old id order;
+* ``rooms.completion_mode`` / ``rooms.unlock_rule`` for the unlock graph
+  (NULL / "all" keep the old behaviour).
+
+``session_tokens`` gets its ``(usuario_id, revoked)`` index, used by the
+session cap and bulk revocation.
+
+``usuarios.email_normalized`` (trimmed, lowercased email) is added and filled
+in, then gets its unique index. Addresses that only differ in case or spaces
+are listed and stop the migration until they are merged or renamed.
+
+It also drops ``password_resets``, replaced by ``password_reset_codes``
+(codes live 15 minutes, so only in-flight resets are lost).
+
+It is safe to run repeatedly.
+
+Run with:
+    python scripts/migrate_db.py
+"""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import inspect, text
+
+from main import app
+from db.init import db
+from db.exhibition import DEFAULT_EXHIBITION_ID, ensure_default_exhibition
+from db.usuario import normalize_email
+
+SCOPED_TABLES = ("rooms", "hints", "usuarios_rooms", "usuarios_hints")
+# tables whose model indexes are created when missing
+INDEXED_TABLES = SCOPED_TABLES + ("session_tokens", "usuarios")
+LEGACY_TABLES = ("password_resets",)
+# (table, column, DDL) added when missing
+ROOM_COLUMNS = (
+    ("rooms", "completion_mode", "VARCHAR(16) NULL"),
+    ("rooms", "unlock_rule", "VARCHAR(8) NOT NULL DEFAULT 'all'"),
+)
+
+
+def _columns(table: str) -> set:
+    return {c["name"] for c in inspect(db.engine).get_columns(table)}
+
+
+def _fill_email_normalized(conn, dialect: str) -> None:
+    if "email_normalized" not in _columns("usuarios"):
+        conn.execute(text("ALTER TABLE usuarios ADD COLUMN email_normalized VARCHAR(100) NULL"))
+        print("Added usuarios.email_normalized")
+    rows = conn.execute(text("SELECT id, email, email_normalized FROM usuarios")).all()
+    seen, duplicates = set(), set()
+    for row in rows:
+        normalized = row.email_normalized or normalize_email(row.email)
+        (duplicates if normalized in seen else seen).add(normalized)
+    if duplicates:
+        raise SystemExit("Emails differing only in case/spaces, merge or rename them and re-run: "
+                         + ", ".join(sorted(duplicates)))
+    pending = [{"id": row.id, "normalized": normalize_email(row.email)} for row in rows if row.email_normalized is None]
+    if pending:
+        conn.execute(text("UPDATE usuarios SET email_normalized = :normalized WHERE id = :id"), pending)
+        print(f"Normalized {len(pending)} emails")
+    if dialect == "mysql":
+        conn.execute(text("ALTER TABLE usuarios MODIFY email_normalized VARCHAR(100) NOT NULL"))
+
+
+def migrate() -> None:
+    db.create_all()
+    ensure_default_exhibition()
+    dialect = db.engine.dialect.name
+
+    with db.engine.begin() as conn:
+        for table in SCOPED_TABLES:
+            if "exhibition_id" in _columns(table):
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN exhibition_id INTEGER NOT NULL DEFAULT {DEFAULT_EXHIBITION_ID}"
+            ))
+            if dialect == "mysql":
+                # SQLite cannot add constraints to an existing table; the column still works without it
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD CONSTRAINT fk_{table}_exhibition "
+                    f"FOREIGN KEY (exhibition_id) REFERENCES exhibitions (id) ON DELETE CASCADE"
+                ))
+            print(f"Added {table}.exhibition_id")
+
+        if "position" not in _columns("rooms"):
+            conn.execute(text("ALTER TABLE rooms ADD COLUMN position INTEGER NOT NULL DEFAULT 0"))
+            # keep the old unlock order (next room = next id)
+            conn.execute(text("UPDATE rooms SET position = id"))
+            print("Added rooms.position")
+
+        for table, column, ddl in ROOM_COLUMNS:
+            if column not in _columns(table):
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                print(f"Added {table}.{column}")
+
+        _fill_email_normalized(conn, dialect)
+
+    present = set(inspect(db.engine).get_table_names())
+    with db.engine.begin() as conn:
+        for table in LEGACY_TABLES:
+            if table in present:
+                conn.execute(text(f"DROP TABLE {table}"))
+                print(f"Dropped {table}")
+
+    for table in INDEXED_TABLES:
+        existing = {ix["name"] for ix in inspect(db.engine).get_indexes(table)}
+        for index in db.metadata.tables[table].indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                print(f"Created index {index.name}")
+
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        migrate()
@@ -0,0 +1,32 @@
+"""Convert existing user ids to UUIDv7 and, on MySQL, to BINARY(16) columns.
+
+Run once, with the API stopped, after deploying the BinaryUuid models
+(see services/id_migration.py); it is safe to interrupt and run again:
+    python scripts/migrate_uuid7.py --chunk 1000
+Then clear the shared cache (CACHE_URL) before starting the API.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from main import app
+from services.id_migration import convert_storage, reassign_user_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk", type=int, default=1000, help="rows/users per transaction")
+    parser.add_argument("--storage-only", action="store_true", help="convert MySQL columns, keep the ids")
+    args = parser.parse_args()
+
+    with app.app_context():
+        start = time.perf_counter()
+        rows = convert_storage(chunk=args.chunk * 5)
+        users = 0 if args.storage_only else reassign_user_ids(chunk=args.chunk)
+        print(f"Converted {rows} stored ids, reassigned {users} users in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,192 @@
+"""Export and restore user progress tables as a compressed NDJSON snapshot.
+
+Rows are read with a server-side cursor (``stream_results``) and written one
+JSON array per line under a per-table column header, so memory stays flat no
+matter how large the tables are. Restore reads the file line by line and
+inserts in chunks with ``executemany``.
+
+Compression is picked from the file name: ``.zst`` (needs the optional
+``zstandard`` package), ``.gz`` (stdlib) or uncompressed otherwise.
+
+Version 1 snapshots predate ``usuarios.email_normalized``; restore derives
+it from ``email`` (see ``DERIVED_COLUMNS``).
+
+Run with:
+    python scripts/progress_snapshot.py export snapshots/2025-season.ndjson.gz
+    python scripts/progress_snapshot.py restore snapshots/2025-season.ndjson.gz --replace
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import zstandard
+except Exception:
+    # zstandard is optional; .gz snapshots work without it
+    zstandard = None
+
+from sqlalchemy import types as sa_types
+
+from main import app
+from db.init import db
+from db.usuario import normalize_email
+from services.stats import rebuild_stats
+
+FORMAT = "museo-progress-snapshot"
+VERSION = 2
+# versions restore() can read; older ones lack the columns in DERIVED_COLUMNS
+SUPPORTED_VERSIONS = (1, 2)
+# (table, column) -> (source column, function): filled in when a snapshot's
+# header does not list the column
+DERIVED_COLUMNS = {
+    ("usuarios", "email_normalized"): ("email", normalize_email),
+}
+# parents first; restore deletes in reverse order
+DEFAULT_TABLES = ("usuarios", "usuarios_rooms", "usuarios_hints")
+OPTIONAL_TABLES = ("progress_events",)
+# other rows pointing at usuarios; --replace clears them (sessions, resets) too
+USER_DEPENDENTS = ("password_reset_codes", "session_tokens", "refresh_tokens", "progress_events")
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise SystemExit("zstandard is not installed; use a .gz file name instead")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=6).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode(value):
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decoder(column):
+    # BinaryUuid (db/ids.py) decorates Uuid
+    if isinstance(getattr(column.type, "impl", column.type), sa_types.Uuid):
+        return lambda v: None if v is None else uuid.UUID(v)
+    if isinstance(column.type, sa_types.DateTime):
+        return lambda v: None if v is None else datetime.fromisoformat(v)
+    if isinstance(column.type, sa_types.Date):
+        return lambda v: None if v is None else date.fromisoformat(v)
+    return None
+
+
+def export(path: str, tables, chunk: int) -> None:
+    metadata = db.metadata
+    with _open(path, "w") as out, db.engine.connect() as conn:
+        out.write(json.dumps({"format": FORMAT, "version": VERSION, "createdAt": datetime.utcnow().isoformat()}) + "\n")
+        conn = conn.execution_options(stream_results=True, yield_per=chunk)
+        for name in tables:
+            table = metadata.tables[name]
+            columns = [c.name for c in table.columns]
+            out.write(json.dumps({"table": name, "columns": columns}) + "\n")
+            start = time.perf_counter()
+            count = 0
+            result = conn.execute(table.select().order_by(*table.primary_key.columns))
+            for rows in result.partitions():
+                out.write("".join(
+                    json.dumps([_encode(v) for v in row], separators=(",", ":")) + "\n" for row in rows
+                ))
+                count += len(rows)
+            elapsed = time.perf_counter() - start
+            out.write(json.dumps({"end": name, "rows": count}) + "\n")
+            print(f"{name}: {count} rows in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+def _read_snapshot(path: str):
+    """Yield the decoded lines after the header: table/end markers and row lists."""
+    with _open(path, "r") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != FORMAT:
+            raise SystemExit(f"{path} is not a progress snapshot")
+        if header.get("version") not in SUPPORTED_VERSIONS:
+            raise SystemExit(f"unsupported snapshot version {header.get('version')}")
+        for line in f:
+            yield json.loads(line)
+
+
+def restore(path: str, replace: bool, chunk: int) -> None:
+    metadata = db.metadata
+    with db.engine.begin() as conn:
+        if replace:
+            for name in USER_DEPENDENTS + tuple(reversed(DEFAULT_TABLES)):
+                conn.execute(metadata.tables[name].delete())
+        table = None
+        batch = []
+        for item in _read_snapshot(path):
+            if isinstance(item, list):
+                row = {col: (dec(v) if dec else v) for col, dec, v in zip(columns, decoders, item)}
+                for col, (source, derive) in derived:
+                    row[col] = derive(row[source])
+                batch.append(row)
+                if len(batch) >= chunk:
+                    conn.execute(table.insert(), batch)
+                    count += len(batch)
+                    batch = []
+            elif "table" in item:
+                table = metadata.tables[item["table"]]
+                columns = item["columns"]
+                decoders = [_decoder(table.c[col]) for col in columns]
+                derived = [
+                    (col, rule) for (name, col), rule in DERIVED_COLUMNS.items()
+                    if name == table.name and col not in columns
+                ]
+                count = 0
+                start = time.perf_counter()
+            elif "end" in item:
+                if batch:
+                    conn.execute(table.insert(), batch)
+                    count += len(batch)
+                    batch = []
+                elapsed = time.perf_counter() - start
+                print(f"{table.name}: {count} rows in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="write a snapshot of the progress tables")
+    exp.add_argument("path")
+    exp.add_argument("--with-events", action="store_true", help="also export progress_events")
+    exp.add_argument("--chunk", type=int, default=5000, help="rows fetched per round trip")
+    res = sub.add_parser("restore", help="load a snapshot into the database")
+    res.add_argument("path")
+    res.add_argument("--replace", action="store_true", help="delete current progress rows first")
+    res.add_argument("--chunk", type=int, default=2000, help="rows per INSERT batch")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == "export":
+            tables = DEFAULT_TABLES + (OPTIONAL_TABLES if args.with_events else ())
+            export(args.path, tables, args.chunk)
+        else:
+            restore(args.path, args.replace, args.chunk)
+            # the funnel rollups describe the old data; recompute them
+            rebuild_stats()
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
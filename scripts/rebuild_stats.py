@@ -0,0 +1,26 @@
+"""Recompute the room_stats / hint_stats rollups from the raw progress tables.
+
+Run after deploying the rollups on an existing database, or whenever the
+counters are suspected to have drifted (manual edits, restored backups):
+    python scripts/rebuild_stats.py
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from main import app
+from db.init import db
+from services.stats import rebuild_stats
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        start = time.perf_counter()
+        rooms, hints = rebuild_stats()
+        db.session.commit()
+        print(f"Rebuilt stats for {rooms} rooms and {hints} hints in {time.perf_counter() - start:.2f}s")
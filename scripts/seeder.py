@@ -6,10 +6,15 @@ Run with:
     python seeder.py
 
 This script is idempotent for basic runs (it will not duplicate rooms/hints by name).
+
+Optional per-room unlock settings in scripts/data.json:
+    "requires": [1, 2]        room numbers (1-based, data.json order) that must be completed first
+    "unlock": "all" | "any"   all prerequisites (default) or any one of them
+    "completion": "final_code" | "all_hints" | "any"
+Without any "requires" the rooms unlock one after another in data.json order.
 """
 
 from datetime import datetime
-import uuid
 
 from werkzeug.security import generate_password_hash
 import os
@@ -28,23 +33,29 @@ try:
 except Exception:
     _DATA = {}
 
+# Hints store relative paths only; these hosts are used to strip the prefix
+# from rows seeded before that change. The API prepends FILES_HOST /
+# LIME_SURVEY_HOST from its own config when it builds the catalog.
 LIME_SURVEY_HOST = os.getenv("LIME_SURVEY_HOST") or _DATA.get("LIME_SURVEY_HOST")
 FILES_HOST = os.getenv("FILES_HOST") or _DATA.get("FILES_HOST")
 
 
-def _join_host_path(host: str, path: str) -> str:
-    """Join host and path ensuring there is exactly one slash between them."""
-    if not host:
-        return path
-    host = host.rstrip("/")
-    path = path.lstrip("/")
-    return f"{host}/{path}"
+def _strip_host(host: str, url: str) -> str:
+    """Return the path part of an absolute URL previously built from host."""
+    if not host or not url:
+        return url
+    prefix = host.rstrip("/") + "/"
+    return url[len(prefix):] if url.startswith(prefix) else url
 
 
 from main import app
 from db.init import db
-from db.usuario import Usuario
-from db.room import Room, Hint, UsuarioRoom, UsuarioHint
+from db.ids import uuid7
+from db.usuario import Usuario, normalize_email
+from db.exhibition import Exhibition, ensure_default_exhibition
+from db.room import Room, Hint, RoomPrerequisite, UsuarioRoom, UsuarioHint
+from services.catalog import COMPLETION_MODES, UNLOCK_RULES, compile_unlock_graph, get_catalog, invalidate_catalog
+from services.stats import rebuild_stats
 
 
 # All required data (test_user, rooms) must come from scripts/data.json
@@ -57,6 +68,18 @@ def seed():
     with app.app_context():
         # Create tables (if not present)
         db.create_all()
+        ensure_default_exhibition()
+
+        # Rooms are seeded into the exhibition named in data.json ("exhibition": {"slug", "name"}),
+        # or the default one
+        exhibition_info = _DATA.get("exhibition") or {}
+        slug = exhibition_info.get("slug") or os.getenv("DEFAULT_EXHIBITION") or "default"
+        exhibition = Exhibition.query.filter_by(slug=slug).first()
+        if not exhibition:
+            exhibition = Exhibition(slug=slug, name=exhibition_info.get("name") or slug)
+            db.session.add(exhibition)
+            db.session.commit()
+            print(f"Created exhibition: {exhibition.name} (id={exhibition.id})")
 
         # Source rooms data from data.json (required)
         rooms_info = _DATA.get("rooms")
@@ -64,11 +87,11 @@ def seed():
             raise RuntimeError("scripts/data.json must contain a top-level 'rooms' array with room definitions")
 
         # Create or get test user
-        user = Usuario.query.filter_by(email=TEST_USER["email"]).first()
+        user = Usuario.query.filter_by(email_normalized=normalize_email(TEST_USER["email"])).first()
         if not user:
             print("Creating test user", TEST_USER["email"])
             user = Usuario(
-                id=uuid.uuid4(),
+                id=uuid7(),
                 nombre=TEST_USER["nombre"],
                 apellido=TEST_USER["apellido"],
                 email=TEST_USER["email"],
@@ -85,20 +108,31 @@ def seed():
         except Exception:
             uh_columns = set()
 
+        # Entry rooms (unlocked from the start): no "requires", or only the first one without a graph
+        graph_defined = any(isinstance(r, dict) and r.get("requires") for r in rooms_info)
+        seeded_rooms = []
+
         # Create rooms and hints (skip duplicates by name)
         for idx, room_info in enumerate(rooms_info):
-            is_first_room = idx == 0
+            is_entry_room = not room_info.get("requires") if graph_defined else idx == 0
+            completion_mode = room_info.get("completion")
+            unlock_rule = room_info.get("unlock") or "all"
+            if completion_mode is not None and completion_mode not in COMPLETION_MODES:
+                raise RuntimeError(f"room at index {idx}: 'completion' must be one of {COMPLETION_MODES}")
+            if unlock_rule not in UNLOCK_RULES:
+                raise RuntimeError(f"room at index {idx}: 'unlock' must be one of {UNLOCK_RULES}")
 
             base_name = room_info.get("base_name") or room_info.get("name")
             if not base_name:
                 raise RuntimeError(f"room at index {idx} in scripts/data.json is missing 'base_name'")
             full_room_name = f"Sala {idx+1}: {base_name}"
 
-            room = Room.query.filter_by(name=full_room_name).first()
+            room = Room.query.filter_by(exhibition_id=exhibition.id, name=full_room_name).first()
             if not room:
                 # determine final_code only from data.json (None if not provided)
                 final_code = room_info.get("final_code") if isinstance(room_info, dict) else None
-                room = Room(name=full_room_name, final_code=final_code)
+                room = Room(exhibition_id=exhibition.id, position=idx + 1, name=full_room_name, final_code=final_code,
+                            completion_mode=completion_mode, unlock_rule=unlock_rule)
                 db.session.add(room)
                 db.session.commit()
                 print(
@@ -106,6 +140,12 @@ def seed():
                 )
             else:
                 print(f"Room already exists: {room.name} (id={room.id})")
+                settings = (idx + 1, completion_mode, unlock_rule)
+                if (room.position, room.completion_mode, room.unlock_rule) != settings:
+                    # ordering and unlock settings follow data.json
+                    room.position, room.completion_mode, room.unlock_rule = settings
+                    db.session.commit()
+            seeded_rooms.append(room)
 
             # Build hint titles from data.json if present, otherwise default to Pista 1..5
             hints_list = []
@@ -127,28 +167,36 @@ def seed():
                 existing = Hint.query.filter_by(room_id=room.id, title=title).first()
                 if existing:
                     print(f"  Hint exists: {existing.title} (id={existing.id})")
+                    changed = False
                     # ensure access_code is set if missing
                     if access_code and existing.access_code != access_code:
                         existing.access_code = access_code
+                        changed = True
+                    # rewrite legacy absolute URLs to relative paths
+                    image_path = _strip_host(FILES_HOST, existing.image_path)
+                    lime_path = _strip_host(LIME_SURVEY_HOST, existing.lime_survey_path)
+                    if (image_path, lime_path) != (existing.image_path, existing.lime_survey_path):
+                        existing.image_path = image_path
+                        existing.lime_survey_path = lime_path
+                        changed = True
+                    if changed:
                         db.session.add(existing)
                         db.session.commit()
                     continue
 
                 lime_path = f"index.php/S{room.id}P{hint_idx}"
-                lime_url = _join_host_path(LIME_SURVEY_HOST, lime_path)
-
                 image_path = f"S{room.id}P{hint_idx}.png"
-                image_url = _join_host_path(FILES_HOST, image_path)
                 hint = Hint(
                     room_id=room.id,
+                    exhibition_id=exhibition.id,
                     title=title,
-                    image_url=image_url,
-                    lime_survey_url=lime_url,
+                    image_path=image_path,
+                    lime_survey_path=lime_path,
                     access_code=access_code,
                 )
                 db.session.add(hint)
                 db.session.commit()
-                print(f"  Created hint: {hint.title} (id={hint.id}) survey={lime_url} access_code={access_code}")
+                print(f"  Created hint: {hint.title} (id={hint.id}) survey={lime_path} access_code={access_code}")
 
             # Ensure test user has access to the room via UsuarioRoom if not exists
             ur = UsuarioRoom.query.filter_by(
@@ -159,8 +207,9 @@ def seed():
                 ur = UsuarioRoom(
                     usuario_id=user.id,
                     room_id=room.id,
+                    exhibition_id=exhibition.id,
                     completed=False,
-                    is_unlocked=is_first_room,
+                    is_unlocked=is_entry_room,
                 )
                 db.session.add(ur)
                 db.session.commit()
@@ -177,12 +226,41 @@ def seed():
                 ).first()
                 if not uh:
                     uh = UsuarioHint(
-                        usuario_id=user.id, hint_id=h.id, completed=is_first_room
+                        usuario_id=user.id, hint_id=h.id, exhibition_id=exhibition.id, completed=is_entry_room
                     )
                    
                     db.session.add(uh)
         db.session.commit()
 
+        # Replace the exhibition's unlock graph with the one in data.json
+        edges = []
+        for idx, room_info in enumerate(rooms_info):
+            for n in room_info.get("requires") or []:
+                if not isinstance(n, int) or not 1 <= n <= len(seeded_rooms):
+                    raise RuntimeError(f"room at index {idx}: 'requires' must list room numbers 1..{len(seeded_rooms)}")
+                edges.append((seeded_rooms[idx].id, seeded_rooms[n - 1].id))
+        room_ids = [
+            r.id for r in Room.query.filter_by(exhibition_id=exhibition.id).order_by(Room.position, Room.id)
+        ]
+        compile_unlock_graph(room_ids, edges)  # raises UnlockGraphError on cycles
+        RoomPrerequisite.query.filter_by(exhibition_id=exhibition.id).delete()
+        db.session.add_all(
+            RoomPrerequisite(room_id=room_id, requires_room_id=req, exhibition_id=exhibition.id)
+            for room_id, req in edges
+        )
+        db.session.commit()
+        print(f"Unlock graph: {len(edges)} prerequisite(s)" if edges else "Unlock graph: linear")
+
+        # progress rows above bypass the completion paths; resync the rollups
+        rebuild_stats()
+        db.session.commit()
+
+        # build the bundle now so the first client does not pay for it; API
+        # workers derive the same version from the same rows on their own
+        invalidate_catalog(app)
+        bundle = get_catalog(exhibition.id).bundle()
+        print(f"Catalog bundle: /catalog/{bundle.version} ({len(bundle.body)} bytes)")
+
         print("Seeding complete.")
 
 
@@ -0,0 +1,111 @@
+"""Async database runtime used when the API runs in ``API_MODE=async``.
+
+Flask is WSGI-native and by default runs every ``async def`` view in a fresh
+event loop, which would throw away pooled connections after each request.
+Instead this module keeps one event loop per process on a background thread
+and owns a SQLAlchemy ``AsyncEngine`` bound to it. Async views are submitted
+to that loop, so DB, SMTP and password-hash waits from many requests share
+one pool and one loop instead of each pinning a sync worker.
+
+Drivers: ``aiomysql`` for MySQL and ``aiosqlite`` for SQLite (both optional;
+only required when async mode is enabled).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from sqlalchemy.engine import make_url
+
+
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(uri: str) -> str:
+    """Map a sync SQLAlchemy URI (mysql+pymysql, sqlite, ...) to its async driver."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for database backend '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+class AsyncRuntime:
+    """A process-wide event loop thread plus the async engine living on it."""
+
+    def __init__(self, database_uri: str, pool_size: int = 10):
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="async-runtime", daemon=True)
+        self._thread.start()
+
+        url = make_url(database_uri)
+        engine_kwargs = {"pool_pre_ping": True}
+        if url.get_backend_name() == "mysql":
+            engine_kwargs.update(pool_size=pool_size, max_overflow=pool_size)
+        # pooled connections are only ever used from self.loop
+        self.engine = create_async_engine(database_uri, **engine_kwargs)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout: float | None = None):
+        """Run ``coro`` on the runtime loop and block the caller until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def ensure_sync(self, func):
+        """Replacement for ``Flask.ensure_sync`` that targets the shared loop."""
+        if not iscoroutinefunction(func):
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func(*args, **kwargs))
+
+        return wrapper
+
+    def session(self):
+        return self.sessionmaker()
+
+    def dispose(self) -> None:
+        self.run(self.engine.dispose())
+
+
+def get_runtime(app=None) -> AsyncRuntime:
+    from flask import current_app
+
+    app = app or current_app
+    return app.extensions["async_runtime"]
+
+
+def init_async_mode(app) -> None:
+    """Enable async views when ``API_MODE`` is ``async``; sync stays the default."""
+    app.config.setdefault("API_MODE", "sync")
+    if app.config["API_MODE"] != "async":
+        return
+
+    uri = app.config.get("ASYNC_DATABASE_URI") or to_async_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    runtime = AsyncRuntime(uri, pool_size=int(app.config.get("ASYNC_POOL_SIZE", 10)))
+    app.extensions["async_runtime"] = runtime
+    if "breakers" in app.extensions:
+        from services.resilience import get_breaker, watch_engine
+
+        watch_engine(get_breaker("database", app), runtime.engine.sync_engine)
+    app.ensure_sync = runtime.ensure_sync
+
+    from controllers.auth_async import ASYNC_VIEWS as auth_views
+    from controllers.rooms_async import ASYNC_VIEWS as rooms_views
+
+    # swap implementations behind the existing endpoints so url rules,
+    # url_for() names and the rest of the blueprints stay unchanged
+    for endpoint, view in {**auth_views, **rooms_views}.items():
+        app.view_functions[endpoint] = view
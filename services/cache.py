@@ -0,0 +1,382 @@
+"""Cache subsystem shared by ``main.py`` and the blueprints.
+
+Two tiers:
+
+* ``LRUCache`` — bounded, TTL-aware, in-process. Always present.
+* ``SharedTier`` — optional, backed by a Redis-protocol server so entries are
+  shared by every gunicorn worker and instance. ``FakeRedis`` implements the
+  subset of the redis-py client API used here, in memory, for tests and
+  single-process development (``CACHE_URL=memory://``).
+
+``TieredCache`` combines them. Deletes and tag invalidations are published on
+a pub/sub channel; every process subscribes and evicts its local tier, so a
+logout or a user deactivation takes effect everywhere.
+
+Values must be JSON-serializable.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from flask import current_app
+
+INVALIDATION_CHANNEL = "museo:cache:invalidate"
+
+
+class LRUCache:
+    """Thread-safe LRU with per-entry expiry and tag -> keys index."""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._tags = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires, _ = item
+            if expires is not None and expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float | None = None, tags=()) -> None:
+        with self._lock:
+            self._set(key, value, ttl, tags)
+
+    def add(self, key: str, value, ttl: float | None = None) -> bool:
+        """Set ``key`` only if it is absent or expired; returns whether it was set."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] >= time.monotonic()):
+                return False
+            self._set(key, value, ttl, ())
+            return True
+
+    def delete(self, *keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def invalidate_tag(self, tag: str) -> None:
+        with self._lock:
+            for key in list(self._tags.pop(tag, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _set(self, key: str, value, ttl, tags) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires, tuple(tags))
+        for tag in tags:
+            self._tags[tag].add(key)
+        while len(self._data) > self.max_entries:
+            self._remove(next(iter(self._data)))
+
+    def _remove(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class _FakePubSub:
+    def __init__(self, server: "FakeRedis"):
+        self._server = server
+        self._handlers = {}
+
+    def subscribe(self, **handlers) -> None:
+        self._handlers.update(handlers)
+        for channel in handlers:
+            self._server._subscribers[channel].append(self)
+
+    def run_in_thread(self, sleep_time: float = 0, daemon: bool = True):
+        # messages are delivered synchronously from publish(); nothing to run
+        return self
+
+    def stop(self) -> None:
+        for channel in self._handlers:
+            subs = self._server._subscribers.get(channel, [])
+            if self in subs:
+                subs.remove(self)
+
+    def _deliver(self, channel: str, data: bytes) -> None:
+        handler = self._handlers.get(channel)
+        if handler is not None:
+            handler({"type": "message", "channel": channel.encode(), "data": data})
+
+
+class FakeRedis:
+    """In-memory stand-in for the subset of ``redis.Redis`` the cache uses."""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._subscribers = defaultdict(list)
+        self._lock = threading.RLock()
+
+    def _alive(self, key: str) -> bool:
+        exp = self._expires.get(key)
+        if exp is not None and exp < time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return False
+        return key in self._data
+
+    def get(self, key: str):
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def set(self, key: str, value, ex=None, nx: bool = False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = value if isinstance(value, bytes) else str(value).encode()
+            self._expires.pop(key, None)
+            if ex:
+                self._expires[key] = time.monotonic() + float(ex)
+            return True
+
+    def delete(self, *keys) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def expire(self, key: str, seconds) -> bool:
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.monotonic() + float(seconds)
+            return True
+
+    def sadd(self, key: str, *members) -> int:
+        with self._lock:
+            current = self._data.get(key) if self._alive(key) else None
+            current = set(current) if current is not None else set()
+            before = len(current)
+            current.update(m.encode() if isinstance(m, str) else m for m in members)
+            self._data[key] = current
+            return len(current) - before
+
+    def smembers(self, key: str) -> set:
+        with self._lock:
+            return set(self._data[key]) if self._alive(key) else set()
+
+    def publish(self, channel: str, message) -> int:
+        data = message if isinstance(message, bytes) else str(message).encode()
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for sub in subscribers:
+            sub._deliver(channel, data)
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = True) -> _FakePubSub:
+        return _FakePubSub(self)
+
+
+class SharedTier:
+    """Cache tier on a Redis-protocol client (``redis.Redis`` or ``FakeRedis``)."""
+
+    def __init__(self, client, prefix: str = "museo:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value, ttl: float | None = None, tags=()) -> None:
+        ex = max(1, int(ttl)) if ttl else None
+        self.client.set(self.prefix + key, json.dumps(value, default=str), ex=ex)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            self.client.sadd(tag_key, key)
+            if ex:
+                # keep the tag set at least as long as its newest member
+                self.client.expire(tag_key, ex)
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        """Set only if absent (SET NX); used for locks and in-flight markers."""
+        return bool(self.client.set(self.prefix + key, json.dumps(value, default=str), ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, *keys) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + k for k in keys))
+
+    def tag_members(self, tag: str) -> list:
+        return [m.decode() if isinstance(m, bytes) else m for m in self.client.smembers(f"{self.prefix}tag:{tag}")]
+
+    def invalidate_tag(self, tag: str) -> list:
+        keys = self.tag_members(tag)
+        self.delete(*keys)
+        self.client.delete(f"{self.prefix}tag:{tag}")
+        return keys
+
+
+class TieredCache:
+    """Local LRU in front of an optional shared tier, with pub/sub invalidation."""
+
+    def __init__(self, local: LRUCache, shared: SharedTier | None = None, local_ttl: float = 30):
+        self.local = local
+        self.shared = shared
+        # entries copied from the shared tier live briefly in the local tier
+        self.local_ttl = local_ttl
+        self.node_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._subscribe()
+
+    def _subscribe(self) -> None:
+        if self.shared is None:
+            return
+        self._pubsub = self.shared.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+        self._listener = self._pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+
+    def get(self, key: str):
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+        try:
+            value = self.shared.get(key)
+        except Exception:
+            return None
+        if value is not None:
+            self.local.set(key, value, ttl=self.local_ttl)
+        return value
+
+    def set(self, key: str, value, ttl: float | None = None, tags=()) -> None:
+        local_ttl = min(ttl, self.local_ttl) if (ttl and self.shared is not None) else ttl
+        self.local.set(key, value, ttl=local_ttl, tags=tags)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl=ttl, tags=tags)
+            except Exception:
+                pass
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        """Atomically set ``key`` if absent across every process sharing the cache."""
+        if self.shared is not None:
+            return self.shared.add(key, value, ttl)
+        return self.local.add(key, value, ttl=ttl)
+
+    def delete(self, *keys) -> None:
+        self.local.delete(*keys)
+        if self.shared is not None:
+            try:
+                self.shared.delete(*keys)
+            except Exception:
+                pass
+        self._publish({"keys": list(keys)})
+
+    def invalidate_tag(self, tag: str) -> None:
+        self.local.invalidate_tag(tag)
+        keys = []
+        if self.shared is not None:
+            try:
+                keys = self.shared.invalidate_tag(tag)
+            except Exception:
+                pass
+        # local copies pulled from the shared tier are not tagged, so the
+        # message carries the member keys as well
+        self._publish({"tag": tag, "keys": keys})
+
+    def _publish(self, message: dict) -> None:
+        if self.shared is None:
+            return
+        message["node"] = self.node_id
+        try:
+            self.shared.client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception:
+            pass
+
+    def _on_invalidation(self, message) -> None:
+        try:
+            payload = json.loads(message["data"])
+        except Exception:
+            return
+        if payload.get("node") == self.node_id:
+            return
+        if payload.get("keys"):
+            self.local.delete(*payload["keys"])
+        if payload.get("tag"):
+            self.local.invalidate_tag(payload["tag"])
+
+    def close(self) -> None:
+        if self._pubsub is not None:
+            try:
+                self._listener.stop()
+            except Exception:
+                pass
+
+    def after_fork(self) -> None:
+        """Re-subscribe in a forked worker.
+
+        The listener thread does not survive ``fork()``, and a copied
+        ``node_id`` would make sibling workers drop each other's
+        invalidations as their own.
+        """
+        self.close()
+        self.node_id = uuid.uuid4().hex
+        self._subscribe()
+
+
+_memory_server = None
+
+
+def _shared_client(url: str):
+    global _memory_server
+    if url.startswith("memory://"):
+        # one server per process so every app/cache instance shares it
+        if _memory_server is None:
+            _memory_server = FakeRedis()
+        return _memory_server
+    import redis
+
+    return redis.Redis.from_url(url)
+
+
+def init_cache(app) -> None:
+    """Create the app cache from CACHE_URL (empty = local tier only)."""
+    app.config.setdefault("CACHE_URL", None)
+    app.config.setdefault("CACHE_MAX_ENTRIES", 10000)
+    app.config.setdefault("CACHE_DEFAULT_TTL", 300)
+    app.config.setdefault("CACHE_LOCAL_TTL", 30)
+
+    local = LRUCache(int(app.config["CACHE_MAX_ENTRIES"]), float(app.config["CACHE_DEFAULT_TTL"]))
+    url = app.config["CACHE_URL"]
+    shared = SharedTier(_shared_client(url)) if url else None
+    app.extensions["cache"] = TieredCache(local, shared, local_ttl=float(app.config["CACHE_LOCAL_TTL"]))
+
+
+def get_cache(app=None) -> TieredCache:
+    app = app or current_app
+    return app.extensions["cache"]
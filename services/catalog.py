@@ -0,0 +1,324 @@
+"""In-process catalog of rooms and hints.
+
+Rooms and hints only change when ``scripts/seeder.py`` runs, yet every rooms
+request used to query them again. The catalog loads both tables once per
+``CATALOG_TTL`` seconds and precomputes the public hint URLs from the
+relative paths stored on each ``Hint`` and the ``FILES_HOST`` /
+``LIME_SURVEY_HOST`` config values, so a host or CDN switch is a config
+change instead of a table-wide UPDATE.
+
+Each exhibition has its own catalog entry, loaded with queries led by
+``exhibition_id`` and cached independently, so a request only ever touches
+its tenant's rooms.
+
+The unlock graph (``room_prerequisites`` plus each room's unlock rule and
+completion mode) is compiled here too: prerequisites are validated as a DAG
+and successors are precomputed, so deciding what a completion unlocks needs
+only the user's completed rooms, no catalog queries.
+
+:meth:`Catalog.bundle` serializes the static part (rooms in order, their
+unlock settings and hints with URLs and access codes) into one JSON document
+named by a hash of its bytes, which ``GET /catalog/<version>`` serves as an
+immutable resource; per-user state comes separately from ``GET /rooms/state``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import current_app
+
+from db.init import db
+from db.room import Room, Hint, RoomPrerequisite
+from services.tenancy import current_exhibition_id
+
+
+# room completion modes
+FINAL_CODE = "final_code"
+ALL_HINTS = "all_hints"
+ANY = "any"
+COMPLETION_MODES = (FINAL_CODE, ALL_HINTS, ANY)
+# unlock rules over a room's prerequisites
+UNLOCK_ALL = "all"
+UNLOCK_ANY = "any"
+UNLOCK_RULES = (UNLOCK_ALL, UNLOCK_ANY)
+# hex digits of the sha256 kept in the bundle version
+BUNDLE_VERSION_LENGTH = 20
+
+
+class UnlockGraphError(ValueError):
+    """The configured prerequisites are not a valid DAG over the exhibition's rooms."""
+
+
+def join_url(host: Optional[str], path: Optional[str]) -> Optional[str]:
+    """Join host and path ensuring there is exactly one slash between them.
+
+    Paths that are already absolute URLs (rows seeded before hints stored
+    relative paths) are returned unchanged.
+    """
+    if not path:
+        return path
+    if not host or "://" in path:
+        return path
+    return f"{host.rstrip('/')}/{path.lstrip('/')}"
+
+
+@dataclass(frozen=True)
+class HintEntry:
+    id: int
+    room_id: int
+    title: str
+    image_url: Optional[str]
+    lime_survey_url: Optional[str]
+    access_code: Optional[str]
+
+
+@dataclass(frozen=True)
+class RoomEntry:
+    id: int
+    position: int
+    name: str
+    final_code: Optional[str]
+    hint_ids: tuple
+    completion_mode: str = ALL_HINTS
+    unlock_rule: str = UNLOCK_ALL
+    requires: tuple = ()
+
+    @property
+    def accepts_final_code(self) -> bool:
+        return self.completion_mode in (FINAL_CODE, ANY)
+
+    @property
+    def completes_with_hints(self) -> bool:
+        return self.completion_mode in (ALL_HINTS, ANY)
+
+
+@dataclass(frozen=True)
+class CatalogBundle:
+    version: str
+    body: bytes
+
+
+class Catalog:
+    def __init__(self, rooms: list, hints: list, exhibition_id: Optional[int] = None):
+        self.exhibition_id = exhibition_id
+        # rooms arrive in unlock order (position, id)
+        self.rooms = tuple(rooms)
+        self.rooms_by_id = {r.id: r for r in self.rooms}
+        self.hints_by_id = {h.id: h for h in hints}
+        successors = {}
+        for r in self.rooms:
+            for req in r.requires:
+                successors.setdefault(req, []).append(self.rooms_by_id[r.id])
+        self._successors = {k: tuple(v) for k, v in successors.items()}
+        self._bundle = None
+
+    def is_entry(self, room_id: int) -> bool:
+        """True for rooms without prerequisites (unlocked from the start)."""
+        room = self.rooms_by_id.get(room_id)
+        return room is not None and not room.requires
+
+    def successors(self, room_id: int) -> tuple:
+        return self._successors.get(room_id, ())
+
+    def unlocked_by(self, room_id: int, completed: set) -> list:
+        """Rooms whose unlock rule is satisfied once ``room_id`` is completed.
+
+        ``completed`` holds the user's other completed room ids.
+        """
+        done = set(completed)
+        done.add(room_id)
+        result = []
+        for succ in self.successors(room_id):
+            if succ.unlock_rule == UNLOCK_ANY or all(req in done for req in succ.requires):
+                result.append(succ)
+        return result
+
+    def room(self, room_id: int) -> Optional[RoomEntry]:
+        return self.rooms_by_id.get(room_id)
+
+    def hint(self, hint_id: int) -> Optional[HintEntry]:
+        return self.hints_by_id.get(hint_id)
+
+    def hints_for(self, room_id: int) -> list:
+        room = self.rooms_by_id.get(room_id)
+        return [self.hints_by_id[h] for h in room.hint_ids] if room else []
+
+    def bundle(self) -> CatalogBundle:
+        """The static catalog as one content-addressed JSON document (built once)."""
+        if self._bundle is None:
+            self._bundle = build_bundle(self)
+        return self._bundle
+
+
+def build_bundle(catalog: Catalog) -> CatalogBundle:
+    """Serialize rooms and hints and name the result by its sha256.
+
+    Final codes stay out: they are checked server-side. The stdlib encoder
+    with sorted keys gives every worker the same bytes for the same rows, so
+    they all agree on the version without sharing state.
+    """
+    doc = {
+        "exhibitionId": catalog.exhibition_id,
+        "rooms": [
+            {
+                "id": r.id,
+                "position": r.position,
+                "name": r.name,
+                "completionMode": r.completion_mode,
+                "unlockRule": r.unlock_rule,
+                "requires": list(r.requires),
+                "hints": [
+                    {
+                        "id": h.id,
+                        "title": h.title,
+                        "imageUrl": h.image_url,
+                        "limeSurveyUrl": h.lime_survey_url,
+                        "accessCode": h.access_code,
+                    }
+                    for h in catalog.hints_for(r.id)
+                ],
+            }
+            for r in catalog.rooms
+        ],
+    }
+    body = json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return CatalogBundle(hashlib.sha256(body).hexdigest()[:BUNDLE_VERSION_LENGTH], body)
+
+
+def compile_unlock_graph(room_ids: list, edges: list) -> dict:
+    """Return {room_id: tuple(prerequisite ids)} after validating the graph.
+
+    ``room_ids`` are in position order; ``edges`` are (room_id, requires_room_id).
+    Without edges the rooms form a chain in position order (legacy behaviour).
+    Raises UnlockGraphError on unknown rooms, self references or cycles.
+    """
+    if not edges:
+        return {rid: ((room_ids[i - 1],) if i else ()) for i, rid in enumerate(room_ids)}
+
+    known = set(room_ids)
+    requires = {rid: [] for rid in room_ids}
+    for room_id, req in edges:
+        if room_id not in known or req not in known:
+            raise UnlockGraphError(f"prerequisite {room_id} -> {req} references a room outside the exhibition")
+        if room_id == req:
+            raise UnlockGraphError(f"room {room_id} requires itself")
+        requires[room_id].append(req)
+
+    # Kahn's algorithm; anything left over sits on a cycle
+    pending = {rid: len(reqs) for rid, reqs in requires.items()}
+    dependants = {}
+    for rid, reqs in requires.items():
+        for req in reqs:
+            dependants.setdefault(req, []).append(rid)
+    ready = [rid for rid, n in pending.items() if n == 0]
+    if not ready:
+        raise UnlockGraphError("unlock graph has no entry room")
+    while ready:
+        rid = ready.pop()
+        for dep in dependants.get(rid, ()):
+            pending[dep] -= 1
+            if pending[dep] == 0:
+                ready.append(dep)
+    cyclic = sorted(rid for rid, n in pending.items() if n > 0)
+    if cyclic:
+        raise UnlockGraphError(f"unlock graph has a cycle through rooms {cyclic}")
+    return {rid: tuple(sorted(reqs)) for rid, reqs in requires.items()}
+
+
+def _completion_mode(mode: Optional[str], is_entry: bool, final_code: Optional[str]) -> str:
+    if mode in COMPLETION_MODES:
+        return mode
+    # legacy: only the entry room could be solved with its final code
+    return ANY if is_entry and final_code else ALL_HINTS
+
+
+def load_catalog(
+    exhibition_id: Optional[int],
+    files_host: Optional[str] = None,
+    lime_survey_host: Optional[str] = None,
+) -> Catalog:
+    """Read one exhibition's rooms and hints with two column-only queries and assemble URLs."""
+    hint_rows = db.session.execute(
+        db.select(Hint.id, Hint.room_id, Hint.title, Hint.image_path, Hint.lime_survey_path, Hint.access_code)
+        .where(Hint.exhibition_id == exhibition_id)
+        .order_by(Hint.id)
+    ).all()
+    hints = [
+        HintEntry(
+            id=h.id,
+            room_id=h.room_id,
+            title=h.title,
+            image_url=join_url(files_host, h.image_path),
+            lime_survey_url=join_url(lime_survey_host, h.lime_survey_path),
+            access_code=h.access_code,
+        )
+        for h in hint_rows
+    ]
+    hint_ids_by_room = {}
+    for h in hints:
+        hint_ids_by_room.setdefault(h.room_id, []).append(h.id)
+
+    room_rows = db.session.execute(
+        db.select(Room.id, Room.position, Room.name, Room.final_code, Room.completion_mode, Room.unlock_rule)
+        .where(Room.exhibition_id == exhibition_id)
+        .order_by(Room.position, Room.id)
+    ).all()
+    edges = db.session.execute(
+        db.select(RoomPrerequisite.room_id, RoomPrerequisite.requires_room_id)
+        .where(RoomPrerequisite.exhibition_id == exhibition_id)
+    ).all()
+    requires = compile_unlock_graph([r.id for r in room_rows], [tuple(e) for e in edges])
+    rooms = [
+        RoomEntry(
+            id=r.id,
+            position=r.position,
+            name=r.name,
+            final_code=r.final_code,
+            hint_ids=tuple(hint_ids_by_room.get(r.id, ())),
+            completion_mode=_completion_mode(r.completion_mode, not requires[r.id], r.final_code),
+            unlock_rule=r.unlock_rule if r.unlock_rule in UNLOCK_RULES else UNLOCK_ALL,
+            requires=requires[r.id],
+        )
+        for r in room_rows
+    ]
+    return Catalog(rooms, hints, exhibition_id)
+
+
+_lock = threading.Lock()
+
+
+def get_catalog(exhibition_id: Optional[int] = None) -> Catalog:
+    """Return the cached catalog of an exhibition (default: the request's one).
+
+    Each exhibition's entry is reloaded after CATALOG_TTL.
+    """
+    app = current_app._get_current_object()
+    if exhibition_id is None:
+        exhibition_id = current_exhibition_id()
+    catalogs = app.extensions.setdefault("catalog", {})
+    ttl = float(app.config.get("CATALOG_TTL", 300))
+    state = catalogs.get(exhibition_id)
+    if state is not None and time.monotonic() - state[1] < ttl:
+        return state[0]
+    with _lock:
+        state = catalogs.get(exhibition_id)
+        if state is not None and time.monotonic() - state[1] < ttl:
+            return state[0]
+        catalog = load_catalog(exhibition_id, app.config.get("FILES_HOST"), app.config.get("LIME_SURVEY_HOST"))
+        catalogs[exhibition_id] = (catalog, time.monotonic())
+        return catalog
+
+
+def invalidate_catalog(app=None, exhibition_id: Optional[int] = None) -> None:
+    """Drop one exhibition's cached catalog, or all of them."""
+    app = app or current_app._get_current_object()
+    if exhibition_id is None:
+        app.extensions.pop("catalog", None)
+    else:
+        app.extensions.get("catalog", {}).pop(exhibition_id, None)
@@ -0,0 +1,102 @@
+"""Negotiated response compression (brotli / gzip).
+
+Responses are compressed in an ``after_request`` hook when the client
+advertises support in ``Accept-Encoding`` and the body is larger than
+``COMPRESS_MIN_SIZE`` bytes. Brotli is used when the ``brotli`` package is
+installed and the client prefers it; gzip (stdlib) is always available.
+"""
+
+from __future__ import annotations
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except Exception:
+    # brotli is optional; gzip is used when it is missing
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+}
+
+
+def available_encodings() -> list:
+    """Encodings this process can produce, in order of server preference."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_body(data: bytes, encoding: str, level: int = 6, br_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=br_quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _choose_encoding(accept_encodings) -> str | None:
+    best = None
+    best_q = 0.0
+    # server preference breaks ties between equally weighted client values
+    for enc in available_encodings():
+        q = accept_encodings[enc]
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def _should_compress(response, min_size: int) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if "Content-Encoding" in response.headers:
+        return False
+    if "no-transform" in (response.headers.get("Cache-Control") or ""):
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    length = response.calculate_content_length()
+    return length is not None and length >= min_size
+
+
+def init_compression(app) -> None:
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 512)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BR_QUALITY", 4)
+
+    @app.after_request
+    def _compress_response(response):
+        cfg = app.config
+        if not cfg["COMPRESS_ENABLED"]:
+            return response
+        # the representation depends on Accept-Encoding whenever we could compress
+        if response.mimetype in COMPRESSIBLE_MIMETYPES:
+            response.vary.add("Accept-Encoding")
+        if not _should_compress(response, int(cfg["COMPRESS_MIN_SIZE"])):
+            return response
+
+        encoding = _choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        body = compress_body(
+            response.get_data(),
+            encoding,
+            level=int(cfg["COMPRESS_LEVEL"]),
+            br_quality=int(cfg["COMPRESS_BR_QUALITY"]),
+        )
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        # a strong ETag computed on the identity body no longer matches
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
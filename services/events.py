@@ -0,0 +1,179 @@
+"""Progress event recording and in-process fan-out.
+
+``record_event`` adds a ``ProgressEvent`` to the current ``db.session`` so it
+commits (or rolls back) together with the progress change it describes. After
+a successful commit the events are published to the process-wide
+``EventBus``, which hands them to every connected dashboard stream.
+
+Events committed by other workers/instances are picked up by a single poller
+thread per process (started with the first subscriber, idle otherwise), so N
+dashboards never mean N DB pollers.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+
+from db.init import db
+from db.progress_event import HINT_COMPLETED, ROOM_COMPLETED, ROOM_UNLOCKED, ProgressEvent
+from db.routing import RoutingSession
+from services.stats import apply_event
+
+
+def event_to_dict(ev: ProgressEvent) -> dict:
+    return {
+        "id": ev.id,
+        "kind": ev.kind,
+        "userId": str(ev.usuario_id),
+        "roomId": ev.room_id,
+        "hintId": ev.hint_id,
+        "points": ev.points,
+        "totalPoints": ev.total_points,
+        "createdAt": ev.created_at.isoformat() + "Z",
+    }
+
+
+def record_event(kind: str, usuario_id, room_id=None, hint_id=None, points: int = 0, total_points=None) -> ProgressEvent:
+    """Stage a progress event and its rollup bumps in the current transaction.
+
+    The caller commits.
+    """
+    ev = ProgressEvent(
+        usuario_id=usuario_id,
+        kind=kind,
+        room_id=room_id,
+        hint_id=hint_id,
+        points=points,
+        total_points=total_points,
+        created_at=datetime.utcnow(),
+    )
+    db.session.add(ev)
+    apply_event(kind, room_id=room_id, hint_id=hint_id, points=points)
+    return ev
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _collect_flushed_events(session, flush_context):
+    # ids exist after the flush; attributes expire at commit, so serialize now
+    new = [event_to_dict(obj) for obj in session.new if isinstance(obj, ProgressEvent)]
+    if new:
+        session.info.setdefault("progress_events", []).extend(new)
+
+
+@sa.event.listens_for(RoutingSession, "after_commit")
+def _publish_committed_events(session):
+    events = session.info.pop("progress_events", None)
+    if events and has_app_context():
+        bus = current_app.extensions.get("event_bus")
+        if bus is not None:
+            bus.publish(events)
+
+
+@sa.event.listens_for(RoutingSession, "after_soft_rollback")
+def _drop_rolled_back_events(session, previous_transaction):
+    session.info.pop("progress_events", None)
+
+
+class EventBus:
+    """Fan-out of progress events to in-process subscriber queues."""
+
+    def __init__(self, app, poll_interval: float = 2.0, queue_size: int = 1000, lookback: int = 50):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        # re-read a few ids below the high-water mark: ids are assigned at
+        # insert time but become visible at commit, possibly out of order
+        self.lookback = lookback
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._seen = deque(maxlen=4096)
+        self._seen_set = set()
+        self._last_id = None
+        self._poller = None
+
+    def subscribe(self) -> "queue.Queue":
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name="progress-events", daemon=True)
+                self._poller.start()
+        return q
+
+    def unsubscribe(self, q) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, events) -> None:
+        fresh = []
+        with self._lock:
+            for ev in events:
+                if ev["id"] in self._seen_set:
+                    continue
+                if len(self._seen) == self._seen.maxlen:
+                    self._seen_set.discard(self._seen[0])
+                self._seen.append(ev["id"])
+                self._seen_set.add(ev["id"])
+                fresh.append(ev)
+            subscribers = list(self._subscribers)
+        if not fresh:
+            return
+        for q in subscribers:
+            for ev in fresh:
+                try:
+                    q.put_nowait(ev)
+                except queue.Full:
+                    # a stalled dashboard drops events; it can resync from its cursor
+                    break
+
+    def _poll_once(self) -> None:
+        with self.app.app_context():
+            try:
+                if self._last_id is None:
+                    self._last_id = db.session.query(sa.func.max(ProgressEvent.id)).scalar() or 0
+                    return
+                rows = (
+                    ProgressEvent.query.filter(ProgressEvent.id > self._last_id - self.lookback)
+                    .order_by(ProgressEvent.id)
+                    .limit(500)
+                    .all()
+                )
+                events = [event_to_dict(r) for r in rows]
+            finally:
+                db.session.remove()
+        if events:
+            self._last_id = max(self._last_id, events[-1]["id"])
+            self.publish(events)
+
+    def _poll_loop(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+            try:
+                self._poll_once()
+            except Exception:
+                # the DB may be briefly unavailable; keep serving local events
+                pass
+            time.sleep(self.poll_interval)
+
+
+def init_events(app) -> None:
+    app.config.setdefault("EVENTS_POLL_INTERVAL", 2.0)
+    app.extensions["event_bus"] = EventBus(app, poll_interval=float(app.config["EVENTS_POLL_INTERVAL"]))
+
+
+def get_bus() -> EventBus:
+    return current_app.extensions["event_bus"]
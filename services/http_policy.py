@@ -0,0 +1,94 @@
+"""CORS and HTTP caching headers.
+
+Browsers send an ``OPTIONS`` preflight before every cross-origin request
+carrying ``Authorization: Bearer``. Preflights are answered from the first
+``before_request`` hook, before tenancy, auth or query counting, and carry
+``Access-Control-Max-Age`` (``CORS_MAX_AGE``) so the browser reuses them
+instead of repeating one per API call.
+
+``FRONTEND_ORIGIN`` is a comma-separated origin allowlist (``*`` allows
+any origin, the default for development). Allowed origins are echoed back
+with ``Vary: Origin``; others get no CORS headers and the browser blocks
+the response.
+
+``cache_policy(...)`` sets a view's ``Cache-Control`` and extra ``Vary``
+headers, the way ``read_only`` marks replica-safe views. Error responses
+and views without one get ``DEFAULT_CACHE_CONTROL`` (``no-store``) unless
+the view set the header itself.
+"""
+
+from __future__ import annotations
+
+from flask import request
+
+ALLOW_METHODS = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
+ALLOW_HEADERS = "Authorization, Content-Type, X-Exhibition, Idempotency-Key"
+
+
+def cache_policy(cache_control: str, vary=()):
+    """Declare a view's Cache-Control value and the request headers it varies on."""
+    def decorator(view):
+        view._cache_control = cache_control
+        view._vary = tuple(vary)
+        return view
+    return decorator
+
+
+def _parse_origins(value) -> tuple:
+    if isinstance(value, (list, tuple, set)):
+        return tuple(value)
+    return tuple(o.strip().rstrip("/") for o in (value or "").split(",") if o.strip())
+
+
+def init_http_policy(app) -> None:
+    """Register the policy hooks; call before anything else adds a before_request."""
+    app.config.setdefault("FRONTEND_ORIGIN", "*")
+    app.config.setdefault("CORS_MAX_AGE", 86400)
+    app.config.setdefault("CORS_ALLOW_HEADERS", ALLOW_HEADERS)
+    app.config.setdefault("DEFAULT_CACHE_CONTROL", "no-store")
+
+    origins = _parse_origins(app.config["FRONTEND_ORIGIN"])
+    any_origin = "*" in origins
+    allowed = frozenset(origins)
+
+    def _cors_headers(response) -> None:
+        origin = request.headers.get("Origin")
+        if not origin:
+            return
+        if any_origin:
+            response.headers["Access-Control-Allow-Origin"] = "*"
+            return
+        response.vary.add("Origin")
+        if origin in allowed:
+            response.headers["Access-Control-Allow-Origin"] = origin
+
+    def _is_preflight() -> bool:
+        return request.method == "OPTIONS" and "Access-Control-Request-Method" in request.headers
+
+    @app.before_request
+    def _answer_preflight():
+        if not _is_preflight():
+            return None
+        response = app.response_class(status=204)
+        _cors_headers(response)
+        if "Access-Control-Allow-Origin" in response.headers:
+            response.headers["Access-Control-Allow-Methods"] = ALLOW_METHODS
+            response.headers["Access-Control-Allow-Headers"] = app.config["CORS_ALLOW_HEADERS"]
+            response.headers["Access-Control-Max-Age"] = str(int(app.config["CORS_MAX_AGE"]))
+        return response
+
+    @app.after_request
+    def _apply_policy(response):
+        if _is_preflight():
+            return response
+        _cors_headers(response)
+        view = app.view_functions.get(request.endpoint)
+        # errors (401, 404, 5xx) never take the view's policy; they must not be cached.
+        # 304s do: their Cache-Control replaces the stored one (RFC 9111 4.3.4)
+        cacheable = response.status_code < 300 or response.status_code == 304
+        policy = getattr(view, "_cache_control", None) if cacheable else None
+        if "Cache-Control" not in response.headers:
+            response.headers["Cache-Control"] = policy or app.config["DEFAULT_CACHE_CONTROL"]
+        for header in getattr(view, "_vary", ()):
+            response.vary.add(header)
+        return response
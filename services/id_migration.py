@@ -0,0 +1,110 @@
+"""Move existing user ids to UUIDv7 and, on MySQL, to BINARY(16) storage.
+
+New users get time-ordered ids from :func:`db.ids.uuid7`; this converts the
+rest. Both steps work in chunks of ``chunk`` rows/users, commit after every
+chunk and skip what is already done, so they can be interrupted and re-run:
+
+* :func:`convert_storage` (MySQL only) — ``usuarios.id`` and every column
+  with a foreign key to it go from the 32-character hex ``CHAR`` written by
+  ``sqlalchemy.Uuid`` to ``BINARY(16)``: each column is widened to
+  ``VARBINARY(32)``, rewritten with ``UNHEX()`` in chunks, then narrowed.
+* :func:`reassign_user_ids` — every user whose id is not version 7 gets a new
+  ``uuid7()``; the user row and all rows referencing it are rewritten in the
+  same transaction, with foreign key checks deferred (SQLite) or off for that
+  session (MySQL) until the chunk is consistent again.
+
+Run it with the API stopped: rewritten ids invalidate cached identities and
+signed session tokens (``SESSION_TOKEN_MODE=signed``), so clear the shared
+cache afterwards; users holding a signed token log in again.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+
+from db.ids import uuid7
+from db.init import db
+
+USERS_TABLE = "usuarios"
+
+
+def user_id_columns() -> list:
+    """``(table, column)`` for ``usuarios.id`` and every column referencing it."""
+    users = db.metadata.tables[USERS_TABLE]
+    columns = [(users, users.c.id)]
+    for table in db.metadata.sorted_tables:
+        for column in table.columns:
+            if any(fk.column is users.c.id for fk in column.foreign_keys):
+                columns.append((table, column))
+    return columns
+
+
+@contextmanager
+def _unchecked(conn):
+    """Let one transaction break foreign keys as long as it ends consistent."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        # checked again at COMMIT
+        conn.exec_driver_sql("PRAGMA defer_foreign_keys = ON")
+    elif dialect == "mysql":
+        conn.exec_driver_sql("SET SESSION foreign_key_checks = 0")
+    try:
+        yield
+    finally:
+        if dialect == "mysql":
+            conn.exec_driver_sql("SET SESSION foreign_key_checks = 1")
+
+
+def convert_storage(chunk: int = 5000, log=print) -> int:
+    """Rewrite hex CHAR user id columns as BINARY(16) on MySQL; returns rows converted."""
+    engine = db.engine
+    if engine.dialect.name != "mysql":
+        return 0
+    converted = 0
+    present = set(sa.inspect(engine).get_table_names())
+    with engine.connect() as conn, _unchecked(conn):
+        for table, column in user_id_columns():
+            if table.name not in present:
+                continue
+            current = {c["name"]: c for c in sa.inspect(conn).get_columns(table.name)}[column.name]
+            if isinstance(current["type"], sa.types.BINARY) and getattr(current["type"], "length", None) == 16:
+                continue
+            null = "NULL" if current["nullable"] else "NOT NULL"
+            name, col = conn.dialect.identifier_preparer.quote(table.name), column.name
+            conn.exec_driver_sql(f"ALTER TABLE {name} MODIFY {col} VARBINARY(32) {null}")
+            while True:
+                done = conn.exec_driver_sql(
+                    f"UPDATE {name} SET {col} = UNHEX({col}) WHERE LENGTH({col}) = 32 LIMIT {int(chunk)}"
+                ).rowcount
+                conn.commit()
+                converted += done
+                if done < chunk:
+                    break
+            conn.exec_driver_sql(f"ALTER TABLE {name} MODIFY {col} BINARY(16) {null}")
+            conn.commit()
+            log(f"{table.name}.{col}: BINARY(16)")
+    return converted
+
+
+def reassign_user_ids(chunk: int = 1000, log=print) -> int:
+    """Give every non-v7 user a uuid7 id, rewriting references; returns users changed."""
+    users = db.metadata.tables[USERS_TABLE]
+    present = set(sa.inspect(db.engine).get_table_names())
+    columns = [(t, c) for t, c in user_id_columns() if t.name in present]
+    with db.engine.connect() as conn:
+        # ids are small; the version check needs the decoded value on every backend
+        pending = [uid for uid in conn.execute(sa.select(users.c.id)).scalars() if uid.version != 7]
+    changed = 0
+    for start in range(0, len(pending), chunk):
+        mapping = [{"old_id": old, "new_id": uuid7()} for old in pending[start:start + chunk]]
+        with db.engine.begin() as conn, _unchecked(conn):
+            for table, column in columns:
+                conn.execute(
+                    table.update().where(column == sa.bindparam("old_id")).values({column.name: sa.bindparam("new_id")}),
+                    mapping,
+                )
+        changed += len(mapping)
+        log(f"reassigned {changed}/{len(pending)} user ids")
+    return changed
@@ -0,0 +1,170 @@
+"""Idempotency-Key support for retried POSTs.
+
+Kiosks on unreliable networks retry requests whose response they never
+saw. A view wrapped with ``@idempotent`` runs once per ``Idempotency-Key``
+header value, scoped by endpoint and user, for ``IDEMPOTENCY_TTL`` seconds.
+The first response is stored in the app cache and replayed for every retry
+(with ``Idempotent-Replayed: true``), so a retry costs a cache lookup
+instead of a transaction and never sends a second email.
+
+* The first request claims the key with the cache's atomic ``add`` (SET NX
+  on the shared tier, so the claim holds across workers). A concurrent
+  duplicate waits up to ``IDEMPOTENCY_WAIT`` seconds for the stored
+  response, then gets 409 with ``Retry-After``.
+* The request body is fingerprinted: reusing a key with a different body is
+  a client bug and gets 422.
+* Stored bodies may hold tokens (``/auth/register``); they live in the same
+  cache as the session lookups, and a replay needs the identical body.
+* 5xx responses and exceptions are not stored; the claim is released so the
+  retry runs the view again. A claim held by a crashed worker expires after
+  ``IDEMPOTENCY_LOCK_TTL``.
+
+Requests without the header behave as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import time
+
+from flask import current_app, jsonify, make_response, request
+from flask_login import current_user
+
+from services.cache import get_cache
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+def _read(cache, key: str):
+    # in-flight markers change under us: skip the local copy when a shared tier exists
+    if cache.shared is not None:
+        try:
+            return cache.shared.get(key)
+        except Exception:
+            return None
+    return cache.local.get(key)
+
+
+def _scope() -> str:
+    if current_user and current_user.is_authenticated:
+        return str(current_user.get_id())
+    return "anon"
+
+
+def _invalid_key(key: str):
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        return jsonify({"error": f"invalid {HEADER}"}), 400
+    return None
+
+
+def _keys(key: str):
+    """(cache key, request fingerprint) for this endpoint, user and body."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+    return f"idem:{request.endpoint}:{_scope()}:{digest}", fingerprint
+
+
+def _deadline() -> float:
+    return time.monotonic() + float(current_app.config.get("IDEMPOTENCY_WAIT", 10))
+
+
+def _replay(entry: dict, fingerprint: str):
+    if entry["fp"] != fingerprint:
+        return jsonify({"error": f"{HEADER} reused with a different request"}), 422
+    response = current_app.response_class(entry["body"], status=entry["status"], mimetype=entry["mimetype"])
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _step(cache_key: str, fingerprint: str):
+    """One attempt: a response to send, True when this request owns the key, or None to wait."""
+    cache = get_cache()
+    entry = _read(cache, cache_key)
+    if entry is not None and entry.get("state") == "done":
+        return _replay(entry, fingerprint)
+    if entry is None:
+        lock_ttl = float(current_app.config.get("IDEMPOTENCY_LOCK_TTL", 30))
+        if cache.add(cache_key, {"state": "pending", "fp": fingerprint}, ttl=lock_ttl):
+            return True
+    return None
+
+
+def _conflict():
+    resp = jsonify({"error": "a request with this Idempotency-Key is in progress"})
+    resp.status_code = 409
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+
+def _store(cache_key: str, fingerprint: str, rv):
+    response = make_response(rv)
+    cache = get_cache()
+    if response.status_code >= 500 or response.is_streamed:
+        cache.delete(cache_key)
+        return response
+    entry = {
+        "state": "done",
+        "fp": fingerprint,
+        "status": response.status_code,
+        "body": response.get_data(as_text=True),
+        "mimetype": response.mimetype,
+    }
+    cache.set(cache_key, entry, ttl=float(current_app.config.get("IDEMPOTENCY_TTL", 3600)))
+    return response
+
+
+def idempotent(view):
+    """Replay the stored response for retries carrying the same Idempotency-Key."""
+    if inspect.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return await view(*args, **kwargs)
+            if (error := _invalid_key(key)) is not None:
+                return error
+            cache_key, fingerprint = _keys(key)
+            deadline = _deadline()
+            while (outcome := _step(cache_key, fingerprint)) is None:
+                if time.monotonic() >= deadline:
+                    return _conflict()
+                await asyncio.sleep(POLL_INTERVAL)
+            if outcome is not True:
+                return outcome
+            try:
+                rv = await view(*args, **kwargs)
+            except BaseException:
+                get_cache().delete(cache_key)
+                raise
+            return _store(cache_key, fingerprint, rv)
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if (error := _invalid_key(key)) is not None:
+            return error
+        cache_key, fingerprint = _keys(key)
+        deadline = _deadline()
+        while (outcome := _step(cache_key, fingerprint)) is None:
+            if time.monotonic() >= deadline:
+                return _conflict()
+            time.sleep(POLL_INTERVAL)
+        if outcome is not True:
+            return outcome
+        try:
+            rv = view(*args, **kwargs)
+        except BaseException:
+            get_cache().delete(cache_key)
+            raise
+        return _store(cache_key, fingerprint, rv)
+
+    return wrapper
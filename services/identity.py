@@ -0,0 +1,78 @@
+"""Request-scoped identity map for users and their progress rows.
+
+The SQLAlchemy session already dedupes primary-key lookups
+(``db.session.get``), but lookups by email or "all rows of this user in this
+exhibition" always hit the database. These helpers memoize them in ``g`` for
+the rest of the request, and resolve the logged-in user without a query
+when the looked-up email is the current user's own.
+
+Rows created during the request should be added to the returned dicts so
+later lookups see them (``services.progress`` does this).
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from flask import g
+from flask_login import current_user
+
+from db.init import db
+from db.room import UsuarioHint, UsuarioRoom
+from db.usuario import Usuario, normalize_email
+
+
+def _memo(name: str) -> dict:
+    memo = g.get(name)
+    if memo is None:
+        memo = {}
+        setattr(g, name, memo)
+    return memo
+
+
+def current_usuario() -> Optional[Usuario]:
+    """The ``Usuario`` row of the logged-in user (unwraps signed-token identities)."""
+    if not current_user or not current_user.is_authenticated:
+        return None
+    user = current_user._get_current_object()
+    if isinstance(user, Usuario):
+        return user
+    # TokenUser: primary-key load, deduped by the session identity map
+    return db.session.get(Usuario, user.id)
+
+
+def user_by_email(email: str) -> Optional[Usuario]:
+    """Look a user up by email once per request; the current user costs nothing."""
+    if not email:
+        return None
+    email = normalize_email(email)
+    memo = _memo("_users_by_email")
+    if email in memo:
+        return memo[email]
+    me = current_usuario()
+    if me is not None and me.email_normalized == email:
+        user = me
+    else:
+        user = Usuario.query.filter_by(email_normalized=email).first()
+    memo[email] = user
+    return user
+
+
+def user_rooms(user_id, exhibition_id) -> dict:
+    """{room_id: UsuarioRoom} for the user's rows in this exhibition (one query per request)."""
+    memo = _memo("_user_rooms")
+    key = (user_id, exhibition_id)
+    if key not in memo:
+        rows = UsuarioRoom.query.filter_by(exhibition_id=exhibition_id, usuario_id=user_id).all()
+        memo[key] = {ur.room_id: ur for ur in rows}
+    return memo[key]
+
+
+def user_hints(user_id, exhibition_id) -> dict:
+    """{hint_id: UsuarioHint} for the user's rows in this exhibition (one query per request)."""
+    memo = _memo("_user_hints")
+    key = (user_id, exhibition_id)
+    if key not in memo:
+        rows = UsuarioHint.query.filter_by(exhibition_id=exhibition_id, usuario_id=user_id).all()
+        memo[key] = {uh.hint_id: uh for uh in rows}
+    return memo[key]
@@ -0,0 +1,65 @@
+"""JSON provider for the Flask app.
+
+Uses ``orjson`` when it is installed and falls back to the stdlib encoder
+otherwise, so deployments without the optional package behave exactly like
+Flask's default provider.
+"""
+
+from __future__ import annotations
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except Exception:
+    # orjson is optional; without it we keep the stdlib json behaviour
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Serialize responses with orjson when available.
+
+    Key order is preserved as built by the views (no sorting) and output is
+    always compact; both are cheaper than the Flask defaults. Datetimes are
+    passed through to Flask's ``default`` hook so they keep the same HTTP-date
+    format as the stdlib provider.
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+
+    @property
+    def backend(self) -> str:
+        return "orjson" if orjson is not None else "json"
+
+    def dumps_bytes(self, obj) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        return super().dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def dumps(self, obj, **kwargs) -> str:
+        # honour explicit stdlib kwargs (indent, separators, ...) when given
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            body = super().dumps(obj, indent=2)
+        else:
+            body = self.dumps_bytes(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app) -> None:
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,195 @@
+"""Structured logging that never blocks a request.
+
+Records go to a bounded in-memory queue (``QueueHandler`` on the root
+logger) and a single background thread (``QueueListener``) formats them as
+JSON lines and writes them to stdout. A request only pays for building the
+record and a ``put_nowait``. When the writer cannot keep up and the queue
+(``LOG_QUEUE_SIZE``) is full, records are dropped and counted instead of
+stalling the worker; the count is reported on the next line that gets
+through.
+
+Every request gets an id (incoming ``X-Request-ID`` or a new one, echoed
+back in the response) and one access line with route, status, user id and
+latency. Successful fast requests are sampled (``LOG_SAMPLE_RATE``); errors
+and requests slower than ``LOG_SLOW_MS`` are always logged. Lines logged
+during a request carry its ``request_id``, ``route`` and ``user_id``.
+
+The writer thread does not survive ``fork()``; ``services/workers.py``
+restarts it in each gunicorn worker.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+from db.routing import current_user_id
+
+logger = logging.getLogger("museo")
+access_logger = logging.getLogger("museo.access")
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, extras, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the stdlib prepare() formats the whole message here; leave the JSON
+        # to the writer thread and only freeze what may change after we return
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if has_request_context():
+            record.__dict__.setdefault("request_id", g.get("request_id"))
+            record.__dict__.setdefault("route", request.endpoint)
+            if "user_id" not in record.__dict__:
+                uid = current_user_id()
+                record.user_id = str(uid) if uid is not None else None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        dropped = 0
+        if self.dropped:
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            record.dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += dropped + 1
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stdout`` is now, not the one seen at startup."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def _start_listener() -> None:
+    global _listener
+    writer = _StdoutHandler()
+    writer.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(_handler.queue, writer, respect_handler_level=False)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def after_fork() -> None:
+    """Start a writer thread in a forked worker (the parent's did not survive)."""
+    global _listener
+    if _handler is None:
+        return
+    # the copied listener refers to a dead thread, and the copied queue's
+    # mutex may have been held by it at fork time: replace both
+    _listener = None
+    _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _handler._dropped_lock = threading.Lock()
+    _start_listener()
+
+
+def _install(queue_size: int, level: str) -> None:
+    """Put the queue handler on the root logger once per process."""
+    global _handler
+    with _setup_lock:
+        if _handler is None:
+            _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+            logging.getLogger().addHandler(_handler)
+            _start_listener()
+            atexit.register(stop_logging)
+        logging.getLogger().setLevel(level)
+
+
+def init_logging(app) -> None:
+    """Install the queue handler and the per-request id / access line hooks."""
+    app.config.setdefault("LOG_LEVEL", "INFO")
+    app.config.setdefault("LOG_QUEUE_SIZE", 10000)
+    app.config.setdefault("LOG_SAMPLE_RATE", 0.1)
+    app.config.setdefault("LOG_SLOW_MS", 500)
+    _install(int(app.config["LOG_QUEUE_SIZE"]), str(app.config["LOG_LEVEL"]).upper())
+
+    @app.before_request
+    def _start_request():
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        g._log_start = time.perf_counter()
+
+    @app.after_request
+    def _access_log(response):
+        start = g.pop("_log_start", None)
+        if start is None:
+            return response
+        response.headers["X-Request-ID"] = g.request_id
+        latency_ms = (time.perf_counter() - start) * 1000
+        if response.status_code >= 500:
+            level = logging.ERROR
+        elif response.status_code >= 400 or latency_ms >= app.config["LOG_SLOW_MS"]:
+            level = logging.WARNING
+        elif random.random() < app.config["LOG_SAMPLE_RATE"]:
+            level = logging.INFO
+        else:
+            return response
+        if access_logger.isEnabledFor(level):
+            access_logger.log(level, "%s %s %s", request.method, request.path, response.status_code, extra={
+                "status": response.status_code,
+                "latency_ms": round(latency_ms, 2),
+                "sampled": level == logging.INFO,
+            })
+        return response
@@ -0,0 +1,58 @@
+"""Room completion and unlocking shared by the rooms routes.
+
+Both ways of finishing a room (final code, all hints) go through
+``complete_room``, which consults the compiled unlock graph in the catalog.
+The user's progress rows for the exhibition are loaded once per request
+(``services.identity.user_rooms``), so evaluating unlocks needs no further
+queries.
+"""
+
+from __future__ import annotations
+
+from db.init import db
+from db.room import UsuarioRoom
+from services.events import ROOM_COMPLETED, ROOM_UNLOCKED, record_event
+
+
+def ensure_room_row(catalog, user_id, room_id: int, user_rooms: dict, unlocked: bool = True) -> UsuarioRoom:
+    """Return the user's row for a room, creating it (and logging the unlock) if missing."""
+    ur = user_rooms.get(room_id)
+    if ur is None:
+        ur = UsuarioRoom(
+            usuario_id=user_id, room_id=room_id, exhibition_id=catalog.exhibition_id,
+            completed=False, is_unlocked=unlocked,
+        )
+        db.session.add(ur)
+        user_rooms[room_id] = ur
+        if unlocked:
+            record_event(ROOM_UNLOCKED, user_id, room_id=room_id)
+    return ur
+
+
+def complete_room(catalog, user, room_id: int, user_rooms: dict, points: int = 0) -> list:
+    """Mark a room completed for ``user`` and unlock what the graph allows.
+
+    Awards ``points`` once. Returns the ids of newly unlocked rooms; an empty
+    list if the room was already completed. The caller commits.
+    """
+    ur = ensure_room_row(catalog, user.id, room_id, user_rooms)
+    if ur.completed:
+        return []
+    ur.completed = True
+    if points:
+        user.total_points = (user.total_points or 0) + points
+    record_event(ROOM_COMPLETED, user.id, room_id=room_id, points=points, total_points=user.total_points)
+
+    completed = {rid for rid, row in user_rooms.items() if row.completed}
+    unlocked = []
+    for succ in catalog.unlocked_by(room_id, completed):
+        row = user_rooms.get(succ.id)
+        if row is None:
+            ensure_room_row(catalog, user.id, succ.id, user_rooms)
+        elif not row.is_unlocked:
+            row.is_unlocked = True
+            record_event(ROOM_UNLOCKED, user.id, room_id=succ.id)
+        else:
+            continue
+        unlocked.append(succ.id)
+    return unlocked
@@ -0,0 +1,132 @@
+"""Rotating refresh tokens.
+
+Login and registration hand out a refresh token next to the short-lived
+session token. ``POST /auth/refresh`` exchanges it for a new session token
+and a new refresh token without verifying the password again. Each refresh
+token is single use: the exchange marks it used with a conditional UPDATE,
+and presenting a used or revoked token again is treated as theft, revoking
+every token of that login's family.
+
+``rememberMe`` selects the refresh lifetime (``REFRESH_TOKEN_REMEMBER_LIFETIME``
+instead of ``REFRESH_TOKEN_LIFETIME``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from db.init import db
+from db.refresh_token import RefreshToken
+from db.usuario import Usuario
+
+
+class RefreshError(Exception):
+    """Refresh token rejected; ``reason`` is 'invalid', 'expired' or 'reused'."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _hash(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def refresh_lifetime(remember: bool) -> timedelta:
+    cfg = current_app.config
+    if remember:
+        return timedelta(seconds=int(cfg.get("REFRESH_TOKEN_REMEMBER_LIFETIME", 30 * 24 * 3600)))
+    return timedelta(seconds=int(cfg.get("REFRESH_TOKEN_LIFETIME", 24 * 3600)))
+
+
+def build_refresh_token(user_id, remember: bool, family_id=None):
+    """Return (raw_token, row) for a new refresh token; the caller adds and commits the row."""
+    raw = secrets.token_urlsafe(48)
+    row = RefreshToken(
+        token_hash=_hash(raw),
+        family_id=family_id or uuid.uuid4(),
+        usuario_id=user_id,
+        remember=bool(remember),
+        expires_at=datetime.utcnow() + refresh_lifetime(remember),
+    )
+    return raw, row
+
+
+def issue_refresh_token(user, remember: bool):
+    """Create and commit a refresh token for a fresh login. Returns (raw, expires_at)."""
+    try:
+        raw, row = build_refresh_token(user.id, remember)
+        db.session.add(row)
+        db.session.commit()
+        return raw, row.expires_at
+    except Exception:
+        db.session.rollback()
+        return None, None
+
+
+def revoke_family(family_id) -> int:
+    return (
+        RefreshToken.query.filter_by(family_id=family_id, revoked=False)
+        .update({"revoked": True}, synchronize_session=False)
+    )
+
+
+def revoke_user_refresh_tokens(user_id) -> int:
+    """Revoke every active refresh token of a user in one indexed UPDATE (caller commits)."""
+    return (
+        RefreshToken.query.filter_by(usuario_id=user_id, revoked=False)
+        .update({"revoked": True}, synchronize_session=False)
+    )
+
+
+def rotate_refresh_token(raw: str):
+    """Consume ``raw`` and return (user, new_raw, new_row) for the same family.
+
+    Raises RefreshError when the token is unknown, expired or already used.
+    """
+    h = _hash(raw)
+    now = datetime.utcnow()
+    with db.session().primary():
+        row = db.session.get(RefreshToken, h)
+        if row is None:
+            raise RefreshError("invalid")
+        if row.revoked or row.used_at is not None:
+            revoke_family(row.family_id)
+            db.session.commit()
+            raise RefreshError("reused")
+        if row.expires_at < now:
+            raise RefreshError("expired")
+
+        # single-use: only one concurrent exchange can flip used_at
+        claimed = (
+            RefreshToken.query.filter_by(token_hash=h, used_at=None, revoked=False)
+            .update({"used_at": now}, synchronize_session=False)
+        )
+        if claimed != 1:
+            revoke_family(row.family_id)
+            db.session.commit()
+            raise RefreshError("reused")
+
+        user = db.session.get(Usuario, row.usuario_id)
+        if user is None or not user.is_active:
+            revoke_family(row.family_id)
+            db.session.commit()
+            raise RefreshError("invalid")
+
+        new_raw, new_row = build_refresh_token(user.id, row.remember, family_id=row.family_id)
+        db.session.add(new_row)
+        db.session.commit()
+        return user, new_raw, new_row
+
+
+def revoke_refresh_token(raw: str) -> None:
+    """Revoke the family of ``raw`` (used on logout); unknown tokens are ignored."""
+    row = db.session.get(RefreshToken, _hash(raw))
+    if row is not None:
+        revoke_family(row.family_id)
+        db.session.commit()
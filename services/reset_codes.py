@@ -0,0 +1,98 @@
+"""Password reset codes: hashed, one active code per user.
+
+``/auth/forgot`` upserts the user's row in ``password_reset_codes``
+(``INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE``), so asking again replaces
+the previous code instead of piling up rows, and resets the attempt
+counter. ``/auth/verify-reset`` and ``/auth/reset`` load that row by primary
+key and compare hashes.
+
+The codes are six digits, so a plain digest could be reversed by trying all
+of them; the hash is an HMAC keyed with ``SECRET_KEY`` and bound to the
+user id. After ``RESET_CODE_MAX_ATTEMPTS`` wrong codes the row stops
+accepting any code until a new one is requested. A successful reset deletes
+the row.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects import mysql, sqlite
+
+from db.init import db
+from db.password_reset import PasswordReset
+
+
+class ResetCodeError(Exception):
+    """Reset code rejected; ``reason`` is 'invalid', 'expired' or 'locked'."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def hash_code(user_id, code: str) -> str:
+    key = current_app.config["SECRET_KEY"].encode()
+    return hmac.new(key, f"{user_id}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+def build_reset_code(user_id):
+    """Return (code, values) for a new code; ``values`` is the full row to upsert."""
+    code = str(secrets.randbelow(900000) + 100000)
+    now = datetime.utcnow()
+    lifetime = timedelta(seconds=int(current_app.config.get("RESET_CODE_LIFETIME", 15 * 60)))
+    values = {"user_id": user_id, "code_hash": hash_code(user_id, code), "expires_at": now + lifetime,
+              "attempts": 0, "created_at": now}
+    return code, values
+
+
+def upsert_statement(dialect: str, values: dict):
+    """INSERT replacing the user's row, or None when the dialect has no upsert."""
+    table = PasswordReset.__table__
+    replace = {k: v for k, v in values.items() if k != "user_id"}
+    if dialect == "mysql":
+        return mysql.insert(table).values(**values).on_duplicate_key_update(**replace)
+    if dialect == "sqlite":
+        return sqlite.insert(table).values(**values).on_conflict_do_update(index_elements=["user_id"], set_=replace)
+    return None
+
+
+def issue_reset_code(user) -> str:
+    """Create or replace ``user``'s reset code, commit, and return the plaintext code."""
+    code, values = build_reset_code(user.id)
+    stmt = upsert_statement(db.session.connection().dialect.name, values)
+    if stmt is not None:
+        db.session.execute(stmt)
+    else:
+        # generic fallback: keyed by user, so merge() replaces (racy on first insert)
+        db.session.merge(PasswordReset(**values))
+    db.session.commit()
+    return code
+
+
+def check_reset_code(user, code: str) -> PasswordReset:
+    """Return the user's reset row if ``code`` matches it, else raise ResetCodeError.
+
+    A wrong code counts an attempt (committed before raising).
+    """
+    row = db.session.get(PasswordReset, user.id)
+    if row is None:
+        raise ResetCodeError("invalid")
+    if not row.is_valid():
+        raise ResetCodeError("expired")
+    if row.attempts >= int(current_app.config.get("RESET_CODE_MAX_ATTEMPTS", 5)):
+        raise ResetCodeError("locked")
+    if not hmac.compare_digest(row.code_hash, hash_code(user.id, str(code))):
+        # atomic increment; concurrent guesses cannot share one attempt
+        db.session.execute(
+            PasswordReset.__table__.update()
+            .where(PasswordReset.user_id == user.id)
+            .values(attempts=PasswordReset.attempts + 1)
+        )
+        db.session.commit()
+        raise ResetCodeError("invalid")
+    return row
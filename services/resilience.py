@@ -0,0 +1,273 @@
+"""Circuit breakers for the database and SMTP.
+
+Timeouts (``db/timeouts.py``, ``SMTP_TIMEOUT``) bound how long one call can
+hang; a breaker stops sending calls to a dependency that keeps failing. Each
+breaker counts outcomes in a rolling window of one-second buckets
+(``BREAKER_WINDOW``). Once the window holds at least ``BREAKER_MIN_CALLS``
+calls and the failure share reaches ``BREAKER_FAILURE_RATE``, the breaker
+opens and callers fail immediately with :class:`CircuitOpen` (HTTP 503 with
+``Retry-After``). After ``BREAKER_RESET_TIMEOUT`` seconds it goes half-open
+and lets a single probe through: success closes it, failure opens it again.
+
+* ``database`` — fed by engine events: every statement is a success;
+  disconnects, failed connects and timeouts are failures. Other errors,
+  ``OperationalError``s included (deadlocks, lock-wait timeouts, unknown
+  columns), are the caller's problem, not an outage: they neither count nor
+  turn into 503s.
+  While it is open, requests are rejected before any view or DB work runs; in
+  half-open state one request is the probe.
+* ``smtp`` — wraps ``send_reset_email``; ``/auth/forgot`` answers 503 while
+  it is open instead of issuing codes that cannot be delivered.
+
+State is per process and listed at ``GET /healthz/breakers``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import current_app, g, jsonify, request
+
+from db.init import db
+from services.log import logger
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# endpoints that never touch the database
+EXEMPT_ENDPOINTS = frozenset({"health_check", "breaker_status", "static"})
+
+
+class CircuitOpen(Exception):
+    """A call was refused because the dependency's breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Failure-rate breaker with a rolling window and half-open probing."""
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 10,
+                 window: float = 30, reset_timeout: float = 15):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = int(window)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.opened_at = None
+        self._probing = False
+        # [second, successes, failures]
+        self._buckets = deque()
+        self._lock = threading.Lock()
+
+    def _bucket(self, now: float) -> list:
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+            while self._buckets[0][0] <= second - self.window:
+                self._buckets.popleft()
+        return self._buckets[-1]
+
+    def _totals(self):
+        ok = sum(b[1] for b in self._buckets)
+        failed = sum(b[2] for b in self._buckets)
+        return ok, failed
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self._probing = False
+        logger.warning("circuit opened", extra={"breaker": self.name})
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; in half-open state only one probe at a time."""
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return self.state == CLOSED
+
+    def is_open(self) -> bool:
+        """Open and still cooling down (does not claim the half-open probe)."""
+        return self.state == OPEN and self.retry_after() > 0
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._bucket(time.monotonic())[1] += 1
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.opened_at = None
+                self._probing = False
+                self._buckets.clear()
+                logger.info("circuit closed", extra={"breaker": self.name})
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._bucket(now)[2] += 1
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            if self.state == CLOSED:
+                ok, failed = self._totals()
+                if ok + failed >= self.min_calls and failed / (ok + failed) >= self.failure_rate:
+                    self._open(now)
+
+    def release_probe(self) -> None:
+        """End a half-open probe that produced no outcome."""
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def guard(self, failures=(Exception,)):
+        """Run the block through the breaker; ``failures`` count against it."""
+        if not self.allow():
+            raise CircuitOpen(self.name, self.retry_after())
+        try:
+            yield
+        except failures:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release_probe()
+            raise
+        self.record_success()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ok, failed = self._totals()
+            return {"state": self.state, "successes": ok, "failures": failed,
+                    "retryAfter": round(self.retry_after(), 1) if self.state != CLOSED else 0}
+
+
+def get_breaker(name: str, app=None) -> CircuitBreaker:
+    app = app or current_app
+    breakers = app.extensions["breakers"]
+    breaker = breakers.get(name)
+    if breaker is None:
+        cfg = app.config
+        breaker = breakers.setdefault(name, CircuitBreaker(
+            name,
+            failure_rate=float(cfg["BREAKER_FAILURE_RATE"]),
+            min_calls=int(cfg["BREAKER_MIN_CALLS"]),
+            window=float(cfg["BREAKER_WINDOW"]),
+            reset_timeout=float(cfg["BREAKER_RESET_TIMEOUT"]),
+        ))
+    return breaker
+
+
+# MySQL client errors: can't connect (socket / TCP), server gone away, lost
+# connection during query, max_execution_time exceeded
+MYSQL_OUTAGE_CODES = frozenset({2002, 2003, 2006, 2013, 3024})
+# SQLite: DB_STATEMENT_TIMEOUT's progress handler, unreadable database file
+SQLITE_OUTAGE_MESSAGES = ("interrupted", "unable to open database file")
+
+
+def is_outage(exc, is_disconnect: bool = False) -> bool:
+    """True if a DBAPI error means the database is unreachable or too slow."""
+    if is_disconnect or getattr(exc, "connection_invalidated", False):
+        return True
+    if not isinstance(exc, (sa.exc.OperationalError, sa.exc.InterfaceError)):
+        return False
+    orig = getattr(exc, "orig", None)
+    code = getattr(orig, "errno", None)
+    if code is None and orig is not None and orig.args and isinstance(orig.args[0], int):
+        code = orig.args[0]
+    if code in MYSQL_OUTAGE_CODES:
+        return True
+    message = str(orig).lower()
+    return any(m in message for m in SQLITE_OUTAGE_MESSAGES)
+
+
+def watch_engine(breaker: CircuitBreaker, engine) -> None:
+    """Feed ``breaker`` from ``engine``'s statements (sync engine or AsyncEngine.sync_engine)."""
+
+    def on_success(conn, cursor, statement, parameters, context, executemany):
+        breaker.record_success()
+
+    def on_error(context):
+        if is_outage(context.sqlalchemy_exception, context.is_disconnect):
+            breaker.record_failure()
+
+    sa.event.listen(engine, "after_cursor_execute", on_success)
+    sa.event.listen(engine, "handle_error", on_error)
+
+
+def _unavailable(name: str, retry_after: float):
+    resp = jsonify({"error": "service unavailable", "dependency": name})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+    return resp
+
+
+def breaker_status():
+    return {name: b.snapshot() for name, b in sorted(current_app.extensions["breakers"].items())}, 200
+
+
+def init_resilience(app) -> None:
+    """Create the breakers, gate requests on the database one, map failures to 503."""
+    app.config.setdefault("BREAKER_FAILURE_RATE", 0.5)
+    app.config.setdefault("BREAKER_MIN_CALLS", 10)
+    app.config.setdefault("BREAKER_WINDOW", 30)
+    app.config.setdefault("BREAKER_RESET_TIMEOUT", 15)
+    app.extensions["breakers"] = {}
+    database = get_breaker("database", app)
+    get_breaker("smtp", app)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        watch_engine(database, engine)
+
+    @app.before_request
+    def _database_gate():
+        if request.endpoint in EXEMPT_ENDPOINTS or database.state == CLOSED:
+            return None
+        if not database.allow():
+            return _unavailable(database.name, database.retry_after())
+        g._breaker_probe = database
+        return None
+
+    @app.teardown_request
+    def _end_probe(exc):
+        probe = g.pop("_breaker_probe", None)
+        if probe is not None and probe.state == HALF_OPEN:
+            probe.release_probe()
+
+    @app.errorhandler(CircuitOpen)
+    def _circuit_open(e: CircuitOpen):
+        return _unavailable(e.name, e.retry_after)
+
+    @app.errorhandler(sa.exc.OperationalError)
+    def _database_error(e):
+        if not is_outage(e):
+            # a query bug or contention, not an outage: fail as any other error
+            raise e
+        logger.error("database unavailable", exc_info=e)
+        db.session.rollback()
+        return _unavailable("database", database.retry_after())
+
+    @app.errorhandler(sa.exc.TimeoutError)
+    def _pool_timeout(e):
+        # no free pooled connection: the pool never reached handle_error
+        database.record_failure()
+        logger.error("database pool exhausted", exc_info=e)
+        return _unavailable("database", database.retry_after())
+
+    app.add_url_rule("/healthz/breakers", view_func=breaker_status, methods=["GET"])
@@ -0,0 +1,119 @@
+"""Per-user session management for DB-backed session tokens.
+
+Every login adds a ``session_tokens`` row. ``MAX_SESSIONS_PER_USER`` caps the
+active (unrevoked, unexpired) rows per user: issuing one past the cap
+revokes the oldest ones. ``revoke_user_sessions`` logs a user out
+everywhere, for deactivation and password changes. It revokes session and
+refresh tokens in one bulk UPDATE each, both on ``(usuario_id, revoked)``
+indexes, and denylists the user's signed tokens.
+
+Revocations also evict the cached token lookups (``session:<hash>``, tagged
+``user:<id>``, see ``main.load_user_from_request``) through ``get_cache()``.
+Lookups are only cached with a shared tier, whose invalidations reach every
+worker; without one each worker reads the ``revoked`` flag on every request,
+so a revocation of a DB token takes effect everywhere either way.
+
+Signed tokens are stateless, so the cap does not apply to them. Their
+revocations go to the denylist in the shared tier; without ``CACHE_URL``
+signed mode is not available (see ``services/tokens.py``).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import current_app
+
+from db.init import db
+from db.session_token import SessionToken
+from services.cache import get_cache
+from services.refresh import revoke_user_refresh_tokens
+from services.tokens import revoke_user_signed_tokens
+
+
+def _active(user_id):
+    return SessionToken.query.filter(
+        SessionToken.usuario_id == user_id,
+        SessionToken.revoked.is_(False),
+        SessionToken.expires_at > datetime.utcnow(),
+    )
+
+
+def session_cap() -> int:
+    return int(current_app.config.get("MAX_SESSIONS_PER_USER", 10))
+
+
+def over_cap_statement(user_id, cap: int):
+    """SELECT the hashes of the user's active sessions beyond the ``cap`` newest."""
+    return (
+        sa.select(SessionToken.token_hash)
+        .where(
+            SessionToken.usuario_id == user_id,
+            SessionToken.revoked.is_(False),
+            SessionToken.expires_at > datetime.utcnow(),
+        )
+        .order_by(SessionToken.created_at.desc(), SessionToken.token_hash)
+        .offset(cap)
+    )
+
+
+def revoke_statement(hashes):
+    return (
+        sa.update(SessionToken)
+        .where(SessionToken.token_hash.in_(hashes))
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def evict_cached(hashes) -> None:
+    cache = get_cache()
+    for h in hashes:
+        cache.delete(f"session:{h}")
+
+
+def enforce_session_cap(user_id) -> int:
+    """Revoke the user's oldest active sessions beyond the cap (caller commits).
+
+    Returns how many were revoked.
+    """
+    cap = session_cap()
+    if cap <= 0:
+        return 0
+    stale = db.session.execute(over_cap_statement(user_id, cap)).scalars().all()
+    if stale:
+        db.session.execute(revoke_statement(stale))
+        evict_cached(stale)
+    return len(stale)
+
+
+def revoke_user_sessions(user_id) -> int:
+    """Revoke every session and refresh token of ``user_id`` and commit.
+
+    Returns the number of session tokens revoked.
+    """
+    revoked = (
+        SessionToken.query.filter_by(usuario_id=user_id, revoked=False)
+        .update({"revoked": True}, synchronize_session=False)
+    )
+    revoke_user_refresh_tokens(user_id)
+    db.session.commit()
+    get_cache().invalidate_tag(f"user:{user_id}")
+    revoke_user_signed_tokens(user_id)
+    return revoked
+
+
+def list_sessions(user_id) -> list:
+    """The user's active sessions, newest first."""
+    return _active(user_id).order_by(SessionToken.created_at.desc()).all()
+
+
+def session_to_dict(st: SessionToken) -> dict:
+    # a prefix of the hash identifies the session without exposing the lookup key
+    return {
+        "id": st.token_hash[:12],
+        "createdAt": st.created_at.isoformat() + "Z",
+        "expiresAt": st.expires_at.isoformat() + "Z",
+        "lastUsed": st.last_used.isoformat() + "Z" if st.last_used else None,
+    }
@@ -0,0 +1,171 @@
+"""Incremental per-room / per-hint funnel rollups.
+
+Counters live in ``room_stats`` and ``hint_stats`` and are bumped by
+``apply_event`` from ``services.events.record_event``, i.e. in the same
+transaction as the completion that caused them. Each bump is a single
+``INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE col = col + n`` so concurrent
+completions never lose increments and no row has to exist beforehand.
+
+``/stats`` reads only these tables; ``rebuild_stats`` recomputes them from
+``usuarios_rooms``, ``usuarios_hints`` and ``progress_events`` when they drift
+(e.g. after manual data fixes) or the first time the feature is deployed.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql, sqlite
+
+from db.init import db
+from db.progress_event import HINT_COMPLETED, ROOM_COMPLETED, ROOM_UNLOCKED, ProgressEvent
+from db.room import Hint, Room, UsuarioHint, UsuarioRoom
+from db.stats import HintStats, RoomStats
+
+
+def _upsert_increment(model, keys: dict, deltas: dict) -> None:
+    table = model.__table__
+    now = datetime.utcnow()
+    dialect = db.session.connection().dialect.name
+    values = {**keys, **deltas, "updated_at": now}
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            updated_at=now, **{col: table.c[col] + n for col, n in deltas.items()}
+        )
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns.keys()),
+            set_={"updated_at": now, **{col: table.c[col] + n for col, n in deltas.items()}},
+        )
+    else:
+        # generic fallback: update, insert if missing (racy on first insert)
+        pk = [table.c[k] == v for k, v in keys.items() if k in table.primary_key.columns]
+        result = db.session.execute(
+            table.update().where(*pk).values(updated_at=now, **{col: table.c[col] + n for col, n in deltas.items()})
+        )
+        if result.rowcount:
+            return
+        stmt = table.insert().values(**values)
+    db.session.execute(stmt)
+
+
+def apply_event(kind: str, room_id=None, hint_id=None, points: int = 0) -> None:
+    """Bump the rollup counters for one progress event (caller commits)."""
+    if room_id is None:
+        return
+    if kind == ROOM_UNLOCKED:
+        _upsert_increment(RoomStats, {"room_id": room_id}, {"unlocked": 1})
+    elif kind == ROOM_COMPLETED:
+        _upsert_increment(RoomStats, {"room_id": room_id}, {"completed": 1, "points_awarded": points})
+    elif kind == HINT_COMPLETED and hint_id is not None:
+        _upsert_increment(RoomStats, {"room_id": room_id}, {"hints_completed": 1, "points_awarded": points})
+        _upsert_increment(HintStats, {"hint_id": hint_id, "room_id": room_id}, {"completed": 1})
+
+
+def room_funnel(exhibition_id: int) -> list:
+    """Return one exhibition's per-room funnel stats, built from the rollup tables only."""
+    rooms = db.session.execute(
+        sa.select(Room.id, Room.name, RoomStats.unlocked, RoomStats.completed, RoomStats.points_awarded)
+        .outerjoin(RoomStats, RoomStats.room_id == Room.id)
+        .where(Room.exhibition_id == exhibition_id)
+        .order_by(Room.position, Room.id)
+    ).all()
+    hints = db.session.execute(
+        sa.select(Hint.id, Hint.room_id, Hint.title, HintStats.completed)
+        .outerjoin(HintStats, HintStats.hint_id == Hint.id)
+        .where(Hint.exhibition_id == exhibition_id)
+        .order_by(Hint.room_id, Hint.id)
+    ).all()
+    by_room = {}
+    for h in hints:
+        by_room.setdefault(h.room_id, []).append(h)
+
+    result = []
+    for r in rooms:
+        unlocked = r.unlocked or 0
+        hints_out = []
+        for h in by_room.get(r.id, []):
+            completed = h.completed or 0
+            hints_out.append({
+                "id": h.id,
+                "title": h.title,
+                "completed": completed,
+                # unlocked the room but haven't solved this hint yet
+                "stuck": max(unlocked - completed, 0),
+            })
+        result.append({
+            "id": r.id,
+            "name": r.name,
+            "unlocked": unlocked,
+            "completed": r.completed or 0,
+            "completionRate": round((r.completed or 0) / unlocked, 4) if unlocked else 0.0,
+            "pointsAwarded": r.points_awarded or 0,
+            "avgPoints": round((r.points_awarded or 0) / unlocked, 2) if unlocked else 0.0,
+            "hints": hints_out,
+        })
+    return result
+
+
+def rebuild_stats() -> tuple:
+    """Recompute every rollup row from the raw tables (caller commits).
+
+    Returns (room_rows, hint_rows) written.
+    """
+    now = datetime.utcnow()
+    room_counts = {
+        row.room_id: row
+        for row in db.session.execute(
+            sa.select(
+                UsuarioRoom.room_id,
+                sa.func.sum(sa.case((UsuarioRoom.is_unlocked == sa.true(), 1), else_=0)).label("unlocked"),
+                sa.func.sum(sa.case((UsuarioRoom.completed == sa.true(), 1), else_=0)).label("completed"),
+            ).group_by(UsuarioRoom.room_id)
+        )
+    }
+    hint_counts = {
+        row.hint_id: row.completed
+        for row in db.session.execute(
+            sa.select(UsuarioHint.hint_id, sa.func.count().label("completed"))
+            .where(UsuarioHint.completed == sa.true())
+            .group_by(UsuarioHint.hint_id)
+        )
+    }
+    # points are not kept per room in the raw progress tables, only in the event log
+    points = dict(
+        db.session.execute(
+            sa.select(ProgressEvent.room_id, sa.func.sum(ProgressEvent.points))
+            .where(ProgressEvent.room_id.is_not(None))
+            .group_by(ProgressEvent.room_id)
+        ).all()
+    )
+    hints = db.session.execute(sa.select(Hint.id, Hint.room_id)).all()
+    hints_completed = {}
+    for h in hints:
+        hints_completed[h.room_id] = hints_completed.get(h.room_id, 0) + hint_counts.get(h.id, 0)
+
+    room_rows = []
+    for (room_id,) in db.session.execute(sa.select(Room.id)).all():
+        counts = room_counts.get(room_id)
+        room_rows.append({
+            "room_id": room_id,
+            "unlocked": int(counts.unlocked or 0) if counts else 0,
+            "completed": int(counts.completed or 0) if counts else 0,
+            "hints_completed": hints_completed.get(room_id, 0),
+            "points_awarded": int(points.get(room_id) or 0),
+            "updated_at": now,
+        })
+    hint_rows = [
+        {"hint_id": h.id, "room_id": h.room_id, "completed": hint_counts.get(h.id, 0), "updated_at": now}
+        for h in hints
+    ]
+
+    db.session.execute(sa.delete(HintStats))
+    db.session.execute(sa.delete(RoomStats))
+    if room_rows:
+        db.session.execute(sa.insert(RoomStats), room_rows)
+    if hint_rows:
+        db.session.execute(sa.insert(HintStats), hint_rows)
+    return len(room_rows), len(hint_rows)
@@ -0,0 +1,72 @@
+"""Per-request exhibition (tenant) resolution.
+
+The exhibition is chosen by slug from the ``X-Exhibition`` header or the
+``exhibition`` query parameter, falling back to ``DEFAULT_EXHIBITION``. The
+slug -> id map is tiny and cached in-process for ``CATALOG_TTL`` seconds like
+the catalog itself, so resolving the tenant costs no query per request.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+from flask import current_app, g, jsonify, request
+
+from db.init import db
+from db.exhibition import Exhibition
+
+HEADER = "X-Exhibition"
+
+_lock = threading.Lock()
+
+
+def _exhibition_map(app) -> dict:
+    state = app.extensions.get("exhibitions")
+    ttl = float(app.config.get("CATALOG_TTL", 300))
+    if state is not None and time.monotonic() - state[1] < ttl:
+        return state[0]
+    with _lock:
+        state = app.extensions.get("exhibitions")
+        if state is not None and time.monotonic() - state[1] < ttl:
+            return state[0]
+        rows = db.session.execute(
+            db.select(Exhibition.slug, Exhibition.id).where(Exhibition.is_active == db.true())
+        ).all()
+        mapping = {slug: ex_id for slug, ex_id in rows}
+        app.extensions["exhibitions"] = (mapping, time.monotonic())
+        return mapping
+
+
+def resolve_exhibition(slug: str) -> Optional[int]:
+    """Return the id of the active exhibition with this slug, else None."""
+    return _exhibition_map(current_app._get_current_object()).get(slug)
+
+
+def current_exhibition_id() -> Optional[int]:
+    """Exhibition selected for the current request (set in before_request)."""
+    if "exhibition_id" not in g:
+        g.exhibition_id = resolve_exhibition(current_app.config.get("DEFAULT_EXHIBITION", "default"))
+    return g.exhibition_id
+
+
+def invalidate_exhibitions(app=None) -> None:
+    app = app or current_app._get_current_object()
+    app.extensions.pop("exhibitions", None)
+
+
+def init_tenancy(app) -> None:
+    app.config.setdefault("DEFAULT_EXHIBITION", "default")
+
+    @app.before_request
+    def _select_exhibition():
+        slug = request.headers.get(HEADER) or request.args.get("exhibition")
+        if not slug:
+            # resolved lazily, so routes that never touch the catalog stay query-free
+            return None
+        exhibition_id = resolve_exhibition(slug)
+        if exhibition_id is None:
+            return jsonify({"error": "exhibition not found"}), 404
+        g.exhibition_id = exhibition_id
+        return None
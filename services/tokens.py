@@ -0,0 +1,210 @@
+"""Session token issuing and validation.
+
+Two token modes, selected with ``SESSION_TOKEN_MODE``:
+
+* ``db`` (default) — opaque random token; only its sha256 is stored in
+  ``session_tokens`` and every request looks it up (see ``main.py``).
+* ``signed`` — compact token signed with ``SECRET_KEY`` via itsdangerous,
+  carrying user id, role, issue time and expiry. Validation is CPU only.
+  Revocation uses a small denylist (per token id, plus a per-user
+  "revoked before" timestamp) that is only consulted for unexpired tokens.
+  The denylist lives in the shared cache tier so a logout on one worker
+  applies to all of them; without ``CACHE_URL`` there is nowhere to keep it,
+  so ``init_session_tokens`` falls back to ``db`` mode and signed tokens are
+  rejected.
+
+Both kinds are accepted on input regardless of the configured mode, so the
+mode can be switched without logging everybody out. Opaque tokens never
+contain a ``.``, signed tokens always do.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import secrets
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_login import UserMixin
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from db.init import db
+from db.session_token import SessionToken
+from db.usuario import Usuario
+from services.log import logger
+
+SIGNED_SALT = "museo.session-token"
+
+
+def token_lifetime() -> int:
+    return int(current_app.config.get("SESSION_TOKEN_LIFETIME", 3600))
+
+
+def new_opaque_token():
+    """Return (raw_token, token_hash, expires_at) for a DB-backed session."""
+    raw_token = secrets.token_urlsafe(48)
+    token_hash = hashlib.sha256(raw_token.encode()).hexdigest()
+    expires = datetime.utcnow() + timedelta(seconds=token_lifetime())
+    return raw_token, token_hash, expires
+
+
+def _serializer() -> URLSafeSerializer:
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=SIGNED_SALT)
+
+
+def issue_signed_token(user_id, role: str):
+    """Return (raw_token, expires_at) for a stateless signed session."""
+    now = time.time()
+    exp = int(now) + token_lifetime()
+    claims = {
+        "u": uuid.UUID(str(user_id)).hex,
+        "r": role,
+        # issue time in ms so a revocation and a fresh login in the same
+        # second are still ordered
+        "i": int(now * 1000),
+        "e": exp,
+        "j": secrets.token_urlsafe(6),
+    }
+    return _serializer().dumps(claims), datetime.utcfromtimestamp(exp)
+
+
+def issue_session_token(user):
+    """Issue a session token for ``user`` in the configured mode.
+
+    DB tokens past ``MAX_SESSIONS_PER_USER`` revoke the user's oldest ones.
+
+    Returns (raw_token, expires_at); raw_token is None if issuing failed.
+    """
+    if current_app.config.get("SESSION_TOKEN_MODE", "db") == "signed":
+        return issue_signed_token(user.id, user.role)
+    # services.sessions imports this module
+    from services.sessions import enforce_session_cap
+    try:
+        raw_token, token_hash, expires = new_opaque_token()
+        st = SessionToken(token_hash=token_hash, usuario_id=user.id, expires_at=expires)
+        db.session.add(st)
+        db.session.flush()
+        enforce_session_cap(user.id)
+        db.session.commit()
+        return raw_token, expires
+    except Exception:
+        db.session.rollback()
+        return None, None
+
+
+def is_signed_token(raw: str) -> bool:
+    return "." in raw
+
+
+class Denylist:
+    """Expiring set of revoked token ids and per-user revocation times.
+
+    Kept in the shared cache tier so revocations reach every worker. Entries
+    expire together with the tokens they revoke, so the list stays small.
+    Unlike the LRU tier it is never evicted for capacity, which would
+    silently un-revoke tokens.
+    """
+
+    def __init__(self, shared):
+        self.shared = shared
+
+    def _set(self, key: str, value: int, ttl: float) -> None:
+        if ttl > 0:
+            self.shared.set(key, value, ttl=ttl)
+
+    def revoke_token(self, jti: str, expires_at: int) -> None:
+        self._set(f"deny:{jti}", 1, expires_at - time.time())
+
+    def revoke_user(self, user_id, lifetime: int) -> None:
+        # any signed token issued up to now for this user becomes invalid
+        self._set(f"revoked_before:{uuid.UUID(str(user_id)).hex}", int(time.time() * 1000), lifetime)
+
+    def is_revoked(self, claims: dict) -> bool:
+        if self.shared.get(f"deny:{claims['j']}") is not None:
+            return True
+        before = self.shared.get(f"revoked_before:{claims['u']}")
+        return before is not None and claims["i"] <= before
+
+
+def get_denylist():
+    """The app's denylist, or None without a shared cache tier."""
+    app = current_app._get_current_object()
+    denylist = app.extensions.get("token_denylist")
+    if denylist is None:
+        shared = getattr(app.extensions.get("cache"), "shared", None)
+        if shared is None:
+            return None
+        denylist = Denylist(shared)
+        app.extensions["token_denylist"] = denylist
+    return denylist
+
+
+def init_session_tokens(app) -> None:
+    """Check SESSION_TOKEN_MODE against the cache setup; call after ``init_cache``."""
+    app.config.setdefault("SESSION_TOKEN_MODE", "db")
+    if app.config["SESSION_TOKEN_MODE"] == "signed" and app.extensions["cache"].shared is None:
+        logger.warning("SESSION_TOKEN_MODE=signed needs a shared cache (CACHE_URL) for revocations; "
+                       "using db session tokens")
+        app.config["SESSION_TOKEN_MODE"] = "db"
+
+
+def decode_signed_token(raw: str):
+    """Return the claims of a valid, unexpired, unrevoked signed token, else None."""
+    try:
+        claims = _serializer().loads(raw)
+    except BadSignature:
+        return None
+    if not isinstance(claims, dict) or claims.get("e", 0) < time.time():
+        return None
+    denylist = get_denylist()
+    # without a shared denylist a revocation could not be checked
+    if denylist is None or denylist.is_revoked(claims):
+        return None
+    return claims
+
+
+def revoke_signed_token(raw: str) -> bool:
+    claims = decode_signed_token(raw)
+    if claims is None:
+        return False
+    get_denylist().revoke_token(claims["j"], claims["e"])
+    return True
+
+
+def revoke_user_signed_tokens(user_id) -> None:
+    denylist = get_denylist()
+    # no denylist: signed tokens are not accepted at all
+    if denylist is not None:
+        denylist.revoke_user(user_id, token_lifetime())
+
+
+class TokenUser(UserMixin):
+    """Identity built from signed-token claims without touching the DB.
+
+    ``id`` and ``role`` come from the token. Any other attribute (email,
+    nombre, usuario_hints, ...) loads the ``Usuario`` row on first access, so
+    routes that only need the id never query the user.
+    """
+
+    def __init__(self, claims: dict):
+        self.id = uuid.UUID(claims["u"])
+        self.role = claims["r"]
+        self.token_claims = claims
+        self._user = None
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+    def _load(self):
+        if self._user is None:
+            self._user = db.session.get(Usuario, self.id)
+            if self._user is None:
+                raise AttributeError("user no longer exists")
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
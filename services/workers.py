@@ -0,0 +1,48 @@
+"""Process lifecycle hooks for pre-forking servers (see gunicorn.conf.py).
+
+With ``preload_app`` the master imports ``main`` once, and every worker is
+forked from it. That lets the workers share the interpreter, the app and
+the warmed catalog copy-on-write. It also means the master's state is
+copied into each worker: pooled DB connections (``main.py`` touches the
+database at import), the cache's pub/sub listener and its node id, and the
+log writer thread.
+``after_fork`` replaces those in the child.
+"""
+
+from __future__ import annotations
+
+from db.init import db
+from db.exhibition import Exhibition
+from services import log
+from services.cache import get_cache
+from services.catalog import get_catalog
+from services.tenancy import resolve_exhibition
+
+
+def warm_app(app) -> None:
+    """Load the exhibition map and every active catalog, then release connections.
+
+    Run in the master before forking so workers start with warm caches.
+    Catalogs reloaded after ``CATALOG_TTL`` are per worker again.
+    """
+    with app.app_context():
+        resolve_exhibition(app.config.get("DEFAULT_EXHIBITION", "default"))
+        ids = db.session.execute(
+            db.select(Exhibition.id).where(Exhibition.is_active == db.true())
+        ).scalars().all()
+        for exhibition_id in ids:
+            get_catalog(exhibition_id)
+        db.session.remove()
+        # the master serves no requests; do not keep connections open in it
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def after_fork(app) -> None:
+    """Drop inherited DB connections and restart per-process listeners."""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the sockets belong to the parent; just forget them
+            engine.dispose(close=False)
+    get_cache(app).after_fork()
+    log.after_fork()
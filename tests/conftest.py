@@ -0,0 +1,129 @@
+"""Shared fixtures: one app per test on its own temporary SQLite file.
+
+Files get the WAL profile of ``db/sqlite.py``, so concurrent connections
+(the events poller, async mode) only ever see committed data, as on MySQL.
+
+Budgets declared with ``@query_budget`` are enforced, so a route that starts
+running more SQL than it declares fails the test that calls it.
+"""
+
+import tempfile
+import uuid
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from db.init import db
+from db.exhibition import DEFAULT_EXHIBITION_ID
+from db.room import Hint, Room
+from db.usuario import Usuario
+from main import create_app
+from services.catalog import invalidate_catalog
+
+PASSWORD = "Secret123"
+# cheap hashes for seeded users; the routes still use the default method
+_HASH = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+# removed when the test process exits
+_DB_DIR = tempfile.TemporaryDirectory(prefix="museo-test-")
+
+
+def make_app(**overrides):
+    config = {
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{_DB_DIR.name}/{uuid.uuid4().hex}.db",
+        "SQLALCHEMY_BINDS": {},
+        "QUERY_BUDGET_ENFORCE": True,
+        "CACHE_URL": None,
+        "SESSION_TOKEN_MODE": "db",
+        "API_MODE": "sync",
+        "DEFAULT_EXHIBITION": "default",
+        "EVENTS_POLL_INTERVAL": 0.05,
+        "EVENTS_HEARTBEAT": 0.05,
+    }
+    config.update(overrides)
+    return create_app(config)
+
+
+def seed() -> dict:
+    """Two rooms in the default exhibition: 'Entrada' (final code) -> 'Galería' (all hints)."""
+    entry = Room(exhibition_id=DEFAULT_EXHIBITION_ID, position=1, name="Sala 1: Entrada", final_code="ABC")
+    gallery = Room(exhibition_id=DEFAULT_EXHIBITION_ID, position=2, name="Sala 2: Galería")
+    db.session.add_all([entry, gallery])
+    db.session.flush()
+    hints = [
+        Hint(room_id=entry.id, exhibition_id=DEFAULT_EXHIBITION_ID, title="Pista 1", image_path="S1P1.png"),
+        Hint(room_id=gallery.id, exhibition_id=DEFAULT_EXHIBITION_ID, title="Pista 1", access_code="K1"),
+        Hint(room_id=gallery.id, exhibition_id=DEFAULT_EXHIBITION_ID, title="Pista 2", access_code="K2"),
+    ]
+    db.session.add_all(hints)
+    users = {
+        "user": Usuario(id=uuid.uuid4(), nombre="Ana", apellido="Museo", email="ana@example.com", password=_HASH),
+        "other": Usuario(id=uuid.uuid4(), nombre="Luis", apellido="Museo", email="luis@example.com", password=_HASH),
+        "admin": Usuario(id=uuid.uuid4(), nombre="Admin", apellido="Museo", email="admin@example.com",
+                         password=_HASH, role="ADMIN"),
+    }
+    db.session.add_all(users.values())
+    db.session.commit()
+    invalidate_catalog()
+    return {
+        "rooms": [entry.id, gallery.id],
+        "hints": {entry.id: [hints[0].id], gallery.id: [hints[1].id, hints[2].id]},
+        "users": {k: {"id": str(u.id), "email": u.email} for k, u in users.items()},
+    }
+
+
+@pytest.fixture
+def app():
+    app = make_app()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def workers(request, tmp_path):
+    """Two apps on one SQLite file, standing in for two gunicorn workers.
+
+    Parametrize indirectly with a dict to override their config.
+    """
+    uri = f"sqlite:///{tmp_path / 'museo.db'}"
+    overrides = getattr(request, "param", {})
+    apps = [make_app(SQLALCHEMY_DATABASE_URI=uri, **overrides) for _ in range(2)]
+    with apps[0].app_context():
+        seed()
+    yield apps
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def data(app):
+    with app.app_context():
+        return seed()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email, password=PASSWORD) -> dict:
+    resp = client.post("/auth/login", json={"email": email, "password": password})
+    assert resp.status_code == 200, resp.get_json()
+    return {"Authorization": f"Bearer {resp.get_json()['sessionToken']}"}
+
+
+@pytest.fixture
+def user_headers(client, data):
+    return login(client, data["users"]["user"]["email"])
+
+
+@pytest.fixture
+def admin_headers(client, data):
+    return login(client, data["users"]["admin"]["email"])
@@ -0,0 +1,60 @@
+import pytest
+from flask import jsonify
+
+from conftest import make_app
+from db.init import db
+from db.query_budget import QueryBudgetExceeded, count_queries, query_budget
+
+
+def test_healthz(client):
+    assert client.get("/healthz").get_json() == {"status": "healthy"}
+
+
+def test_exhibitions(client):
+    assert client.get("/exhibitions").get_json() == [{"id": 1, "slug": "default", "name": "Exhibición principal"}]
+
+
+def test_apps_do_not_share_databases(app, data):
+    other = make_app()
+    with other.app_context():
+        assert db.session.execute(db.text("SELECT count(*) FROM usuarios")).scalar() == 0
+    with app.app_context():
+        assert db.session.execute(db.text("SELECT count(*) FROM usuarios")).scalar() == 3
+
+
+def test_sqlite_profile_enforces_foreign_keys(app):
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_uncommitted_writes_stay_invisible(app, data):
+    with app.app_context():
+        db.session.execute(db.text("UPDATE usuarios SET nombre = 'Sin commit'"))
+        # another pooled connection, as another request would use
+        with db.engine.connect() as other:
+            names = other.execute(db.text("SELECT DISTINCT nombre FROM usuarios")).scalars().all()
+        db.session.rollback()
+    assert "Sin commit" not in names
+
+
+def test_query_budget_is_enforced():
+    app = make_app()
+
+    @app.route("/_probe/<int:n>")
+    @query_budget(1)
+    def probe(n):
+        for _ in range(n):
+            db.session.execute(db.text("SELECT 1"))
+        return jsonify(ok=True)
+
+    client = app.test_client()
+    assert client.get("/_probe/1").headers["X-Query-Count"] == "1"
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/_probe/2")
+
+
+def test_count_queries(app):
+    with app.app_context(), count_queries() as counter:
+        db.session.execute(db.text("SELECT 1"))
+        db.session.execute(db.text("SELECT 2"))
+    assert counter[0] == 2
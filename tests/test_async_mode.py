@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from conftest import login, make_app, seed
+from db.init import db
+
+
+@pytest.fixture
+def async_app():
+    app = make_app(API_MODE="async")
+    yield app
+    app.extensions["async_runtime"].dispose()
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_async_views_match_sync_ones(async_app, monkeypatch):
+    with async_app.app_context():
+        data = seed()
+    client = async_app.test_client()
+    headers = login(client, "ana@example.com")
+
+    resp = client.get("/rooms", headers=headers)
+    assert resp.headers["Cache-Control"] == "private, no-cache"
+    rooms = resp.get_json()
+    assert [(r["isUnlocked"], r["completed"]) for r in rooms] == [(True, False), (False, False)]
+    gallery = data["rooms"][1]
+    hints = client.get(f"/rooms/{gallery}", headers=headers).get_json()["hints"]
+    assert [h["accessCode"] for h in hints] == ["K1", "K2"]
+    state = client.get("/rooms/state", headers=headers).get_json()
+    assert state["rooms"] == {str(data["rooms"][0]): 1, str(gallery): 0}
+    assert client.get(f"/catalog/{state['catalog']}", headers=headers).status_code == 200
+
+    import controllers.auth_async
+    sent = []
+    monkeypatch.setattr(controllers.auth_async, "send_reset_email", lambda to, code: sent.append(code), raising=False)
+    assert client.post("/auth/forgot", json={"email": "ana@example.com"}).status_code == 200
+    for _ in range(2):
+        client.post("/auth/forgot", json={"email": "ana@example.com"}, headers={"Idempotency-Key": "retry"})
+    assert len(sent) == 2
+
+
+def test_async_login_enforces_session_cap(async_app):
+    with async_app.app_context():
+        seed()
+    async_app.config["MAX_SESSIONS_PER_USER"] = 1
+    client = async_app.test_client()
+    first = login(client, "ana@example.com")
+    second = login(client, "ana@example.com")
+    assert client.get("/auth/me", headers=first).status_code == 401
+    assert client.get("/auth/me", headers=second).status_code == 200
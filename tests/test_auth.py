@@ -0,0 +1,129 @@
+import controllers.auth
+from conftest import PASSWORD, login
+from db.init import db
+from db.password_reset import PasswordReset
+
+
+def test_register_creates_progress_rows(client, data):
+    resp = client.post("/auth/register", json={
+        "nombre": "Eva", "apellido": "Nueva", "email": "eva@example.com", "password": "Passw0rd!",
+    })
+    assert resp.status_code == 201
+    body = resp.get_json()
+    assert body["email"] == "eva@example.com"
+    headers = {"Authorization": f"Bearer {body['sessionToken']}"}
+    assert "refreshToken" in body
+
+    rooms = client.get("/rooms", headers=headers).get_json()
+    assert [(r["isUnlocked"], r["completed"]) for r in rooms] == [(True, False), (False, False)]
+
+
+def test_register_rejects_missing_fields_and_duplicates(client, data):
+    assert client.post("/auth/register", json={"email": "x@example.com"}).status_code == 400
+    resp = client.post("/auth/register", json={
+        "nombre": "Ana", "apellido": "Otra", "email": data["users"]["user"]["email"], "password": "Passw0rd!",
+    })
+    assert resp.status_code == 400
+    # same address in another case: the unique normalized index rejects it on insert
+    resp = client.post("/auth/register", json={
+        "nombre": "Ana", "apellido": "Otra", "email": " ANA@Example.com", "password": "Passw0rd!",
+    })
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "email already registered"}
+    assert int(resp.headers["X-Query-Count"]) <= 1
+
+
+def test_email_lookups_ignore_case_and_spaces(client, data, monkeypatch):
+    headers = login(client, " Ana@EXAMPLE.com ")
+    assert client.get("/auth/me", headers=headers).get_json()["email"] == "ana@example.com"
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: None)
+    assert client.post("/auth/forgot", json={"email": "ANA@example.com"}).status_code == 200
+
+
+def test_login_and_me(client, data):
+    assert client.post("/auth/login", json={"email": "ana@example.com", "password": "wrong"}).status_code == 401
+    assert client.post("/auth/login", json={"email": "ana@example.com"}).status_code == 400
+
+    headers = login(client, "ana@example.com")
+    resp = client.get("/auth/me", headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["email"] == "ana@example.com"
+    assert int(resp.headers["X-Query-Count"]) <= 4
+
+
+def test_me_requires_token(client, data):
+    assert client.get("/auth/me").status_code == 401
+    assert client.get("/auth/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_refresh_rotates_and_detects_reuse(client, data):
+    first = client.post("/auth/login", json={"email": "ana@example.com", "password": PASSWORD}).get_json()
+    resp = client.post("/auth/refresh", json={"refreshToken": first["refreshToken"]})
+    assert resp.status_code == 200
+    rotated = resp.get_json()
+    assert rotated["refreshToken"] != first["refreshToken"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {rotated['sessionToken']}"}).status_code == 200
+
+    # presenting the old token again revokes the whole family
+    assert client.post("/auth/refresh", json={"refreshToken": first["refreshToken"]}).status_code == 401
+    assert client.post("/auth/refresh", json={"refreshToken": rotated["refreshToken"]}).status_code == 401
+    assert client.post("/auth/refresh", json={}).status_code == 400
+
+
+def test_logout_revokes_session_token(client, data):
+    headers = login(client, "ana@example.com")
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_password_reset_flow(client, data, monkeypatch):
+    sent = {}
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: sent.update(to=to, code=code))
+
+    assert client.post("/auth/forgot", json={"email": "nadie@example.com"}).status_code == 404
+    assert client.post("/auth/forgot", json={"email": "ana@example.com"}).status_code == 200
+    assert sent["to"] == "ana@example.com"
+
+    payload = {"email": "ana@example.com", "code": sent["code"]}
+    assert client.post("/auth/verify-reset", json=dict(payload, code="000000")).status_code == 400
+    assert client.post("/auth/verify-reset", json=payload).status_code == 200
+
+    resp = client.post("/auth/reset", json=dict(payload, new_password="NewSecret456"))
+    assert resp.status_code == 200
+    # codes are single use
+    assert client.post("/auth/reset", json=dict(payload, new_password="Again789xx")).status_code == 400
+    login(client, "ana@example.com", "NewSecret456")
+
+
+def test_reset_codes_are_hashed_and_single_active(app, client, data, monkeypatch):
+    sent = []
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: sent.append(code))
+    client.post("/auth/forgot", json={"email": "ana@example.com"})
+    client.post("/auth/forgot", json={"email": "ana@example.com"})
+
+    with app.app_context():
+        rows = db.session.execute(db.select(PasswordReset)).scalars().all()
+        assert len(rows) == 1
+        assert sent[1] not in rows[0].code_hash
+
+    stale = {"email": "ana@example.com", "code": sent[0]}
+    if sent[0] != sent[1]:
+        assert client.post("/auth/verify-reset", json=stale).status_code == 400
+    assert client.post("/auth/verify-reset", json=dict(stale, code=sent[1])).status_code == 200
+
+
+def test_reset_code_locks_after_max_attempts(app, client, data, monkeypatch):
+    sent = []
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: sent.append(code))
+    client.post("/auth/forgot", json={"email": "ana@example.com"})
+    wrong = "000000" if sent[0] != "000000" else "111111"
+
+    for _ in range(app.config["RESET_CODE_MAX_ATTEMPTS"]):
+        assert client.post("/auth/verify-reset", json={"email": "ana@example.com", "code": wrong}).status_code == 400
+    payload = {"email": "ana@example.com", "code": sent[0], "new_password": "NewSecret456"}
+    assert client.post("/auth/reset", json=payload).status_code == 429
+
+    # a new code starts over
+    client.post("/auth/forgot", json={"email": "ana@example.com"})
+    assert client.post("/auth/reset", json=dict(payload, code=sent[1])).status_code == 200
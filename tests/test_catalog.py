@@ -0,0 +1,77 @@
+import pytest
+
+from db.init import db
+from db.room import Room
+from services.catalog import UnlockGraphError, compile_unlock_graph, get_catalog, invalidate_catalog
+
+
+def test_rooms_without_edges_form_a_chain():
+    assert compile_unlock_graph([3, 1, 2], []) == {3: (), 1: (3,), 2: (1,)}
+
+
+def test_edges_define_prerequisites():
+    graph = compile_unlock_graph([1, 2, 3, 4], [(2, 1), (3, 1), (4, 3), (4, 2)])
+    assert graph == {1: (), 2: (1,), 3: (1,), 4: (2, 3)}
+
+
+@pytest.mark.parametrize("edges, message", [
+    ([(1, 1)], "requires itself"),
+    ([(2, 9)], "outside the exhibition"),
+    ([(1, 2), (2, 3), (3, 1)], "no entry room"),
+    ([(2, 1), (3, 2), (2, 3)], "cycle"),
+])
+def test_invalid_graphs_are_rejected(edges, message):
+    with pytest.raises(UnlockGraphError, match=message):
+        compile_unlock_graph([1, 2, 3], edges)
+
+
+def _bundle_url(client, headers):
+    return f"/catalog/{client.get('/rooms/state', headers=headers).get_json()['catalog']}"
+
+
+def test_catalog_bundle_is_immutable_and_content_addressed(client, data, user_headers):
+    url = _bundle_url(client, user_headers)
+    assert client.get(url).status_code == 401
+
+    resp = client.get(url, headers=user_headers)
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "private, max-age=31536000, immutable"
+    body = resp.get_json()
+    entry, gallery = data["rooms"]
+    assert [r["id"] for r in body["rooms"]] == [entry, gallery]
+    assert [h["accessCode"] for h in body["rooms"][1]["hints"]] == ["K1", "K2"]
+    assert body["rooms"][1]["requires"] == [entry]
+    assert "finalCode" not in resp.get_data(as_text=True)
+
+    again = client.get(url, headers={**user_headers, "If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["Cache-Control"] == "private, max-age=31536000, immutable"
+
+    stale = client.get("/catalog/0123456789abcdef0123", headers=user_headers)
+    assert stale.status_code == 404
+    assert stale.get_json()["catalog"] == url.rsplit("/", 1)[1]
+
+
+def test_catalog_version_follows_content(app, client, data, user_headers):
+    before = _bundle_url(client, user_headers)
+    with app.app_context():
+        db.session.get(Room, data["rooms"][1]).name = "Sala 2: Jardín"
+        db.session.commit()
+        invalidate_catalog()
+        rebuilt = get_catalog().bundle().version
+    after = _bundle_url(client, user_headers)
+    assert after != before and after.endswith(rebuilt)
+    assert client.get(before, headers=user_headers).status_code == 404
+
+
+def test_room_state_maps(client, data, user_headers):
+    entry, gallery = data["rooms"]
+    resp = client.get("/rooms/state", headers=user_headers)
+    assert resp.headers["Cache-Control"] == "private, no-cache"
+    state = resp.get_json()
+    assert state["rooms"] == {str(entry): 1, str(gallery): 0}
+    assert set(state["hints"].values()) == {0}
+
+    client.post(f"/rooms/{entry}/verify_final_code", json={"final_code": "ABC"}, headers=user_headers)
+    state = client.get("/rooms/state", headers=user_headers).get_json()
+    assert state["rooms"] == {str(entry): 2, str(gallery): 1}
@@ -0,0 +1,64 @@
+import pytest
+
+from conftest import login, make_app, seed
+
+
+def _complete_entry(client, data, headers):
+    entry = data["rooms"][0]
+    client.post(f"/rooms/{entry}/verify_final_code", json={"final_code": "ABC"}, headers=headers)
+
+
+def test_list_events_pages_with_cursor(client, data, user_headers, admin_headers):
+    assert client.get("/events", headers=user_headers).status_code == 403
+    _complete_entry(client, data, user_headers)
+
+    body = client.get("/events?limit=2", headers=admin_headers).get_json()
+    kinds = [e["kind"] for e in body["events"]]
+    # entry room unlocked, room completed, next room unlocked
+    assert kinds == ["room_unlocked", "room_completed"]
+    rest = client.get(f"/events?cursor={body['cursor']}", headers=admin_headers).get_json()
+    assert [e["kind"] for e in rest["events"]] == ["room_unlocked"]
+    assert rest["events"][0]["roomId"] == data["rooms"][1]
+    assert rest["events"][0]["userId"] == data["users"]["user"]["id"]
+
+
+def test_stream_replays_then_follows(client, data, user_headers, admin_headers):
+    assert client.get("/events/stream", headers=user_headers).status_code == 403
+    _complete_entry(client, data, user_headers)
+
+    resp = client.get("/events/stream?cursor=1", headers=admin_headers, buffered=False)
+    assert resp.mimetype == "text/event-stream"
+    chunks = iter(resp.response)
+    replay = [next(chunks) for _ in range(2)]
+    assert [c.split(b"\n")[0] for c in replay] == [b"id: 2", b"id: 3"]
+    assert next(chunks).startswith(b"retry:")
+
+    # a later commit reaches the open stream through the bus
+    gallery = data["rooms"][1]
+    client.post("/rooms/complete", json={"room_id": gallery, "hint_id": data["hints"][gallery][0],
+                                         "email": "ana@example.com"}, headers=user_headers)
+    live = next(c for c in chunks if not c.startswith(b":"))
+    assert b"event: hint_completed" in live
+    resp.close()
+
+
+def test_discarded_stream_does_not_leak_subscription():
+    from services.events import get_bus
+
+    app = make_app()
+
+    @app.after_request
+    def fail(response):
+        # the stream response is dropped without being iterated or closed
+        if response.mimetype == "text/event-stream":
+            raise RuntimeError("after_request failed")
+        return response
+
+    with app.app_context():
+        seed()
+    client = app.test_client()
+    headers = login(client, "admin@example.com")
+    with pytest.raises(RuntimeError):
+        client.get("/events/stream", headers=headers)
+    with app.app_context():
+        assert get_bus().subscriber_count == 0
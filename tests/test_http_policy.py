@@ -0,0 +1,46 @@
+from conftest import make_app
+from db.query_budget import count_queries
+
+FRONTEND = "https://museo.example.com"
+PREFLIGHT = {"Origin": FRONTEND, "Access-Control-Request-Method": "GET",
+             "Access-Control-Request-Headers": "authorization, x-exhibition"}
+
+
+def test_preflight_runs_no_sql():
+    client = make_app(FRONTEND_ORIGIN=FRONTEND).test_client()
+    with count_queries() as counter:
+        resp = client.options("/rooms", headers=PREFLIGHT)
+    assert counter[0] == 0
+    assert resp.status_code == 204
+    assert "X-Query-Count" not in resp.headers
+    assert resp.headers["Access-Control-Allow-Origin"] == FRONTEND
+    assert resp.headers["Access-Control-Max-Age"] == "86400"
+    assert "X-Exhibition" in resp.headers["Access-Control-Allow-Headers"]
+    assert "Origin" in resp.vary
+
+
+def test_unknown_origin_gets_no_cors_headers():
+    client = make_app(FRONTEND_ORIGIN=FRONTEND).test_client()
+    resp = client.options("/rooms", headers={**PREFLIGHT, "Origin": "https://evil.example"})
+    assert resp.status_code == 204
+    assert "Access-Control-Allow-Origin" not in resp.headers
+    assert "Access-Control-Allow-Headers" not in resp.headers
+
+    resp = client.get("/healthz", headers={"Origin": "https://evil.example"})
+    assert "Access-Control-Allow-Origin" not in resp.headers
+
+
+def test_any_origin_by_default(client):
+    resp = client.get("/healthz", headers={"Origin": FRONTEND})
+    assert resp.headers["Access-Control-Allow-Origin"] == "*"
+
+
+def test_cache_control_per_route(client, user_headers):
+    assert client.get("/healthz").headers["Cache-Control"] == "no-store"
+    assert client.get("/exhibitions").headers["Cache-Control"] == "public, max-age=300"
+
+    rooms = client.get("/rooms", headers=user_headers)
+    assert rooms.headers["Cache-Control"] == "private, no-cache"
+    assert {"Authorization", "X-Exhibition"} <= set(rooms.vary)
+    # errors fall back to the default policy
+    assert client.get("/rooms").headers["Cache-Control"] == "no-store"
@@ -0,0 +1,54 @@
+import controllers.auth
+from services.cache import get_cache
+from services.idempotency import _keys
+
+
+def test_retry_replays_first_response(client, data, user_headers):
+    payload = {"final_code": "ABC"}
+    headers = dict(user_headers, **{"Idempotency-Key": "kiosk-1"})
+    first = client.post(f"/rooms/{data['rooms'][0]}/verify_final_code", json=payload, headers=headers)
+    retry = client.post(f"/rooms/{data['rooms'][0]}/verify_final_code", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    # only the token lookup runs, not the unlock transaction
+    assert int(retry.headers["X-Query-Count"]) < int(first.headers["X-Query-Count"])
+
+    other = client.post(f"/rooms/{data['rooms'][0]}/verify_final_code", json={"final_code": "XYZ"}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_forgot_retry_sends_one_email(client, data, monkeypatch):
+    sent = []
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: sent.append(code))
+    for _ in range(3):
+        resp = client.post("/auth/forgot", json={"email": "ana@example.com"}, headers={"Idempotency-Key": "k"})
+        assert resp.status_code == 200
+    assert len(sent) == 1
+    # no key: every request runs
+    client.post("/auth/forgot", json={"email": "ana@example.com"})
+    assert len(sent) == 2
+
+
+def test_keys_are_scoped_per_user(client, data, user_headers, admin_headers):
+    gallery = data["rooms"][1]
+    body = {"room_id": gallery, "hint_id": data["hints"][gallery][0], "email": "ana@example.com"}
+    client.post("/rooms/complete", json=body, headers=dict(user_headers, **{"Idempotency-Key": "same"}))
+    resp = client.post("/rooms/complete", json=body, headers=dict(admin_headers, **{"Idempotency-Key": "same"}))
+    assert "Idempotent-Replayed" not in resp.headers
+
+
+def test_concurrent_duplicate_gets_409(app, client, data):
+    app.config["IDEMPOTENCY_WAIT"] = 0.1
+    # another worker holds the key
+    with app.test_request_context("/auth/forgot", method="POST", json={"email": "ana@example.com"}):
+        cache_key, fingerprint = _keys("busy")
+        get_cache().add(cache_key, {"state": "pending", "fp": fingerprint}, ttl=30)
+    resp = client.post("/auth/forgot", json={"email": "ana@example.com"}, headers={"Idempotency-Key": "busy"})
+    assert resp.status_code == 409
+    assert resp.headers["Retry-After"] == "1"
+
+
+def test_invalid_key(client, data):
+    resp = client.post("/auth/forgot", json={"email": "ana@example.com"}, headers={"Idempotency-Key": "x" * 300})
+    assert resp.status_code == 400
@@ -0,0 +1,58 @@
+import uuid
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from conftest import login
+from db.ids import BinaryUuid, uuid7
+from db.init import db
+from db.room import UsuarioHint
+from db.session_token import SessionToken
+from db.usuario import Usuario
+from services.id_migration import reassign_user_ids
+
+
+def test_uuid7_is_time_ordered():
+    ids = [uuid7() for _ in range(5000)]
+    assert all(u.version == 7 and u.variant == uuid.RFC_4122 for u in ids)
+    assert len(set(ids)) == len(ids)
+    assert sorted(ids, key=lambda u: u.bytes) == ids
+
+
+def test_binary_storage_on_mysql():
+    dialect = mysql.dialect()
+    impl = BinaryUuid().dialect_impl(dialect)
+    value = uuid7()
+    stored = impl.bind_processor(dialect)(value)
+    assert stored == value.bytes
+    assert impl.result_processor(dialect, None)(stored) == value
+    ddl = str(sa.schema.CreateTable(Usuario.__table__).compile(dialect=dialect))
+    assert "id BINARY(16) NOT NULL" in ddl
+
+
+def test_new_users_get_v7_ids(client):
+    resp = client.post("/auth/register", json={"nombre": "Eva", "apellido": "Museo", "email": "eva@example.com",
+                                               "password": "Secret123"})
+    assert uuid.UUID(resp.get_json()["id"]).version == 7
+
+
+def test_reassign_rewrites_ids_and_references(app, client, data, user_headers):
+    gallery = data["rooms"][1]
+    email = data["users"]["user"]["email"]
+    hint = data["hints"][gallery][0]
+    client.post("/rooms/complete", json={"room_id": gallery, "hint_id": hint, "email": email}, headers=user_headers)
+    old_id = uuid.UUID(data["users"]["user"]["id"])
+
+    with app.app_context():
+        assert reassign_user_ids(chunk=2, log=lambda _: None) == 3
+        assert reassign_user_ids(log=lambda _: None) == 0
+        new_id = db.session.execute(sa.select(Usuario.id).where(Usuario.email == email)).scalar_one()
+        assert new_id.version == 7
+        assert db.session.get(Usuario, old_id) is None
+        assert db.session.execute(sa.select(UsuarioHint.usuario_id)).scalars().all() == [new_id]
+        assert set(db.session.execute(sa.select(SessionToken.usuario_id)).scalars()) == {new_id}
+        assert db.session.execute(sa.text("PRAGMA foreign_key_check")).all() == []
+
+    headers = login(client, email)
+    me = client.get("/auth/me", headers=headers).get_json()
+    assert me["id"] == str(new_id) and me["totalPoints"] == 30
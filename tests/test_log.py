@@ -0,0 +1,70 @@
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from services.log import JsonFormatter, NonBlockingQueueHandler, access_logger
+
+
+@pytest.fixture
+def records():
+    """Records reaching the queue handler, as the writer thread would see them."""
+    q = queue.Queue()
+    handler = NonBlockingQueueHandler(q)
+    access_logger.addHandler(handler)
+    yield lambda: [q.get_nowait() for _ in range(q.qsize())]
+    access_logger.removeHandler(handler)
+
+
+def test_access_line_has_request_fields(app, client, user_headers, records):
+    app.config["LOG_SLOW_MS"] = 0
+    records()
+    resp = client.get("/auth/me", headers=dict(user_headers, **{"X-Request-ID": "req-1"}))
+    assert resp.headers["X-Request-ID"] == "req-1"
+
+    (record,) = records()
+    line = json.loads(JsonFormatter().format(record))
+    assert line["msg"] == "GET /auth/me 200"
+    assert line["request_id"] == "req-1"
+    assert line["route"] == "auth.me"
+    assert line["user_id"] == resp.get_json()["id"]
+    assert line["status"] == 200 and line["latency_ms"] >= 0
+
+
+def test_successes_are_sampled_errors_are_not(app, client, records):
+    app.config["LOG_SAMPLE_RATE"] = 0
+    assert client.get("/healthz").headers["X-Request-ID"]
+    assert client.get("/auth/me").status_code == 401
+    assert [r.status for r in records()] == [401]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    log = logging.getLogger("museo.test-drops")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        for n in range(3):
+            log.warning("line %s", n)
+        assert handler.dropped == 2
+        handler.queue.get_nowait()
+        log.warning("after")
+        assert handler.queue.get_nowait().dropped == 2
+    finally:
+        log.removeHandler(handler)
+
+
+def test_exceptions_are_formatted_before_queueing():
+    q = queue.Queue()
+    handler = NonBlockingQueueHandler(q)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("museo").makeRecord("museo", logging.ERROR, __file__, 1, "failed", (),
+                                                      sys.exc_info())
+    handler.handle(record)
+    line = json.loads(JsonFormatter().format(q.get_nowait()))
+    assert "ValueError: boom" in line["exc"]
+
@@ -0,0 +1,152 @@
+import socket
+import threading
+import time
+
+import pytest
+import sqlalchemy as sa
+from flask import jsonify
+
+from conftest import make_app, seed
+from db.init import db
+from services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, is_outage
+
+SLOW_QUERY = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) "
+              "SELECT count(*) FROM c")
+
+
+def test_breaker_opens_on_failure_rate_and_probes():
+    breaker = CircuitBreaker("dep", failure_rate=0.5, min_calls=4, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    # one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+class _MySQLError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("code, outage", [
+    (2003, True), (2006, True), (2013, True), (3024, True),
+    (1213, False), (1205, False), (1054, False),
+])
+def test_only_connection_errors_and_timeouts_are_outages(code, outage):
+    exc = sa.exc.OperationalError("SELECT 1", {}, _MySQLError(code, "mysql says"))
+    assert is_outage(exc) is outage
+    assert is_outage(sa.exc.OperationalError("SELECT 1", {}, _MySQLError(1054, "x")), is_disconnect=True)
+
+
+def test_query_errors_do_not_trip_breaker():
+    app = make_app(BREAKER_MIN_CALLS=1)
+
+    @app.route("/_broken")
+    def broken():
+        return jsonify(n=db.session.execute(db.text("SELECT no_such_column FROM usuarios")).scalar())
+
+    client = app.test_client()
+    for _ in range(3):
+        # raised like any other bug (a 500 outside TESTING), not a 503
+        with pytest.raises(sa.exc.OperationalError):
+            client.get("/_broken")
+    database = client.get("/healthz/breakers").get_json()["database"]
+    assert database["state"] == CLOSED and database["failures"] == 0
+    assert client.get("/exhibitions").status_code == 200
+
+
+@pytest.fixture
+def slow_db_app():
+    app = make_app(DB_STATEMENT_TIMEOUT=0.05, BREAKER_MIN_CALLS=2, BREAKER_RESET_TIMEOUT=0.3)
+
+    @app.route("/_slow")
+    def slow():
+        return jsonify(n=db.session.execute(db.text(SLOW_QUERY)).scalar())
+
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def test_slow_database_trips_breaker(slow_db_app):
+    client = slow_db_app.test_client()
+    breakers = lambda: client.get("/healthz/breakers").get_json()
+    # schema creation already counted as successes; fail until the rate trips
+    for _ in range(breakers()["database"]["successes"]):
+        start = time.monotonic()
+        assert client.get("/_slow").status_code == 503
+        assert time.monotonic() - start < 2
+        if breakers()["database"]["state"] == OPEN:
+            break
+    assert breakers()["database"]["state"] == OPEN
+
+    # fail fast: no view, no SQL
+    resp = client.get("/exhibitions")
+    assert resp.status_code == 503
+    assert resp.get_json() == {"error": "service unavailable", "dependency": "database"}
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert client.get("/healthz").status_code == 200
+
+    time.sleep(0.35)
+    assert client.get("/exhibitions").status_code == 200
+    assert breakers()["database"]["state"] == CLOSED
+
+
+@pytest.fixture
+def stalled_smtp():
+    """A server that accepts connections and never answers."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    conns = []
+    stop = threading.Event()
+
+    def accept():
+        server.settimeout(0.05)
+        while not stop.is_set():
+            try:
+                conns.append(server.accept()[0])
+            except OSError:
+                continue
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    stop.set()
+    thread.join()
+    for c in conns:
+        c.close()
+    server.close()
+
+
+def test_stalled_smtp_times_out_then_fails_fast(stalled_smtp, monkeypatch):
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(stalled_smtp))
+    monkeypatch.setenv("SMTP_TIMEOUT", "0.2")
+    app = make_app(BREAKER_MIN_CALLS=2)
+    with app.app_context():
+        seed()
+    client = app.test_client()
+
+    for _ in range(2):
+        start = time.monotonic()
+        # delivery failures are logged, not returned
+        assert client.post("/auth/forgot", json={"email": "ana@example.com"}).status_code == 200
+        assert time.monotonic() - start < 1
+    assert client.get("/healthz/breakers").get_json()["smtp"]["state"] == OPEN
+
+    resp = client.post("/auth/forgot", json={"email": "ana@example.com"})
+    assert resp.status_code == 503
+    assert resp.get_json()["dependency"] == "smtp"
@@ -0,0 +1,170 @@
+import re
+
+import pytest
+import sqlalchemy as sa
+
+from db.exhibition import DEFAULT_EXHIBITION_ID
+from db.init import db
+from db.room import Hint, Room, RoomPrerequisite
+from services.catalog import ALL_HINTS, FINAL_CODE, UNLOCK_ANY, invalidate_catalog
+
+
+def _rooms(client, headers):
+    resp = client.get("/rooms", headers=headers)
+    assert resp.status_code == 200
+    return [(r["isUnlocked"], r["completed"]) for r in resp.get_json()]
+
+
+def _me_points(client, headers):
+    return client.get("/auth/me", headers=headers).get_json()["totalPoints"]
+
+
+def test_rooms_require_login(client, data):
+    assert client.get("/rooms").status_code == 401
+
+
+def test_list_rooms_opens_entry_room_only(client, data, user_headers):
+    assert _rooms(client, user_headers) == [(True, False), (False, False)]
+
+
+def test_room_hints(client, data, user_headers):
+    entry, gallery = data["rooms"]
+    resp = client.get(f"/rooms/{gallery}", headers=user_headers)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert [h["id"] for h in body["hints"]] == data["hints"][gallery]
+    assert not any(h["completed"] for h in body["hints"])
+    assert client.get("/rooms/9999", headers=user_headers).status_code == 404
+
+
+def test_verify_final_code_completes_and_unlocks(client, data, user_headers):
+    entry, gallery = data["rooms"]
+    url = f"/rooms/{entry}/verify_final_code"
+    assert client.post(url, json={}, headers=user_headers).status_code == 400
+    assert client.post(url, json={"final_code": "nope"}, headers=user_headers).get_json()["correct"] is False
+    assert client.post(url, json={"final_code": "ABC"}, headers=user_headers).get_json()["correct"] is True
+
+    assert _rooms(client, user_headers) == [(True, True), (True, False)]
+    assert _me_points(client, user_headers) == 100
+    # completed rooms cannot be verified again
+    assert client.post(url, json={"final_code": "ABC"}, headers=user_headers).status_code == 400
+
+
+def test_verify_not_allowed_for_hint_rooms(client, data, user_headers):
+    gallery = data["rooms"][1]
+    resp = client.post(f"/rooms/{gallery}/verify_final_code", json={"final_code": "x"}, headers=user_headers)
+    assert resp.status_code == 403
+
+
+def test_completing_all_hints_completes_room(client, data, user_headers):
+    gallery = data["rooms"][1]
+    email = data["users"]["user"]["email"]
+    first, second = data["hints"][gallery]
+
+    resp = client.post("/rooms/complete", json={"room_id": gallery, "hint_id": first, "email": email},
+                       headers=user_headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["hint"] == {"id": first, "completed": True, "accessCode": "K1"}
+    assert _rooms(client, user_headers)[1][1] is False
+
+    client.post("/rooms/complete", json={"room_id": gallery, "hint_id": second, "email": email}, headers=user_headers)
+    assert _rooms(client, user_headers)[1][1] is True
+    # completing a hint twice awards its points once
+    client.post("/rooms/complete", json={"room_id": gallery, "hint_id": second, "email": email}, headers=user_headers)
+    assert _me_points(client, user_headers) == 60
+
+    hints = client.get(f"/rooms/{gallery}", headers=user_headers).get_json()["hints"]
+    assert all(h["completed"] for h in hints)
+
+
+def test_complete_validation_and_permissions(client, data, user_headers, admin_headers):
+    entry, gallery = data["rooms"]
+    other = data["users"]["other"]["email"]
+    hint = data["hints"][gallery][0]
+
+    assert client.post("/rooms/complete", json={"room_id": "x", "hint_id": hint, "email": other},
+                       headers=user_headers).status_code == 400
+    assert client.post("/rooms/complete", json={"room_id": gallery, "hint_id": hint},
+                       headers=user_headers).status_code == 400
+    # hint belongs to another room
+    assert client.post("/rooms/complete", json={"room_id": entry, "hint_id": hint, "email": "ana@example.com"},
+                       headers=user_headers).status_code == 404
+    # only the user themselves or an admin
+    assert client.post("/rooms/complete", json={"room_id": gallery, "hint_id": hint, "email": other},
+                       headers=user_headers).status_code == 403
+    assert client.post("/rooms/complete", json={"room_id": gallery, "hint_id": hint, "email": other},
+                       headers=admin_headers).status_code == 200
+    assert client.post("/rooms/complete", json={"room_id": gallery, "hint_id": hint, "email": "nadie@example.com"},
+                       headers=admin_headers).status_code == 404
+
+
+def test_unknown_exhibition(client, data, user_headers):
+    resp = client.get("/rooms", headers=dict(user_headers, **{"X-Exhibition": "nope"}))
+    assert resp.status_code == 404
+
+
+@pytest.fixture
+def graph(app, data):
+    """Two entry rooms A and B, 'all' needs both, 'any' needs either; 'code' only takes its final code."""
+    with app.app_context():
+        def room(position, name, **kw):
+            r = Room(exhibition_id=DEFAULT_EXHIBITION_ID, position=position, name=name, **kw)
+            db.session.add(r)
+            db.session.flush()
+            return r.id
+
+        a = room(3, "A", final_code="A1", completion_mode=FINAL_CODE)
+        b = room(4, "B", final_code="B1", completion_mode=FINAL_CODE)
+        both = room(5, "Todas", completion_mode=ALL_HINTS)
+        either = room(6, "Cualquiera", completion_mode=ALL_HINTS, unlock_rule=UNLOCK_ANY)
+        code = room(7, "Código", final_code="C1", completion_mode=FINAL_CODE)
+        hint = Hint(room_id=code, exhibition_id=DEFAULT_EXHIBITION_ID, title="Pista", access_code="K3")
+        db.session.add(hint)
+        db.session.add_all(
+            RoomPrerequisite(room_id=room_id, requires_room_id=req, exhibition_id=DEFAULT_EXHIBITION_ID)
+            for room_id, req in ((both, a), (both, b), (either, a), (either, b))
+        )
+        db.session.commit()
+        invalidate_catalog()
+        return {"a": a, "b": b, "all": both, "any": either, "code": code, "hint": hint.id}
+
+
+def _state(client, headers, graph):
+    rooms = client.get("/rooms/state", headers=headers).get_json()["rooms"]
+    return {name: rooms[str(graph[name])] for name in ("a", "b", "all", "any", "code")}
+
+
+def test_unlock_rules_any_and_all(app, client, graph, user_headers):
+    # 1 unlocked, 0 locked, 2 completed
+    assert _state(client, user_headers, graph) == {"a": 1, "b": 1, "all": 0, "any": 0, "code": 1}
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    sa.event.listen(engine, "before_cursor_execute", listener)
+    try:
+        resp = client.post(f"/rooms/{graph['a']}/verify_final_code", json={"final_code": "A1"}, headers=user_headers)
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", listener)
+    assert resp.get_json()["correct"] is True
+    # the catalog (loaded by /rooms/state) decides the unlocks: no rooms,
+    # hints or prerequisites queries, only the user's progress rows
+    assert int(resp.headers["X-Query-Count"]) == len(statements)
+    catalog_reads = re.compile(r"\b(FROM|JOIN)\s+(rooms|hints|room_prerequisites)\b")
+    assert not [s for s in statements if catalog_reads.search(s)]
+    assert _state(client, user_headers, graph) == {"a": 2, "b": 1, "all": 0, "any": 1, "code": 1}
+
+    client.post(f"/rooms/{graph['b']}/verify_final_code", json={"final_code": "B1"}, headers=user_headers)
+    assert _state(client, user_headers, graph) == {"a": 2, "b": 2, "all": 1, "any": 1, "code": 1}
+
+
+def test_final_code_room_ignores_hint_completion(client, graph, user_headers):
+    resp = client.post("/rooms/complete", json={"room_id": graph["code"], "hint_id": graph["hint"],
+                                                "email": "ana@example.com"}, headers=user_headers)
+    assert resp.status_code == 200
+    # every hint is done, but the room is only completed by its final code
+    assert _state(client, user_headers, graph)["code"] == 1
+    assert client.post(f"/rooms/{graph['code']}/verify_final_code", json={"final_code": "C1"},
+                       headers=user_headers).get_json()["correct"] is True
+    assert _state(client, user_headers, graph)["code"] == 2
@@ -0,0 +1,112 @@
+import sqlite3
+import time
+
+import pytest
+from flask import jsonify
+from flask_login import current_user, login_required
+
+from conftest import login, make_app, seed
+from db.init import db
+from db.routing import read_only
+from services.cache import get_cache
+
+
+def _marker(path, name):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS marker (name TEXT)")
+        conn.execute("DELETE FROM marker")
+        conn.execute("INSERT INTO marker VALUES (?)", (name,))
+
+
+def _routing_app(primary, replica, **overrides):
+    app = make_app(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{primary}",
+        SQLALCHEMY_BINDS={"replica_0": f"sqlite:///{replica}"},
+        **overrides,
+    )
+
+    @app.route("/_where")
+    @login_required
+    @read_only
+    def where():
+        return jsonify(db=db.session.execute(db.text("SELECT name FROM marker")).scalar())
+
+    @app.route("/_write", methods=["POST"])
+    @login_required
+    def write():
+        current_user.nombre = "Ana María"
+        db.session.commit()
+        return jsonify(ok=True)
+
+    return app
+
+
+@pytest.fixture
+def files(tmp_path):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    _marker(primary, "primary")
+    _marker(replica, "replica")
+    return primary, replica
+
+
+@pytest.fixture
+def routing_apps(files):
+    apps = []
+
+    def build(**overrides):
+        app = _routing_app(*files, **overrides)
+        if not apps:
+            with app.app_context():
+                seed()
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+    # Flask-SQLAlchemy registers a metadata per configured bind on the shared db
+    db.metadatas.pop("replica_0", None)
+
+
+def _where(client, headers):
+    resp = client.get("/_where", headers=headers)
+    assert resp.status_code == 200
+    return resp.get_json()["db"]
+
+
+def test_read_only_views_use_the_replica(routing_apps):
+    client = routing_apps().test_client()
+    headers = login(client, "ana@example.com")
+    assert _where(client, headers) == "replica"
+    # login and token lookups never leave the primary
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("lag", [60.0, None])
+def test_lagging_or_unknown_replica_falls_back_to_primary(routing_apps, lag):
+    client = routing_apps(REPLICA_LAG_PROBE=lambda conn: lag, REPLICA_MAX_LAG_SECONDS=5).test_client()
+    headers = login(client, "ana@example.com")
+    assert _where(client, headers) == "primary"
+
+
+def test_writes_pin_reads_to_primary_across_workers(routing_apps):
+    apps = [routing_apps(CACHE_URL="memory://", READ_YOUR_WRITES_WINDOW=1) for _ in range(2)]
+    a, b = (app.test_client() for app in apps)
+    headers = login(a, "ana@example.com")
+    other = login(a, "luis@example.com")
+    assert _where(b, headers) == "replica"
+
+    assert a.post("/_write", headers=headers).status_code == 200
+    # the marker is in the shared tier, where every worker process finds it
+    me = a.get("/auth/me", headers=headers).get_json()["id"]
+    assert get_cache(apps[0]).shared.get(f"ryw:{me}") is not None
+    assert _where(a, headers) == "primary"
+    assert _where(b, headers) == "primary"
+    # only the writer is pinned
+    assert _where(b, other) == "replica"
+
+    time.sleep(1.05)
+    assert _where(b, headers) == "replica"
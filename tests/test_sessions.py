@@ -0,0 +1,116 @@
+import pytest
+
+import controllers.auth
+from conftest import login, make_app, seed
+from services.tokens import issue_signed_token
+
+
+def test_login_past_cap_revokes_oldest_session(app, client, data, admin_headers):
+    app.config["MAX_SESSIONS_PER_USER"] = 2
+    first, second, third = (login(client, "ana@example.com") for _ in range(3))
+    # cached lookups are evicted with the row
+    assert client.get("/auth/me", headers=first).status_code == 401
+    assert client.get("/auth/me", headers=second).status_code == 200
+    assert client.get("/auth/me", headers=third).status_code == 200
+
+    me = data["users"]["user"]["id"]
+    sessions = client.get(f"/users/{me}/sessions", headers=admin_headers).get_json()["sessions"]
+    assert len(sessions) == 2
+    assert client.get(f"/users/{me}/sessions", headers=third).status_code == 403
+
+
+def test_admin_revokes_all_sessions(client, data, user_headers, admin_headers):
+    me = data["users"]["user"]["id"]
+    refresh = client.post("/auth/login", json={"email": "ana@example.com", "password": "Secret123"}).get_json()
+    assert client.get("/auth/me", headers=user_headers).status_code == 200
+
+    assert client.delete(f"/users/{me}/sessions", headers=admin_headers).get_json() == {"revoked": 2}
+    assert client.get("/auth/me", headers=user_headers).status_code == 401
+    assert client.post("/auth/refresh", json={"refreshToken": refresh["refreshToken"]}).status_code == 401
+    assert client.get(f"/users/{me}/sessions", headers=admin_headers).get_json() == {"sessions": []}
+
+
+def test_deactivation_revokes_sessions(client, data, user_headers, admin_headers):
+    me = data["users"]["user"]["id"]
+    assert client.get("/auth/me", headers=user_headers).status_code == 200
+    assert client.delete(f"/users/{me}", headers=admin_headers).status_code == 204
+    assert client.get("/auth/me", headers=user_headers).status_code == 401
+
+
+def test_password_reset_revokes_sessions(client, data, user_headers, monkeypatch):
+    sent = {}
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: sent.update(code=code))
+    client.post("/auth/forgot", json={"email": "ana@example.com"})
+    resp = client.post("/auth/reset", json={"email": "ana@example.com", "code": sent["code"],
+                                            "new_password": "NewSecret456"})
+    assert resp.status_code == 200
+    assert client.get("/auth/me", headers=user_headers).status_code == 401
+
+
+def test_logout_reaches_other_workers(workers):
+    a, b = (app.test_client() for app in workers)
+    headers = login(a, "ana@example.com")
+    assert b.get("/auth/me", headers=headers).status_code == 200
+
+    assert a.post("/auth/logout", headers=headers).status_code == 200
+    assert a.get("/auth/me", headers=headers).status_code == 401
+    # b has no way to hear about a's eviction; it must not have cached the token
+    assert b.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_revocations_reach_other_workers(workers, monkeypatch):
+    a, b = (app.test_client() for app in workers)
+    workers[0].config["MAX_SESSIONS_PER_USER"] = 1
+    first = login(a, "ana@example.com")
+    assert b.get("/auth/me", headers=first).status_code == 200
+    # session cap on a
+    second = login(a, "ana@example.com")
+    assert b.get("/auth/me", headers=first).status_code == 401
+    assert b.get("/auth/me", headers=second).status_code == 200
+
+    # admin revocation on a
+    admin = login(b, "admin@example.com")
+    me = b.get("/auth/me", headers=second).get_json()["id"]
+    assert a.delete(f"/users/{me}/sessions", headers=admin).status_code == 200
+    assert b.get("/auth/me", headers=second).status_code == 401
+
+    # password reset on a
+    third = login(a, "ana@example.com")
+    assert b.get("/auth/me", headers=third).status_code == 200
+    sent = {}
+    monkeypatch.setattr(controllers.auth, "send_reset_email", lambda to, code: sent.update(code=code))
+    a.post("/auth/forgot", json={"email": "ana@example.com"})
+    assert a.post("/auth/reset", json={"email": "ana@example.com", "code": sent["code"],
+                                       "new_password": "NewSecret456"}).status_code == 200
+    assert b.get("/auth/me", headers=third).status_code == 401
+
+
+@pytest.mark.parametrize("workers", [{"SESSION_TOKEN_MODE": "signed", "CACHE_URL": "memory://"}], indirect=True)
+def test_signed_token_revocations_reach_other_workers(workers):
+    a, b = (app.test_client() for app in workers)
+    headers = login(a, "ana@example.com")
+    assert "." in headers["Authorization"]
+    assert b.get("/rooms", headers=headers).status_code == 200
+
+    assert a.post("/auth/logout", headers=headers).status_code == 200
+    assert a.get("/rooms", headers=headers).status_code == 401
+    assert b.get("/rooms", headers=headers).status_code == 401
+
+    # revoke_user_sessions (deactivation, password reset, admin) denylists every token of the user
+    headers = login(b, "ana@example.com")
+    admin = login(a, "admin@example.com")
+    me = a.get("/auth/me", headers=headers).get_json()["id"]
+    assert a.delete(f"/users/{me}/sessions", headers=admin).status_code == 200
+    assert b.get("/rooms", headers=headers).status_code == 401
+
+
+def test_signed_mode_needs_a_shared_cache():
+    app = make_app(SESSION_TOKEN_MODE="signed", CACHE_URL=None)
+    assert app.config["SESSION_TOKEN_MODE"] == "db"
+    with app.app_context():
+        data = seed()
+        raw, _ = issue_signed_token(data["users"]["user"]["id"], "USER")
+    client = app.test_client()
+    assert "." not in login(client, "ana@example.com")["Authorization"]
+    # a signed token could not be revoked here, so it is not accepted
+    assert client.get("/rooms", headers={"Authorization": f"Bearer {raw}"}).status_code == 401
@@ -0,0 +1,57 @@
+import sqlalchemy as sa
+
+from db.init import db
+from db.stats import HintStats, RoomStats
+from conftest import login
+from services.stats import rebuild_stats
+
+
+def test_stats_funnel(client, data, user_headers, admin_headers):
+    assert client.get("/stats", headers=user_headers).status_code == 403
+    entry, gallery = data["rooms"]
+    client.post(f"/rooms/{entry}/verify_final_code", json={"final_code": "ABC"}, headers=user_headers)
+    client.post("/rooms/complete", json={"room_id": gallery, "hint_id": data["hints"][gallery][0],
+                                         "email": "ana@example.com"}, headers=user_headers)
+
+    rooms = {r["id"]: r for r in client.get("/stats", headers=admin_headers).get_json()["rooms"]}
+    assert (rooms[entry]["unlocked"], rooms[entry]["completed"], rooms[entry]["pointsAwarded"]) == (1, 1, 100)
+    assert (rooms[gallery]["unlocked"], rooms[gallery]["completed"]) == (1, 0)
+    assert [h["completed"] for h in rooms[gallery]["hints"]] == [1, 0]
+
+
+def _rollups():
+    rooms = {r.room_id: (r.unlocked, r.completed, r.hints_completed, r.points_awarded)
+             for r in RoomStats.query.all()}
+    hints = {h.hint_id: (h.room_id, h.completed) for h in HintStats.query.all()}
+    return rooms, hints
+
+
+def test_rebuild_matches_incremental_rollups(app, client, data, user_headers, admin_headers):
+    entry, gallery = data["rooms"]
+    other_headers = login(client, data["users"]["other"]["email"])
+    for headers in (user_headers, other_headers):
+        client.post(f"/rooms/{entry}/verify_final_code", json={"final_code": "ABC"}, headers=headers)
+    client.post("/rooms/complete", json={"room_id": gallery, "hint_id": data["hints"][gallery][0],
+                                         "email": "ana@example.com"}, headers=user_headers)
+
+    with app.app_context():
+        rooms, hints = _rollups()
+        assert rooms[entry][:2] == (2, 2)
+        db.session.execute(sa.delete(HintStats))
+        db.session.execute(sa.delete(RoomStats))
+        db.session.commit()
+        assert _rollups() == ({}, {})
+
+        rebuild_stats()
+        db.session.commit()
+        rebuilt_rooms, rebuilt_hints = _rollups()
+
+    # the rebuild also writes zero rows for rooms/hints nobody has touched yet
+    assert {k: v for k, v in rebuilt_rooms.items() if any(v)} == rooms
+    assert {k: v for k, v in rebuilt_hints.items() if v[1]} == hints
+
+    funnel = {r["id"]: r for r in client.get("/stats", headers=admin_headers).get_json()["rooms"]}
+    assert (funnel[entry]["pointsAwarded"], funnel[entry]["avgPoints"]) == (200, 100.0)
+    assert funnel[gallery]["unlocked"] == 2
+    assert [h["stuck"] for h in funnel[gallery]["hints"]] == [1, 2]
+    assert (funnel[gallery]["pointsAwarded"], funnel[gallery]["avgPoints"]) == (30, 15.0)
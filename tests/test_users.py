@@ -0,0 +1,55 @@
+from conftest import login
+
+
+def test_list_users_is_admin_only(client, data, user_headers, admin_headers):
+    assert client.get("/users", headers=user_headers).status_code == 403
+    resp = client.get("/users?q=museo&per_page=2", headers=admin_headers)
+    assert resp.status_code == 200
+    assert client.get("/users?page=x", headers=admin_headers).status_code == 400
+
+
+def test_get_user(client, data, user_headers, admin_headers):
+    me, other = data["users"]["user"]["id"], data["users"]["other"]["id"]
+    assert client.get(f"/users/{me}", headers=user_headers).get_json()["email"] == "ana@example.com"
+    assert client.get(f"/users/{other}", headers=user_headers).status_code == 403
+    assert client.get(f"/users/{other}", headers=admin_headers).status_code == 200
+    assert client.get("/users/not-a-uuid", headers=admin_headers).status_code == 400
+    assert client.get("/users/00000000-0000-0000-0000-000000000000", headers=admin_headers).status_code == 404
+
+
+def test_create_user(client, data, user_headers, admin_headers):
+    payload = {"nombre": "Nuevo", "apellido": "Usuario", "email": "nuevo@example.com", "password": "LongEnough1"}
+    assert client.post("/users", json=payload, headers=user_headers).status_code == 403
+    resp = client.post("/users", json=payload, headers=admin_headers)
+    assert resp.status_code == 201
+    assert resp.get_json()["role"] == "USER"
+    assert client.post("/users", json=payload, headers=admin_headers).status_code == 409
+    resp = client.post("/users", json=dict(payload, email="Nuevo@Example.com"), headers=admin_headers)
+    assert resp.status_code == 409
+    assert client.post("/users", json=dict(payload, email="bad"), headers=admin_headers).status_code == 400
+    assert client.post("/users", json=dict(payload, email="x@example.com", password="short"),
+                       headers=admin_headers).status_code == 400
+    login(client, "nuevo@example.com", "LongEnough1")
+
+
+def test_update_user(client, data, user_headers, admin_headers):
+    me, other = data["users"]["user"]["id"], data["users"]["other"]["id"]
+    resp = client.patch(f"/users/{me}", json={"nombre": "Ana María"}, headers=user_headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["nombre"] == "Ana María"
+    # users may only rename themselves
+    assert client.patch(f"/users/{me}", json={"role": "ADMIN"}, headers=user_headers).status_code == 403
+    assert client.patch(f"/users/{other}", json={"nombre": "X"}, headers=user_headers).status_code == 403
+
+    assert client.put(f"/users/{other}", json={"email": "ana@example.com"}, headers=admin_headers).status_code == 409
+    assert client.put(f"/users/{other}", json={"email": "ANA@example.com"}, headers=admin_headers).status_code == 409
+    assert client.get(f"/users/{other}", headers=admin_headers).get_json()["email"] == "luis@example.com"
+    resp = client.put(f"/users/{other}", json={"role": "ADMIN"}, headers=admin_headers)
+    assert resp.get_json()["role"] == "ADMIN"
+
+
+def test_delete_user_is_soft(client, data, user_headers, admin_headers):
+    other = data["users"]["other"]["id"]
+    assert client.delete(f"/users/{other}", headers=user_headers).status_code == 403
+    assert client.delete(f"/users/{other}", headers=admin_headers).status_code == 204
+    assert client.get(f"/users/{other}", headers=admin_headers).get_json()["is_active"] is False
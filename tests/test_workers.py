@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import seed
+from db.exhibition import DEFAULT_EXHIBITION_ID
+from db.init import db
+from services.cache import INVALIDATION_CHANNEL, get_cache
+from services.workers import after_fork, warm_app
+
+
+def _pools(app):
+    with app.app_context():
+        return {name: engine.pool for name, engine in db.engines.items()}
+
+
+def test_warm_app_loads_catalogs_and_releases_connections(app):
+    with app.app_context():
+        seed()
+    app.extensions.pop("catalog", None)
+    pools = _pools(app)
+
+    warm_app(app)
+
+    assert DEFAULT_EXHIBITION_ID in app.extensions["catalog"]
+    assert all(pool is not pools[name] for name, pool in _pools(app).items())
+
+
+@pytest.mark.parametrize("workers", [{"CACHE_URL": "memory://"}], indirect=True)
+def test_after_fork_replaces_connections_and_cache_listener(workers):
+    parent, child = workers
+    parent_cache, cache = get_cache(parent), get_cache(child)
+    # a forked worker starts with the parent's node id and subscription
+    cache.node_id = parent_cache.node_id
+    pools, pubsub = _pools(child), cache._pubsub
+
+    after_fork(child)
+
+    assert all(pool is not pools[name] for name, pool in _pools(child).items())
+    assert cache.node_id != parent_cache.node_id
+    subscribers = cache.shared.client._subscribers[INVALIDATION_CHANNEL]
+    assert cache._pubsub is not pubsub and cache._pubsub in subscribers and pubsub not in subscribers
+    # invalidations from the parent's node id are no longer dropped as the child's own
+    cache.set("greeting", "hola")
+    parent_cache.delete("greeting")
+    assert cache.local.get("greeting") is None
+    with child.app_context():
+        assert db.session.execute(db.text("SELECT 1")).scalar() == 1